@@ -6,6 +6,7 @@ from . import core
 from . import transformers
 from . import interfaces
 from . import infrastructure
+from . import cli
 
 # Configurar log buffer al cargar el módulo
 from .infrastructure.log_buffer import setup_log_buffer
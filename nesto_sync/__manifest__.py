@@ -1,10 +1,29 @@
 {
     'name': 'Nesto Sync',
-    'version': '2.8.0',  # 2.8.0: Sincronización bidireccional de BOMs (ProductosKit)
+    'version': '2.9.0',  # 2.9.0: Rendimiento (lotes, outbox, idempotencia, índices únicos)
     'summary': 'Sincronización bidireccional de tablas entre Nesto y Odoo via Google Pub/Sub',
     'description': '''
         Módulo de sincronización bidireccional entre Nesto y Odoo
 
+        Versión 2.9.0:
+        - Requiere actualizar el módulo (-u nesto_sync): modelos, crons e índices nuevos
+        - Ingesta: endpoint /nesto_sync/batch, consumidor pull (cron y worker) y
+          descarte de mensajes duplicados u obsoletos (nesto.sync.idempotency)
+        - Publicación: outbox transaccional con coalescencia (nesto.sync.outbox,
+          nesto.sync.outbox.stats), modos outbox/async/sync y publisher local
+        - Ordering keys de Pub/Sub por entidad y clave externa: opcional
+          (nesto_sync.pubsub_message_ordering, desactivado por defecto)
+        - Imágenes de productos: descarga en segundo plano con caché en disco
+          acotada (nesto_sync.image_cache_max_mb, limpieza diaria)
+        - Unicidad de IDs externos con índices únicos parciales: la actualización
+          falla listando los duplicados si ya existen en la base de datos
+        - Caché de resoluciones many2one por proceso, invalidada en todos los
+          workers (nesto.sync.lookup.cache.generation)
+        - Crons nuevos: consumidor pull, descarga de imágenes, limpieza de la
+          caché de imágenes, drenado del outbox, limpieza de idempotencia y de
+          generaciones de la caché de lookups
+        - Estadísticas en /nesto_sync/stats
+
         Versión 2.8.0 (2025-11-20):
         - NUEVA FUNCIONALIDAD: Sincronización bidireccional de BOMs (Bills of Materials)
         - ProductosKit de Nesto → mrp.bom de Odoo (creación/actualización/eliminación automática)
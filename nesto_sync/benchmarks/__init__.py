@@ -0,0 +1,19 @@
+"""
+Benchmarks de nesto_sync
+
+Herramientas para medir la ingesta Nesto → Odoo sin Google Pub/Sub:
+- dataset: Envelopes PubSub realistas (EnvelopeFactory) y clientes y productos
+  sintéticos en bloque para 1k/10k/100k (SyntheticDataset)
+- image_server: Servidor HTTP local que sirve las imágenes de UrlFoto
+- harness: Reproduce envelopes contra el endpoint /nesto_sync o directamente
+  contra processor/service y mide latencias, consultas y commits
+- budgets / baselines: Presupuestos de consultas SQL por operación
+
+No se cargan con el módulo: los usan los tests tagged nesto_sync_benchmark
+(odoo-bin --test-tags nesto_sync_benchmark).
+"""
+
+from .dataset import EnvelopeFactory, SyntheticDataset, get_dataset_size
+from .image_server import ImageStubServer
+from .harness import IngestHarness, BenchmarkReport
+from .budgets import QueryBudget, QueryBudgetExceeded, count_queries
@@ -0,0 +1,37 @@
+"""
+Líneas base de consultas SQL por operación (suite nesto_sync_benchmark)
+
+Es un módulo Python y no un .json porque los .json están en .gitignore.
+
+Por operación:
+- queries: Consultas medidas con el tamaño de lote de referencia
+  (REFERENCE_ITEMS). None = aún sin registrar: la suite falla hasta que
+  se registre
+- per_item: Consultas extra admitidas por cada elemento más del lote
+  (0 = la operación no debe crecer con el lote: un N+1 rompe la suite)
+
+Para registrar o actualizar las líneas base tras un cambio intencionado:
+    NESTO_SYNC_BENCHMARK_UPDATE=1 odoo-bin ... --test-tags nesto_sync_benchmark
+y copiar aquí los valores del JSON que deja la suite (ver budgets.py).
+"""
+
+# Consultas adicionales toleradas sobre la línea base (caché fría, secuencias...)
+TOLERANCE = 2
+
+# Tamaño del lote con el que se mide la línea base
+REFERENCE_ITEMS = 10
+
+QUERY_BASELINES = {
+    # Transformar un mensaje de cliente: lookups cacheados, no crece con las personas de contacto
+    'processor.process': {'queries': None, 'per_item': 0},
+    # Reaplicar un mensaje sin cambios: snapshot por lotes, no crece con las personas de contacto
+    'service.create_or_update_contact': {'queries': None, 'per_item': 0},
+    # Publicar un cliente: children precargados en una consulta
+    'publisher.publish_record': {'queries': None, 'per_item': 0},
+    # Publicar un lote de clientes: prefetch por lote
+    'publisher.publish_records': {'queries': None, 'per_item': 0},
+    # Sincronizar una BOM: una búsqueda de producto y otra de BOM (ciclos) por componente
+    'bom._sync_bom': {'queries': None, 'per_item': 4},
+    # write() masivo de un modelo sincronizado (snapshot + encolado en el outbox)
+    'mixin.write': {'queries': None, 'per_item': 0},
+}
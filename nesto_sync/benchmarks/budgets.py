@@ -0,0 +1,124 @@
+"""
+Presupuestos de consultas SQL por operación
+
+Cada operación se mide con dos tamaños de lote (REFERENCE_ITEMS y el doble).
+Se comprueba que:
+1. El crecimiento entre ambos no supera per_item por elemento (+ TOLERANCE):
+   detecta consultas N+1
+2. Con el tamaño de referencia no se supera la línea base (+ TOLERANCE):
+   detecta una consulta fija de más por llamada. Una operación sin línea
+   base registrada (None) hace fallar la suite
+
+Con NESTO_SYNC_BENCHMARK_UPDATE=1 las mediciones no se comprueban: se
+escriben en un JSON (NESTO_SYNC_BENCHMARK_OUTPUT) para copiarlas a
+baselines.py. La suite nunca modifica los fuentes del módulo.
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+from . import baselines
+
+_logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Una operación hizo más consultas de las presupuestadas"""
+
+
+def count_queries(env, function):
+    """
+    Ejecuta function() y cuenta sus consultas SQL
+
+    Returns:
+        tuple: (consultas, resultado de function)
+    """
+    env.flush_all()
+    env.invalidate_all()
+    before = env.cr.sql_log_count
+    result = function()
+    env.flush_all()
+    return env.cr.sql_log_count - before, result
+
+
+def update_mode():
+    """True si la suite debe registrar líneas base en lugar de comprobarlas"""
+    return os.environ.get('NESTO_SYNC_BENCHMARK_UPDATE') == '1'
+
+
+def output_path():
+    """Fichero de mediciones (NESTO_SYNC_BENCHMARK_OUTPUT, por defecto en el directorio temporal)"""
+    return os.environ.get('NESTO_SYNC_BENCHMARK_OUTPUT') or os.path.join(
+        tempfile.gettempdir(), 'nesto_sync_query_baselines.json'
+    )
+
+
+class QueryBudget:
+    """Comprobación de presupuestos contra benchmarks/baselines.py"""
+
+    # Mediciones de la ejecución en curso (para NESTO_SYNC_BENCHMARK_UPDATE)
+    measured = {}
+
+    def __init__(self, operation):
+        if operation not in baselines.QUERY_BASELINES:
+            raise KeyError(f"Operación sin presupuesto en baselines.py: {operation}")
+        self.operation = operation
+        self.budget = baselines.QUERY_BASELINES[operation]
+
+    def check(self, reference_queries, double_queries, items=baselines.REFERENCE_ITEMS):
+        """
+        Comprueba las consultas medidas con items y 2 * items elementos
+
+        Raises:
+            QueryBudgetExceeded: Si se supera el crecimiento o la línea base, o
+                la operación no tiene línea base registrada
+        """
+        growth = double_queries - reference_queries
+        allowed_growth = self.budget['per_item'] * items + baselines.TOLERANCE
+        _logger.info(
+            f"Presupuesto {self.operation}: {reference_queries} consultas con {items} elementos, "
+            f"{double_queries} con {2 * items} (crecimiento {growth}, máximo {allowed_growth}; "
+            f"línea base {self.budget['queries']})"
+        )
+
+        if update_mode():
+            QueryBudget.measured[self.operation] = reference_queries
+            return
+
+        if growth > allowed_growth:
+            raise QueryBudgetExceeded(
+                f"{self.operation}: las consultas crecen con el lote ({reference_queries} → "
+                f"{double_queries} al pasar de {items} a {2 * items} elementos, máximo "
+                f"{allowed_growth} más). ¿Consulta N+1?"
+            )
+
+        baseline = self.budget['queries']
+        if baseline is None:
+            raise QueryBudgetExceeded(
+                f"{self.operation}: sin línea base registrada ({reference_queries} consultas "
+                f"medidas). Regístrala en baselines.py con NESTO_SYNC_BENCHMARK_UPDATE=1"
+            )
+        if reference_queries > baseline + baselines.TOLERANCE:
+            raise QueryBudgetExceeded(
+                f"{self.operation}: {reference_queries} consultas, línea base {baseline} "
+                f"(+{baselines.TOLERANCE}). Si el aumento es intencionado, actualiza "
+                f"baselines.py con NESTO_SYNC_BENCHMARK_UPDATE=1"
+            )
+
+    @classmethod
+    def write_measured(cls, path=None):
+        """
+        Escribe las mediciones de esta ejecución en un JSON {operación: consultas}
+
+        Returns:
+            str: Ruta del fichero escrito (None si no hay mediciones)
+        """
+        if not cls.measured:
+            return None
+        path = path or output_path()
+        with open(path, 'w', encoding='utf-8') as target:
+            json.dump(cls.measured, target, indent=2, sort_keys=True)
+        _logger.info(f"Mediciones de consultas en {path}: cópialas a baselines.py ({cls.measured})")
+        return path
@@ -0,0 +1,274 @@
+"""
+Datos sintéticos para benchmarks
+
+- EnvelopeFactory: envelopes PubSub realistas con la misma forma que envía
+  Nesto (ver tests de integración): clientes con PersonasContacto y
+  productos con ProductosKit y UrlFoto, en el formato push de PubSub (data
+  en base64 + messageId). Con la misma semilla genera siempre los mismos
+  datos.
+- SyntheticDataset: clientes (con personas de contacto) y productos (con
+  kits) creados en bloque en la base de datos, sin publicar a Nesto
+  (skip_sync) ni registrar tracking, para que preparar 100.000 registros no
+  sea lo que se mide.
+
+El tamaño de SyntheticDataset lo decide NESTO_SYNC_BENCHMARK_SIZE (1000 por
+defecto): en CI se lanza la suite una vez por tamaño (1000, 10000, 100000).
+Los presupuestos de consultas son los mismos para todos: el número de
+consultas de una operación no debe depender del tamaño de las tablas.
+"""
+
+import base64
+import json
+import logging
+import os
+import random
+import time
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_SIZE = 1000
+CHUNK_SIZE = 1000
+
+# Contexto de creación masiva: sin sincronización, tracking ni chatter
+BULK_CONTEXT = {
+    'skip_sync': True,
+    'tracking_disable': True,
+    'mail_create_nolog': True,
+    'mail_create_nosubscribe': True,
+    'mail_notrack': True,
+}
+
+
+def get_dataset_size():
+    """Tamaño del dataset configurado (NESTO_SYNC_BENCHMARK_SIZE)"""
+    return int(os.environ.get('NESTO_SYNC_BENCHMARK_SIZE', DEFAULT_SIZE))
+
+
+
+class EnvelopeFactory:
+    """Genera mensajes de Nesto y sus envelopes PubSub"""
+
+    PROVINCIAS = ('Madrid', 'Barcelona', 'Valencia', 'Sevilla', 'Zaragoza', 'Málaga')
+    POBLACIONES = ('Madrid', 'Barcelona', 'Valencia', 'Sevilla', 'Zaragoza', 'Málaga')
+    GRUPOS = ('COS', 'ACC', 'APA')
+    UNIDADES = (('ml', 250), ('l', 1), ('g', 500), ('kg', 2), ('cm', 30))
+
+    def __init__(self, seed=0, contacts_per_client=2, kit_size=0, image_base_url=None,
+                 prefix='BENCH'):
+        """
+        Args:
+            seed (int): Semilla de los datos aleatorios
+            contacts_per_client (int): PersonasContacto por cliente
+            kit_size (int): Componentes de ProductosKit por producto (0 = sin kit)
+            image_base_url (str, optional): URL base de las imágenes (ej: la de
+                ImageStubServer). Sin ella, los productos no llevan UrlFoto
+            prefix (str): Prefijo de los códigos externos (evita choques con datos reales)
+        """
+        self.random = random.Random(seed)
+        self.contacts_per_client = contacts_per_client
+        self.kit_size = kit_size
+        self.image_base_url = image_base_url.rstrip('/') if image_base_url else None
+        self.prefix = prefix
+        self._message_seq = 0
+
+    def cliente(self, index):
+        """Mensaje de cliente principal con sus personas de contacto"""
+        code = f'{self.prefix}C{index:06d}'
+        return {
+            'Tabla': 'Clientes',
+            'Cliente': code,
+            'Contacto': '0',
+            'ClientePrincipal': True,
+            'Nombre': f'Cliente {code} S.L.',
+            'Direccion': f'Calle {self.random.randint(1, 300)}, {self.random.randint(1, 99)}',
+            'Telefono': f'6{self.random.randint(10000000, 99999999)}/9{self.random.randint(10000000, 99999999)}',
+            'Nif': f'B{self.random.randint(10000000, 99999999)}',
+            'CodigoPostal': f'{self.random.randint(1000, 52999):05d}',
+            'Poblacion': self.random.choice(self.POBLACIONES),
+            'Provincia': self.random.choice(self.PROVINCIAS),
+            'Comentarios': f'Cliente generado para benchmark {index}',
+            'Estado': 1,
+            'PersonasContacto': [
+                {
+                    'Id': str(contact),
+                    'Nombre': f'Persona {contact} de {code}',
+                    'Telefonos': f'6{self.random.randint(10000000, 99999999)}',
+                    'CorreoElectronico': f'persona{contact}.{code.lower()}@example.com',
+                    'Cargo': self.random.choice((5, 7, 8)),
+                }
+                for contact in range(1, self.contacts_per_client + 1)
+            ],
+        }
+
+    def producto(self, index):
+        """Mensaje de producto (con ProductosKit y UrlFoto si están configurados)"""
+        code = f'{self.prefix}P{index:06d}'
+        unidad, tamanno = self.random.choice(self.UNIDADES)
+        message = {
+            'Tabla': 'Productos',
+            'Producto': code,
+            'Nombre': f'Producto {code}',
+            'PrecioProfesional': round(self.random.uniform(1, 200), 2),
+            'Tamanno': tamanno,
+            'UnidadMedida': unidad,
+            'CodigoBarras': f'{8400000000000 + index}',
+            'Estado': 1,
+            'Ficticio': 0,
+            'Grupo': self.random.choice(self.GRUPOS),
+        }
+        if self.image_base_url:
+            message['UrlFoto'] = f'{self.image_base_url}/img/{code}.png'
+        if self.kit_size:
+            message['ProductosKit'] = [
+                {'ProductoId': f'{code}K{component}', 'Cantidad': self.random.randint(1, 5)}
+                for component in range(1, self.kit_size + 1)
+            ]
+        return message
+
+    def kit_components(self, index):
+        """Mensajes de los componentes del kit de un producto (para enviarlos antes)"""
+        code = f'{self.prefix}P{index:06d}'
+        return [
+            {
+                'Tabla': 'Productos',
+                'Producto': f'{code}K{component}',
+                'Nombre': f'Componente {component} de {code}',
+                'Estado': 1,
+                'Ficticio': 0,
+            }
+            for component in range(1, self.kit_size + 1)
+        ]
+
+    def envelope(self, message, message_id=None, publish_time=None):
+        """Envelope PubSub en formato push: {"message": {"data": <base64>, "messageId": ...}}
+
+        publish_time (RFC 3339) se añade como publishTime solo si se indica.
+        """
+        if message_id is None:
+            self._message_seq += 1
+            message_id = f'{self.prefix.lower()}-{self._message_seq}'
+        pubsub_message = {
+            'data': base64.b64encode(json.dumps(message).encode('utf-8')).decode('utf-8'),
+            'messageId': message_id,
+        }
+        if publish_time:
+            pubsub_message['publishTime'] = publish_time
+        return {
+            'message': pubsub_message,
+            'subscription': 'projects/benchmark/subscriptions/nesto-sync',
+        }
+
+    def clientes(self, count, start=0):
+        """Envelopes de count clientes"""
+        return [self.envelope(self.cliente(index)) for index in range(start, start + count)]
+
+    def productos(self, count, start=0):
+        """Envelopes de count productos (precedidos de sus componentes si hay kits)"""
+        envelopes = []
+        for index in range(start, start + count):
+            for component in self.kit_components(index):
+                envelopes.append(self.envelope(component))
+            envelopes.append(self.envelope(self.producto(index)))
+        return envelopes
+
+
+class SyntheticDataset:
+    """
+    Clientes y productos sintéticos
+
+    Atributos:
+        partners: Clientes principales (res.partner)
+        contacts: Personas de contacto (children de los clientes)
+        products: Productos (product.template)
+        kits: Productos con BOM (subconjunto de products)
+    """
+
+    def __init__(self, env, size, contacts_per_client=2, kit_every=10, kit_size=3, prefix='BDS'):
+        self.env = env
+        self.size = size
+        self.contacts_per_client = contacts_per_client
+        self.kit_every = kit_every
+        self.kit_size = kit_size
+        self.prefix = prefix
+        self.partners = env['res.partner']
+        self.contacts = env['res.partner']
+        self.products = env['product.template']
+        self.kits = env['product.template']
+
+    def build(self):
+        """Crea el dataset completo (por bloques de CHUNK_SIZE)"""
+        start = time.perf_counter()
+        for offset in range(0, self.size, CHUNK_SIZE):
+            count = min(CHUNK_SIZE, self.size - offset)
+            self._create_partners(offset, count)
+            self._create_products(offset, count)
+        self._create_kits()
+        _logger.info(
+            f"Dataset de benchmark: {len(self.partners)} clientes, {len(self.contacts)} personas de "
+            f"contacto, {len(self.products)} productos, {len(self.kits)} kits "
+            f"en {time.perf_counter() - start:.1f} s"
+        )
+        return self
+
+    def cliente_code(self, index):
+        return f'{self.prefix}C{index:07d}'
+
+    def producto_code(self, index):
+        return f'{self.prefix}P{index:07d}'
+
+    def _create_partners(self, offset, count):
+        Partner = self.env['res.partner'].with_context(**BULK_CONTEXT)
+        partners = Partner.create([{
+            'name': f'Cliente {self.cliente_code(index)}',
+            'cliente_externo': self.cliente_code(index),
+            'contacto_externo': '0',
+            'is_company': True,
+            'type': 'invoice',
+            'street': f'Calle {index % 300}',
+            'city': 'Madrid',
+            'mobile': f'6{index:08d}',
+        } for index in range(offset, offset + count)])
+        contacts = Partner.create([{
+            'name': f'Persona {contact} de {partner.cliente_externo}',
+            'parent_id': partner.id,
+            'type': 'contact',
+            'cliente_externo': partner.cliente_externo,
+            'contacto_externo': '0',
+            'persona_contacto_externa': str(contact),
+            'email': f'persona{contact}.{partner.cliente_externo.lower()}@example.com',
+        } for partner in partners for contact in range(1, self.contacts_per_client + 1)])
+        self.partners |= partners
+        self.contacts |= contacts
+
+    def _create_products(self, offset, count):
+        Product = self.env['product.template'].with_context(**BULK_CONTEXT)
+        self.products |= Product.create([{
+            'name': f'Producto {self.producto_code(index)}',
+            'producto_externo': self.producto_code(index),
+            'default_code': self.producto_code(index),
+            'list_price': 10.0 + index % 100,
+            'detailed_type': 'product',
+        } for index in range(offset, offset + count)])
+
+    def _create_kits(self):
+        """Un kit cada kit_every productos, con los kit_size productos siguientes como componentes"""
+        if not self.kit_every or self.size <= self.kit_size:
+            return
+        products = self.products
+        Bom = self.env['mrp.bom'].with_context(**BULK_CONTEXT)
+        bom_vals = []
+        for index in range(0, len(products) - self.kit_size, self.kit_every):
+            kit = products[index]
+            components = products[index + 1:index + 1 + self.kit_size]
+            bom_vals.append({
+                'product_tmpl_id': kit.id,
+                'type': 'normal',
+                'product_qty': 1,
+                'bom_line_ids': [
+                    (0, 0, {'product_id': component.product_variant_id.id, 'product_qty': 1})
+                    for component in components
+                ],
+            })
+            self.kits |= kit
+        for chunk in range(0, len(bom_vals), CHUNK_SIZE):
+            Bom.create(bom_vals[chunk:chunk + CHUNK_SIZE])
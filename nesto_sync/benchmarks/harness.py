@@ -0,0 +1,202 @@
+"""
+Harness de carga para la ingesta Nesto → Odoo
+
+Reproduce envelopes PubSub (ver dataset.EnvelopeFactory) por uno de dos caminos:
+- controller: NestoSyncController.sync_nesto con un request simulado, igual
+  que un push de PubSub (decodificación, DLQ, tracking de reintentos)
+- processor: EntityRegistry → processor.process → service.create_or_update_contact,
+  sin la capa HTTP
+
+Cada mensaje se mide por separado: latencia, consultas SQL (cr.sql_log_count)
+y commits/rollbacks. Los commits y rollbacks se cuentan pero no se ejecutan,
+para que el benchmark pueda correr dentro de la transacción de un test sin
+alterar la base de datos. Opcionalmente se limita el ritmo a rate mensajes/s.
+"""
+
+import json
+import logging
+import math
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from ..core.entity_registry import EntityRegistry
+from ..models.google_pubsub_message_adapter import GooglePubSubMessageAdapter
+
+_logger = logging.getLogger(__name__)
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano (values no tiene por qué estar ordenado)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class BenchmarkReport:
+    """Resultados de una reproducción"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def messages(self):
+        return len(self.latencies)
+
+    def add(self, latency, queries, ok=True):
+        self.latencies.append(latency)
+        self.queries.append(queries)
+        if not ok:
+            self.errors += 1
+
+    def as_dict(self):
+        """Resumen: percentiles en ms, consultas y commits por mensaje, throughput"""
+        messages = self.messages or 1
+        return {
+            'name': self.name,
+            'messages': self.messages,
+            'errors': self.errors,
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(self.latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 2),
+            'queries_per_message': round(sum(self.queries) / messages, 2),
+            'max_queries': max(self.queries) if self.queries else 0,
+            'commits_per_message': round(self.commits / messages, 3),
+            'rollbacks': self.rollbacks,
+            'throughput': round(self.messages / self.elapsed, 2) if self.elapsed else 0.0,
+        }
+
+    def format(self):
+        data = self.as_dict()
+        return (
+            f"{data['name']}: {data['messages']} mensajes ({data['errors']} errores), "
+            f"p50 {data['p50_ms']} ms, p95 {data['p95_ms']} ms, p99 {data['p99_ms']} ms, "
+            f"{data['queries_per_message']} consultas/mensaje (máx. {data['max_queries']}), "
+            f"{data['commits_per_message']} commits/mensaje, {data['throughput']} mensajes/s"
+        )
+
+
+class IngestHarness:
+    """Reproduce envelopes contra la ingesta y mide cada mensaje"""
+
+    def __init__(self, env, entity_registry=None):
+        self.env = env
+        self.entity_registry = entity_registry or EntityRegistry()
+        self.adapter = GooglePubSubMessageAdapter()
+
+    def replay_controller(self, envelopes, rate=None, name='controller'):
+        """
+        Reproduce envelopes contra NestoSyncController.sync_nesto
+
+        Args:
+            envelopes: Lista de envelopes PubSub
+            rate (float, optional): Mensajes por segundo (sin límite si no se indica)
+
+        Returns:
+            BenchmarkReport
+        """
+        from ..controllers import controllers as controllers_module
+        controller = controllers_module.NestoSyncController()
+
+        def send(envelope):
+            raw_data = json.dumps(envelope).encode('utf-8')
+            fake_request = SimpleNamespace(httprequest=SimpleNamespace(data=raw_data), env=self.env)
+            with patch.object(controllers_module, 'request', fake_request):
+                response = controller.sync_nesto()
+            return response.status_code == 200
+
+        return self._replay(envelopes, send, rate, name)
+
+    def replay_processor(self, envelopes, rate=None, name='processor'):
+        """
+        Reproduce envelopes directamente contra processor/service (sin HTTP)
+
+        Cada mensaje va en su savepoint, como en el procesamiento por lotes.
+
+        Returns:
+            BenchmarkReport
+        """
+        def send(envelope):
+            with self.env.cr.savepoint():
+                message = self.adapter.decode_envelope(envelope)
+                entity_type = self.entity_registry.detect_entity_type(message)
+                if entity_type is None:
+                    return True
+                data = self.entity_registry.extract_entity_data(message, entity_type)
+                processor = self.entity_registry.get_processor(entity_type, self.env)
+                service = self.entity_registry.get_service(entity_type, self.env)
+                response = service.create_or_update_contact(processor.process(data))
+                return response.status_code == 200
+
+        return self._replay(envelopes, send, rate, name)
+
+    def _replay(self, envelopes, send, rate, name):
+        report = BenchmarkReport(name)
+        interval = 1.0 / rate if rate else 0.0
+
+        with self._count_transactions(report):
+            start = time.perf_counter()
+            for index, envelope in enumerate(envelopes):
+                if interval:
+                    # Ritmo objetivo: el mensaje i sale en start + i * interval
+                    delay = start + index * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                queries = self.env.cr.sql_log_count
+                sent_at = time.perf_counter()
+                try:
+                    ok = send(envelope)
+                except Exception as e:
+                    _logger.debug(f"Benchmark {name}: mensaje {index} falló: {e}")
+                    ok = False
+                report.add(time.perf_counter() - sent_at, self.env.cr.sql_log_count - queries, ok)
+            report.elapsed = time.perf_counter() - start
+
+        _logger.info(report.format())
+        return report
+
+    @contextmanager
+    def _count_transactions(self, report):
+        """Cuenta commits y rollbacks del cursor sin ejecutarlos"""
+        cr = self.env.cr
+
+        def commit():
+            report.commits += 1
+
+        def rollback():
+            report.rollbacks += 1
+
+        with patch.object(cr, 'commit', commit), patch.object(cr, 'rollback', rollback):
+            yield
+
+    def run_image_fetcher(self, name='image_fetcher'):
+        """
+        Descarga las imágenes pendientes (UrlFoto de los productos reproducidos)
+
+        Returns:
+            BenchmarkReport: Una entrada por lote de descarga
+        """
+        report = BenchmarkReport(name)
+        fetcher = self.env['nesto.sync.image.fetcher']
+        with self._count_transactions(report):
+            start = time.perf_counter()
+            while True:
+                queries = self.env.cr.sql_log_count
+                batch_start = time.perf_counter()
+                processed = fetcher.process_pending()
+                if not processed:
+                    break
+                report.add(time.perf_counter() - batch_start, self.env.cr.sql_log_count - queries)
+            report.elapsed = time.perf_counter() - start
+        _logger.info(report.format())
+        return report
@@ -0,0 +1,86 @@
+"""
+Servidor HTTP local de imágenes para benchmarks
+
+Sirve la misma imagen PNG en cualquier ruta, con ETag, para que la descarga
+de imágenes (nesto.sync.image.fetcher) funcione sin red. Corre en un hilo
+en 127.0.0.1 con un puerto libre.
+"""
+
+import base64
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# PNG de 1x1 píxel
+PNG_1X1 = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        etag = f'"{server.etag}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(server.content)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(server.content)
+
+    def log_message(self, format, *args):
+        # Sin log por petición (miles de peticiones en un benchmark)
+        pass
+
+
+class ImageStubServer:
+    """
+    Servidor de imágenes local (usar como context manager)
+
+    Ejemplo:
+        with ImageStubServer() as images:
+            factory = EnvelopeFactory(image_base_url=images.base_url)
+    """
+
+    def __init__(self, content=PNG_1X1):
+        self.content = content
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def requests(self):
+        """Peticiones recibidas"""
+        return self._server.requests if self._server else 0
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _ImageHandler)
+        self._server.daemon_threads = True
+        self._server.content = self.content
+        self._server.etag = hashlib.sha256(self.content).hexdigest()
+        self._server.requests = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
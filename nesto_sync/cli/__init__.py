@@ -0,0 +1 @@
+from . import nesto_pull
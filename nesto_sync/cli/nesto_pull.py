@@ -0,0 +1,53 @@
+"""
+Comando `odoo-bin nesto_pull` - Worker pull de larga duración
+
+Uso:
+    odoo-bin nesto_pull -c /etc/odoo/odoo.conf -d <base_de_datos>
+
+Lee la configuración de flujo (nesto_sync.pull_*) y la suscripción
+(nesto_sync.pull_subscription) de ir.config_parameter de la base de datos
+y consume hasta recibir SIGINT/SIGTERM.
+"""
+
+import logging
+import signal
+import sys
+from pathlib import Path
+
+import odoo
+from odoo import api, SUPERUSER_ID
+from odoo.cli import Command
+from odoo.tools import config
+
+from ..infrastructure.pull_worker import PullSubscriberWorker, PullWorkerSettings
+from ..infrastructure.subscriber_factory import SubscriberFactory
+
+_logger = logging.getLogger(__name__)
+
+
+class NestoPull(Command):
+    """Consume la suscripción PubSub de Nesto en modo pull"""
+
+    name = 'nesto_pull'
+
+    def run(self, cmdargs):
+        config.parser.prog = f'{Path(sys.argv[0]).name} {self.name}'
+        config.parse_config(cmdargs)
+
+        dbname = config['db_name']
+        if not dbname or ',' in dbname:
+            sys.exit("nesto_pull necesita una única base de datos (-d)")
+
+        registry = odoo.registry(dbname)
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            settings = PullWorkerSettings.from_env(env)
+            subscriber = SubscriberFactory.create_subscriber(env)
+
+        worker = PullSubscriberWorker(dbname, subscriber, settings)
+
+        def _terminate(signum, frame):
+            raise SystemExit()
+
+        signal.signal(signal.SIGTERM, _terminate)
+        worker.run_forever()
@@ -7,7 +7,10 @@ import traceback
 
 from ..models.google_pubsub_message_adapter import GooglePubSubMessageAdapter
 from ..core.entity_registry import EntityRegistry
+from ..core.batch_processor import BatchMessageProcessor
+from ..core.idempotency import DUPLICATE_RESPONSES
 from ..transformers.validators import RequirePrincipalClientError
+from ..infrastructure import json_codec
 
 _logger = logging.getLogger(__name__)
 
@@ -37,13 +40,10 @@ class NestoSyncController(http.Controller):
         entity_type = None
 
         try:
-            # Decodificar mensaje PubSub completo (incluyendo messageId)
-            adapter = GooglePubSubMessageAdapter()
-            message = adapter.decode_message(raw_data)
-
-            # Extraer messageId del envelope de PubSub
-            pubsub_envelope = json.loads(raw_data.decode('utf-8'))
-            message_id = pubsub_envelope.get('message', {}).get('messageId')
+            # Decodificar envelope PubSub completo (payload y messageId en un solo parseo)
+            envelope = GooglePubSubMessageAdapter().parse(raw_data)
+            message = envelope.data
+            message_id = envelope.message_id
 
             if not message_id:
                 _logger.warning("Mensaje sin messageId, no se puede trackear reintentos")
@@ -59,19 +59,44 @@ class NestoSyncController(http.Controller):
             # Nesto envía clientes con wrapper, pero productos planos
             message_data = self._extract_entity_data(message, entity_type)
 
-            # Obtener processor y service configurados para esta entidad
+            # Reentregas de PubSub, reenvíos idénticos de Nesto y mensajes
+            # obsoletos (ya se aplicó uno posterior de la misma clave): ACK sin procesar
+            Idempotency = request.env['nesto.sync.idempotency'].sudo()
+            check = Idempotency.check(
+                message_id, entity_type, self.entity_registry.get_config(entity_type), message_data,
+                publish_time=envelope.publish_time
+            )
+            if check and check.duplicate:
+                _logger.info(f"[{message_id}] Mensaje {check.duplicate}, ACK sin procesar")
+                return Response(status=200, response=DUPLICATE_RESPONSES[check.duplicate])
+
+            # Obtener processor y service configurados para esta entidad.
+            # El service no hace commit (batch_mode): los cambios, remember()
+            # y el fin del bloqueo de la clave (check) van en un único commit,
+            # así otro mensaje de la misma clave no pasa check() entre medias
             processor = self.entity_registry.get_processor(entity_type, request.env)
-            service = self.entity_registry.get_service(entity_type, request.env)
+            service = self.entity_registry.get_service(entity_type, request.env, batch_mode=True)
+
+            try:
+                # Procesar mensaje (transformar a formato Odoo)
+                processed_data = processor.process(message_data)
 
-            # Procesar mensaje (transformar a formato Odoo)
-            processed_data = processor.process(message_data)
+                # Crear o actualizar en Odoo
+                response = service.create_or_update_contact(processed_data)
+            except Exception:
+                # Deshacer lo aplicado por el mensaje antes de registrar el reintento
+                request.env.cr.rollback()
+                raise
 
-            # Crear o actualizar en Odoo
-            response = service.create_or_update_contact(processed_data)
+            if response.status_code != 200:
+                request.env.cr.rollback()
+                return response
 
             # Si llegamos aquí, el procesamiento fue exitoso
+            Idempotency.remember(check)
             if message_id:
                 self._mark_message_success(message_id)
+            request.env.cr.commit()
 
             return response
 
@@ -168,110 +193,90 @@ class NestoSyncController(http.Controller):
             # Sin messageId, hacer ACK para evitar loop infinito
             return Response(status=200, response=error_msg)
 
-    def _detect_entity_type(self, message):
+    @http.route('/nesto_sync/batch', auth='public', methods=['POST'], csrf=False)
+    def sync_nesto_batch(self, **post):
         """
-        Detecta el tipo de entidad del mensaje
+        Endpoint de sincronización por lotes
+
+        Acepta una lista de envelopes PubSub (formato push) y los procesa en
+        una única transacción, con un savepoint por mensaje y un solo commit
+        al final del lote. Cuerpo admitido:
+            {"messages": [{"message": {"data": "...", "messageId": "..."}}, ...]}
+        o directamente la lista de envelopes.
+
+        Devuelve siempre 200 con el resultado por mensaje (ack/nack), de forma
+        que el llamante decida qué mensajes confirmar y cuáles reintentar.
+        El tracking de reintentos y la DLQ se gestionan por mensaje.
+        """
+        raw_data = request.httprequest.data
+
+        try:
+            envelopes = self._parse_batch_envelopes(raw_data)
+        except ValueError as e:
+            _logger.error(f"Lote inválido: {str(e)}")
+            return Response(
+                response=json.dumps({'error': str(e)}),
+                status=400,
+                content_type='application/json'
+            )
+
+        processor = BatchMessageProcessor(request.env, self.entity_registry)
+        results = processor.process_batch(envelopes)
+
+        return Response(
+            response=json.dumps({'results': results}, ensure_ascii=False),
+            status=200,
+            content_type='application/json'
+        )
+
+    def _parse_batch_envelopes(self, raw_data):
+        """
+        Parsea el cuerpo de una petición de lote
 
         Args:
-            message: Dict con datos decodificados del mensaje
+            raw_data: Cuerpo crudo de la petición
 
         Returns:
-            str: Tipo de entidad ('cliente', 'proveedor', 'producto', etc.)
-            None: Si la tabla es conocida pero Odoo no la procesa
+            list: Envelopes PubSub (dicts)
 
         Raises:
-            ValueError: Si no se puede determinar el tipo
+            ValueError: Si el cuerpo no es JSON válido o no contiene una lista
         """
-        # Opción 1: Campo explícito "Tabla" (más confiable)
-        # Este campo lo añade Nesto y también _wrap_in_sync_message()
-        if 'Tabla' in message:
-            tabla = message['Tabla']
-            # Mapear nombre de tabla a entity_type
-            tabla_to_entity = {
-                'Clientes': 'cliente',
-                'Proveedores': 'proveedor',
-                'Productos': 'producto',
-            }
-            if tabla in tabla_to_entity:
-                return tabla_to_entity[tabla]
-
-            # Tablas conocidas que Odoo no procesa (otros consumidores las manejan)
-            tablas_ignoradas = {'PrestashopProductos'}
-            if tabla in tablas_ignoradas:
-                _logger.info(
-                    f"Tabla '{tabla}' conocida pero no procesada en Odoo, ignorando"
-                )
-                return None
+        try:
+            body = json_codec.loads(raw_data)
+        except ValueError as e:
+            raise ValueError(f"JSON inválido: {e}")
+
+        envelopes = body.get('messages') if isinstance(body, dict) else body
+        if not isinstance(envelopes, list):
+            raise ValueError("El lote debe ser una lista de mensajes o {'messages': [...]}")
 
+        max_messages = int(request.env['ir.config_parameter'].sudo().get_param(
+            'nesto_sync.batch_max_messages', BatchMessageProcessor.DEFAULT_MAX_MESSAGES
+        ))
+        if len(envelopes) > max_messages:
             raise ValueError(
-                f"Tabla '{tabla}' no está configurada. "
-                f"Tablas disponibles: {list(tabla_to_entity.keys())}"
+                f"El lote contiene {len(envelopes)} mensajes, máximo permitido: {max_messages}"
             )
 
-        # Opción 2: Campo entity_type explícito
-        if 'entity_type' in message:
-            return message['entity_type']
-
-        # Opción 3 (fallback): Detectar por campos presentes
-        # NOTA: Este método es menos confiable si el mensaje contiene múltiples entidades
-        if 'Cliente' in message:
-            return 'cliente'
-        elif 'Proveedor' in message:
-            return 'proveedor'
-        elif 'Producto' in message:
-            return 'producto'
-
-        # Si no se pudo detectar, error
-        raise ValueError(
-            "No se pudo determinar el tipo de entidad. "
-            "El mensaje debe incluir 'Tabla', 'entity_type' o campos identificables."
-        )
+        return envelopes
 
-    def _extract_entity_data(self, message, entity_type):
+    def _detect_entity_type(self, message):
         """
-        Extrae los datos de la entidad del mensaje
+        Detecta el tipo de entidad del mensaje
 
-        Nesto envía mensajes con diferentes estructuras:
-        - Clientes: {"Cliente": {...datos...}, "Origen": "...", "Usuario": "..."}
-        - Productos: {"Producto": "123", "Nombre": "...", ...} (plano)
+        Delegado en EntityRegistry para compartir la lógica con el
+        procesamiento por lotes (ver EntityRegistry.detect_entity_type)
+        """
+        return self.entity_registry.detect_entity_type(message)
 
-        Args:
-            message: Mensaje decodificado
-            entity_type: Tipo de entidad detectado
+    def _extract_entity_data(self, message, entity_type):
+        """
+        Extrae los datos de la entidad del mensaje
 
-        Returns:
-            dict: Datos de la entidad (extraídos o el mensaje completo si es plano)
+        Delegado en EntityRegistry (ver EntityRegistry.extract_entity_data)
         """
-        # Mapeo de entity_type a clave de wrapper
-        wrapper_keys = {
-            'cliente': 'Cliente',
-            'proveedor': 'Proveedor',
-            'producto': 'Producto',
-        }
-
-        wrapper_key = wrapper_keys.get(entity_type)
-
-        # Si existe la clave como objeto anidado, extraer
-        if wrapper_key and wrapper_key in message:
-            nested_data = message.get(wrapper_key)
-
-            # Verificar si es un objeto (dict) o un valor simple
-            if isinstance(nested_data, dict):
-                _logger.debug(
-                    f"Extrayendo datos anidados de clave '{wrapper_key}' "
-                    f"(estructura con wrapper)"
-                )
-                return nested_data
-            else:
-                # Es un valor simple (ej: "Producto": "123"), mensaje plano
-                _logger.debug(
-                    f"Mensaje plano detectado - '{wrapper_key}' contiene valor simple"
-                )
-                return message
-        else:
-            # No hay wrapper, mensaje plano
-            _logger.debug("Mensaje plano detectado - sin wrapper")
-            return message
+        return self.entity_registry.extract_entity_data(message, entity_type)
 
     def _handle_retry(self, message_id, raw_data, error_message, error_traceback, entity_type):
         """
@@ -328,35 +333,14 @@ class NestoSyncController(http.Controller):
             retry_count: Número de reintentos realizados
         """
         FailedMessage = request.env['nesto.sync.failed.message'].sudo()
-
-        # Verificar si ya existe (para evitar duplicados)
-        existing = FailedMessage.search([('message_id', '=', message_id)], limit=1)
-
-        if existing:
-            # Actualizar registro existente
-            existing.write({
-                'error_message': error_message,
-                'error_traceback': error_traceback,
-                'retry_count': retry_count,
-                'last_attempt_date': http.request.env.context.get('tz') or 'UTC',
-                'state': 'failed'
-            })
-            _logger.info(f"[{message_id}] Registro DLQ actualizado")
-        else:
-            # Crear nuevo registro en DLQ
-            from odoo import fields
-            FailedMessage.create({
-                'message_id': message_id,
-                'raw_data': raw_data.decode('utf-8') if isinstance(raw_data, bytes) else str(raw_data),
-                'entity_type': entity_type,
-                'error_message': error_message,
-                'error_traceback': error_traceback,
-                'retry_count': retry_count,
-                'state': 'failed',
-                'first_attempt_date': fields.Datetime.now(),
-                'last_attempt_date': fields.Datetime.now()
-            })
-            _logger.info(f"[{message_id}] Mensaje movido a DLQ después de {retry_count} intentos")
+        FailedMessage.store_failed_message(
+            message_id=message_id,
+            raw_data=raw_data,
+            error_message=error_message,
+            error_traceback=error_traceback,
+            entity_type=entity_type,
+            retry_count=retry_count
+        )
 
         # Commit para persistir el registro en DLQ
         request.env.cr.commit()
@@ -415,4 +399,37 @@ class NestoSyncController(http.Controller):
                 response=json.dumps({'error': str(e)}),
                 status=500,
                 content_type='application/json'
-            )
\ No newline at end of file
+            )
+
+    @http.route('/nesto_sync/stats', auth='public', methods=['GET'], csrf=False)
+    def get_stats(self, **kwargs):
+        """
+        Endpoint de estadísticas de publicación Odoo → Nesto e idempotencia
+
+        Returns:
+            JSON con las filas pendientes/en error del outbox y, por entidad,
+            los mensajes publicados y los ahorrados por coalescencia; y los
+            mensajes de Nesto descartados por duplicados u obsoletos (contadores del worker)
+        """
+        try:
+            from datetime import datetime
+
+            response_data = {
+                'outbox': request.env['nesto.sync.outbox'].sudo().get_stats(),
+                'idempotency': request.env['nesto.sync.idempotency'].sudo().get_stats(),
+                'timestamp': datetime.now().isoformat() + 'Z'
+            }
+
+            return Response(
+                response=json.dumps(response_data, ensure_ascii=False, indent=2),
+                status=200,
+                content_type='application/json'
+            )
+
+        except Exception as e:
+            _logger.error(f"Error obteniendo estadísticas: {str(e)}", exc_info=True)
+            return Response(
+                response=json.dumps({'error': str(e)}),
+                status=500,
+                content_type='application/json'
+            )
@@ -2,3 +2,4 @@ from . import entity_registry
 from . import generic_processor
 from . import generic_service
 from . import odoo_publisher
+from . import batch_processor
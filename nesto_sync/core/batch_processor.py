@@ -0,0 +1,211 @@
+"""
+Batch Message Processor - Procesamiento de lotes de mensajes PubSub
+
+Procesa una lista de envelopes PubSub en una única transacción:
+- Un savepoint por mensaje (un fallo no deshace el resto del lote)
+- Un único commit al final del lote (en lugar de uno por escritura)
+- Resultado ack/nack por mensaje, manteniendo el tracking de reintentos
+  y la DLQ (nesto.sync.message.retry / nesto.sync.failed.message) por mensaje
+
+Lo usan el endpoint /nesto_sync/batch y el consumidor en modo pull.
+"""
+
+import json
+import logging
+import traceback
+
+from .entity_registry import EntityRegistry
+from .idempotency import DUPLICATE_RESPONSES
+from ..models.google_pubsub_message_adapter import GooglePubSubMessageAdapter
+from ..infrastructure.lookup_cache import lookup_cache
+
+_logger = logging.getLogger(__name__)
+
+
+class BatchMessageProcessor:
+    """Procesa lotes de envelopes PubSub con un savepoint por mensaje"""
+
+    # Tamaño máximo de lote por defecto (nesto_sync.batch_max_messages)
+    DEFAULT_MAX_MESSAGES = 500
+
+    def __init__(self, env, entity_registry=None, test_mode=False):
+        """
+        Inicializa el processor de lotes
+
+        Args:
+            env: Environment de Odoo
+            entity_registry: EntityRegistry a usar (se crea uno si no se pasa)
+            test_mode: Si True, no hace commit al final del lote
+        """
+        self.env = env
+        self.entity_registry = entity_registry or EntityRegistry()
+        self.test_mode = test_mode
+        self.adapter = GooglePubSubMessageAdapter()
+
+    def process_batch(self, envelopes):
+        """
+        Procesa un lote de envelopes PubSub
+
+        Args:
+            envelopes: Lista de dicts con formato push de PubSub
+                {"message": {"data": "<base64>", "messageId": "..."}}
+
+        Returns:
+            Lista de dicts (uno por envelope, en el mismo orden) con:
+                - messageId: ID del mensaje (o None)
+                - ack: True si el mensaje debe confirmarse, False para reintentar
+                - status: Código HTTP equivalente al del endpoint unitario
+                - message: Resultado o error legible
+        """
+        _logger.info(f"Procesando lote de {len(envelopes)} mensajes")
+
+        results = [self._process_envelope(envelope) for envelope in envelopes]
+
+        # Un único commit por lote: los acks solo son válidos tras persistir
+        if not self.test_mode:
+            self.env.cr.commit()
+
+        acked = sum(1 for result in results if result['ack'])
+        _logger.info(
+            f"Lote procesado: {acked} ack, {len(results) - acked} nack "
+            f"de {len(results)} mensajes"
+        )
+
+        return results
+
+    def _process_envelope(self, envelope):
+        """
+        Procesa un único envelope dentro de su propio savepoint
+
+        Args:
+            envelope: Dict con formato push de PubSub
+
+        Returns:
+            Dict con el resultado del mensaje (ver process_batch)
+        """
+        message_id = None
+        if isinstance(envelope, dict):
+            message_id = (envelope.get('message') or {}).get('messageId')
+        entity_type = None
+
+        try:
+            with self.env.cr.savepoint():
+                parsed = self.adapter.parse_envelope(envelope)
+                message = parsed.data
+
+                entity_type = self.entity_registry.detect_entity_type(message)
+                if entity_type is None:
+                    _logger.info(f"[{message_id}] Tabla ignorada, ACK sin procesar")
+                    return self._result(message_id, True, 200, 'Tabla ignorada')
+
+                message_data = self.entity_registry.extract_entity_data(message, entity_type)
+
+                # Reentregas de PubSub, reenvíos idénticos de Nesto y mensajes
+                # obsoletos (ya se aplicó uno posterior de la misma clave): ACK sin procesar
+                Idempotency = self.env['nesto.sync.idempotency'].sudo()
+                check = Idempotency.check(
+                    message_id, entity_type, self.entity_registry.get_config(entity_type), message_data,
+                    publish_time=parsed.publish_time
+                )
+                if check and check.duplicate:
+                    _logger.info(f"[{message_id}] Mensaje {check.duplicate}, ACK sin procesar")
+                    return self._result(message_id, True, 200, DUPLICATE_RESPONSES[check.duplicate])
+
+                processor = self.entity_registry.get_processor(entity_type, self.env)
+                service = self.entity_registry.get_service(
+                    entity_type, self.env, test_mode=self.test_mode, batch_mode=True
+                )
+
+                processed_data = processor.process(message_data)
+                response = service.create_or_update_contact(processed_data)
+
+                response_body = self._response_body(response)
+                if response.status_code != 200:
+                    # Forzar rollback del savepoint: el mensaje no se aplicó
+                    raise ValueError(response_body)
+
+                Idempotency.remember(check)
+                if message_id:
+                    self.env['nesto.sync.message.retry'].sudo().mark_success(message_id)
+
+            return self._result(message_id, True, 200, response_body)
+
+        except Exception as e:
+            # El savepoint deshizo lo creado por el mensaje: sus lookups no son válidos
+            lookup_cache.discard_pending(self.env.cr)
+            return self._handle_failure(message_id, envelope, entity_type, e)
+
+    def _handle_failure(self, message_id, envelope, entity_type, error):
+        """
+        Registra el fallo de un mensaje (reintentos / DLQ) y decide ack o nack
+
+        Mismo criterio que el endpoint unitario:
+        - Sin messageId: ACK para evitar bucles infinitos
+        - Reintentos agotados: mover a DLQ y ACK
+        - En otro caso: NACK para que PubSub lo reentregue
+
+        Args:
+            message_id: ID del mensaje de PubSub
+            envelope: Envelope original (se guarda en la DLQ)
+            entity_type: Tipo de entidad (si se llegó a detectar)
+            error: Excepción producida
+
+        Returns:
+            Dict con el resultado del mensaje
+        """
+        error_msg = str(error)
+        error_trace = traceback.format_exc()
+        _logger.error(f"[{message_id}] Error en sincronización (lote): {error_msg}")
+
+        if not message_id:
+            return self._result(message_id, True, 200, error_msg)
+
+        try:
+            with self.env.cr.savepoint():
+                MessageRetry = self.env['nesto.sync.message.retry'].sudo()
+                retry_info = MessageRetry.increment_retry(
+                    message_id=message_id,
+                    error_message=error_msg,
+                    entity_type=entity_type
+                )
+
+                if retry_info['should_move_to_dlq']:
+                    self.env['nesto.sync.failed.message'].sudo().store_failed_message(
+                        message_id=message_id,
+                        raw_data=envelope,
+                        error_message=error_msg,
+                        error_traceback=error_trace,
+                        entity_type=entity_type,
+                        retry_count=retry_info['retry_count']
+                    )
+                    MessageRetry.mark_moved_to_dlq(message_id)
+        except Exception as e:
+            # Si ni siquiera se puede registrar el reintento, dejar que PubSub reintente
+            _logger.error(f"[{message_id}] Error registrando reintento: {str(e)}")
+            return self._result(message_id, False, 500, error_msg)
+
+        if retry_info['should_move_to_dlq']:
+            _logger.error(
+                f"[{message_id}] Error persistente después de "
+                f"{retry_info['retry_count']} intentos. Moviendo a DLQ."
+            )
+            return self._result(message_id, True, 200, error_msg)
+
+        return self._result(message_id, False, 500, error_msg)
+
+    def _response_body(self, response):
+        """Extrae el mensaje legible de una Response del service"""
+        try:
+            body = json.loads(response.response[0].decode())
+            return body.get('message') or body.get('error') or ''
+        except (ValueError, IndexError, AttributeError):
+            return ''
+
+    def _result(self, message_id, ack, status, message):
+        """Construye el resultado de un mensaje"""
+        return {
+            'messageId': message_id,
+            'ack': ack,
+            'status': status,
+            'message': message,
+        }
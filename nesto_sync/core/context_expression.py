@@ -0,0 +1,122 @@
+"""
+Context Expression - Expresiones seguras de los campos de tipo 'context'
+
+Los campos 'context' de entity_configs.py ('source': 'env.user.company_id.id')
+se evaluaban con eval() en cada mensaje. Solo se usan rutas de atributos
+desde el environment, así que se compilan una vez a una tupla de atributos
+y se resuelven con getattr, sin eval:
+
+    env.user.company_id.id  →  ('user', 'company_id', 'id')
+
+Gramática admitida: 'env' seguido de uno o más '.atributo' (identificadores
+que no empiezan por '_'). Cualquier otra expresión se rechaza al compilar.
+
+El resultado debe ser un valor simple (ID, texto, número o booleano): se
+guarda en context_value_cache por (base de datos, usuario, compañía), de
+modo que cada worker resuelve la expresión una vez y no en cada mensaje.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_PATH = re.compile(r'env(\.[A-Za-z][A-Za-z0-9_]*)+')
+
+SCALAR_TYPES = (bool, int, float, str)
+
+
+class ContextExpression:
+    """Ruta de atributos desde env compilada una vez"""
+
+    __slots__ = ('source', 'attributes')
+
+    def __init__(self, source):
+        """
+        Args:
+            source (str): Expresión (ej: 'env.user.company_id.id')
+
+        Raises:
+            ValueError: Si la expresión no es una ruta de atributos desde env
+        """
+        source = (source or '').strip()
+        if not _PATH.fullmatch(source):
+            raise ValueError(f"Expresión de contexto no soportada: {source!r}")
+        self.source = source
+        self.attributes = tuple(source.split('.')[1:])
+
+    def __call__(self, env):
+        """
+        Evalúa la expresión en un environment
+
+        Returns:
+            Valor simple o None
+
+        Raises:
+            ValueError: Si el resultado no es un valor simple (ej: un recordset)
+        """
+        value = env
+        for attribute in self.attributes:
+            value = getattr(value, attribute)
+
+        if value is not None and not isinstance(value, SCALAR_TYPES):
+            raise ValueError(
+                f"La expresión {self.source!r} debe devolver un valor simple (ej: terminar en .id)"
+            )
+        return value
+
+    def __repr__(self):
+        return f'ContextExpression({self.source!r})'
+
+
+class ContextValueCache:
+    """Caché LRU con TTL de valores de expresiones por usuario y compañía"""
+
+    MAX_SIZE = 1000
+    TTL = 300  # Segundos (cubre cambios hechos por otros workers)
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or self.MAX_SIZE
+        self.ttl = ttl or self.TTL
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, env, expression):
+        """
+        Valor de la expresión para el usuario y la compañía del environment
+
+        Args:
+            env: Environment de Odoo
+            expression (ContextExpression): Expresión compilada
+
+        Returns:
+            Valor cacheado o recién evaluado
+        """
+        key = (env.cr.dbname, env.uid, env.company.id, expression.source)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = expression(env)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Vacía la caché (ej: al cambiar la compañía de un usuario)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# Instancia compartida por todo el proceso
+context_value_cache = ContextValueCache()
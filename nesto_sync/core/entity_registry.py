@@ -5,8 +5,30 @@ El registry es el punto de entrada para obtener processors y services
 configurados para cada tipo de entidad.
 """
 
+import logging
+
 from .generic_processor import GenericEntityProcessor
 from .generic_service import GenericEntityService
+from .sync_index import SyncConfigIndex
+
+_logger = logging.getLogger(__name__)
+
+# Mapeo de nombre de tabla de Nesto a entity_type
+TABLA_TO_ENTITY = {
+    'Clientes': 'cliente',
+    'Proveedores': 'proveedor',
+    'Productos': 'producto',
+}
+
+# Tablas conocidas que Odoo no procesa (otros consumidores las manejan)
+TABLAS_IGNORADAS = {'PrestashopProductos'}
+
+# Mapeo de entity_type a clave de wrapper en el mensaje
+WRAPPER_KEYS = {
+    'cliente': 'Cliente',
+    'proveedor': 'Proveedor',
+    'producto': 'Producto',
+}
 
 
 class EntityRegistry:
@@ -48,7 +70,7 @@ class EntityRegistry:
         config = self.get_config(entity_type)
         return GenericEntityProcessor(env, config)
 
-    def get_service(self, entity_type, env, test_mode=False):
+    def get_service(self, entity_type, env, test_mode=False, batch_mode=False):
         """
         Obtiene un service configurado para una entidad
 
@@ -56,12 +78,103 @@ class EntityRegistry:
             entity_type: Tipo de entidad
             env: Environment de Odoo
             test_mode: Si True, no hace commits a la BD
+            batch_mode: Si True, ni commits ni rollbacks (los gestiona el lote)
 
         Returns:
             Instancia de GenericEntityService configurada
         """
         config = self.get_config(entity_type)
-        return GenericEntityService(env, config, test_mode)
+        return GenericEntityService(env, config, test_mode, batch_mode=batch_mode)
+
+    def detect_entity_type(self, message):
+        """
+        Detecta el tipo de entidad del mensaje
+
+        Args:
+            message: Dict con datos decodificados del mensaje
+
+        Returns:
+            str: Tipo de entidad ('cliente', 'proveedor', 'producto', etc.)
+            None: Si la tabla es conocida pero Odoo no la procesa
+
+        Raises:
+            ValueError: Si no se puede determinar el tipo
+        """
+        # Opción 1: Campo explícito "Tabla" (más confiable)
+        # Este campo lo añade Nesto y también _wrap_in_sync_message()
+        if 'Tabla' in message:
+            tabla = message['Tabla']
+            if tabla in TABLA_TO_ENTITY:
+                return TABLA_TO_ENTITY[tabla]
+
+            if tabla in TABLAS_IGNORADAS:
+                _logger.info(
+                    f"Tabla '{tabla}' conocida pero no procesada en Odoo, ignorando"
+                )
+                return None
+
+            raise ValueError(
+                f"Tabla '{tabla}' no está configurada. "
+                f"Tablas disponibles: {list(TABLA_TO_ENTITY.keys())}"
+            )
+
+        # Opción 2: Campo entity_type explícito
+        if 'entity_type' in message:
+            return message['entity_type']
+
+        # Opción 3 (fallback): Detectar por campos presentes
+        # NOTA: Este método es menos confiable si el mensaje contiene múltiples entidades
+        if 'Cliente' in message:
+            return 'cliente'
+        elif 'Proveedor' in message:
+            return 'proveedor'
+        elif 'Producto' in message:
+            return 'producto'
+
+        # Si no se pudo detectar, error
+        raise ValueError(
+            "No se pudo determinar el tipo de entidad. "
+            "El mensaje debe incluir 'Tabla', 'entity_type' o campos identificables."
+        )
+
+    def extract_entity_data(self, message, entity_type):
+        """
+        Extrae los datos de la entidad del mensaje
+
+        Nesto envía mensajes con diferentes estructuras:
+        - Clientes: {"Cliente": {...datos...}, "Origen": "...", "Usuario": "..."}
+        - Productos: {"Producto": "123", "Nombre": "...", ...} (plano)
+
+        Args:
+            message: Mensaje decodificado
+            entity_type: Tipo de entidad detectado
+
+        Returns:
+            dict: Datos de la entidad (extraídos o el mensaje completo si es plano)
+        """
+        wrapper_key = WRAPPER_KEYS.get(entity_type)
+
+        # Si existe la clave como objeto anidado, extraer
+        if wrapper_key and wrapper_key in message:
+            nested_data = message.get(wrapper_key)
+
+            # Verificar si es un objeto (dict) o un valor simple
+            if isinstance(nested_data, dict):
+                _logger.debug(
+                    f"Extrayendo datos anidados de clave '{wrapper_key}' "
+                    f"(estructura con wrapper)"
+                )
+                return nested_data
+
+            # Es un valor simple (ej: "Producto": "123"), mensaje plano
+            _logger.debug(
+                f"Mensaje plano detectado - '{wrapper_key}' contiene valor simple"
+            )
+            return message
+
+        # No hay wrapper, mensaje plano
+        _logger.debug("Mensaje plano detectado - sin wrapper")
+        return message
 
     def register_entity(self, entity_type, config):
         """
@@ -75,6 +188,8 @@ class EntityRegistry:
         sus propias entidades sin modificar entity_configs.py
         """
         self.configs[entity_type] = config
+        # El índice modelo → configuración se recompila en el siguiente acceso
+        SyncConfigIndex.clear()
 
     def get_registered_entities(self):
         """
@@ -11,6 +11,8 @@ from ..models.country_manager import CountryManager
 from ..transformers.field_transformers import FieldTransformerRegistry
 from ..transformers.validators import ValidatorRegistry
 from ..transformers.post_processors import PostProcessorRegistry
+from .processing_plan import ProcessingPlan, MISSING, FIXED, CONTEXT
+from .context_expression import context_value_cache
 
 _logger = logging.getLogger(__name__)
 
@@ -29,6 +31,8 @@ class GenericEntityProcessor:
         self.env = env
         self.config = entity_config
         self.country_manager = CountryManager(env)
+        self.plan = ProcessingPlan.for_config(entity_config)
+        self._context_values = None
 
     def process(self, message):
         """
@@ -54,7 +58,7 @@ class GenericEntityProcessor:
 
         # 3. Procesar jerarquía si aplica (children)
         children_values_list = []
-        if self.config.get('hierarchy', {}).get('enabled'):
+        if self.plan.hierarchical:
             children_values_list = self._process_children(message, parent_values)
 
         # 4. Aplicar post_processors
@@ -93,75 +97,83 @@ class GenericEntityProcessor:
             'entity_config': self.config
         }
 
-        # Seleccionar mapeo de campos apropiado (parent o child)
-        field_mappings = self.config.get('child_field_mappings', {}) if child_data else self.config.get('field_mappings', {})
+        # Pasos compilados apropiados (parent o child)
+        steps = self.plan.child_fields if child_data else self.plan.fields
+        source_data = child_data if child_data else message
 
         # Procesar cada mapeo de campo
-        for nesto_field, mapping in field_mappings.items():
-            self._process_field_mapping(nesto_field, mapping, message, values, context, child_data)
+        for step in steps:
+            self._run_step(step, source_data, values, context)
 
         # Añadir IDs externos
         self._add_external_ids(message, values, child_data)
 
         return values
 
-    def _process_field_mapping(self, nesto_field, mapping, message, values, context, child_data=None):
+    def _run_step(self, step, source_data, values, context):
         """
-        Procesa un mapeo de campo individual
+        Ejecuta el paso compilado de un mapeo de campo
 
         Args:
-            nesto_field: Nombre del campo en Nesto
-            mapping: Dict con configuración del mapeo
-            message: Mensaje original
+            step: FieldStep del ProcessingPlan
+            source_data: Datos de los que se extrae el valor (message o child_data)
             values: Dict donde se añaden los valores procesados
             context: Dict con contexto de ejecución
-            child_data: Datos del child si aplica
         """
         # Campos fijos
-        if mapping.get('type') == 'fixed':
-            values[mapping['odoo_field']] = mapping['value']
+        if step.kind is FIXED:
+            values[step.odoo_field] = step.value
             return
 
-        # Campos de contexto (evaluados dinámicamente)
-        if mapping.get('type') == 'context':
-            try:
-                # Evaluar expresión en contexto seguro
-                values[mapping['odoo_field']] = eval(
-                    mapping['source'],
-                    {'env': self.env},
-                    {}
-                )
-            except Exception as e:
-                _logger.error(f"Error evaluando campo de contexto {nesto_field}: {e}")
-                values[mapping['odoo_field']] = None
+        # Campos de contexto (evaluados una vez por environment)
+        if step.kind is CONTEXT:
+            values[step.odoo_field] = self._get_context_values()[step]
             return
 
         # Si el campo no viene en el mensaje, no tocar el valor existente
-        source_data = child_data if child_data else message
-        if not self._field_present_in_data(source_data, nesto_field):
+        nesto_value = step.extract(source_data)
+        if nesto_value is MISSING:
             return
 
-        # Obtener valor del mensaje
-        nesto_value = self._get_nested_value(source_data, nesto_field)
-
         # Aplicar default si es None y hay default
-        if nesto_value is None and 'default' in mapping:
-            nesto_value = mapping['default']
+        if nesto_value is None and step.has_default:
+            nesto_value = step.default
 
         # Validar campo requerido
-        if mapping.get('required') and not nesto_value:
-            raise ValueError(f"Campo requerido faltante: {nesto_field}")
+        if step.required and not nesto_value:
+            raise ValueError(f"Campo requerido faltante: {step.nesto_field}")
 
-        # Mapeo simple (sin transformer)
-        if 'odoo_field' in mapping and 'transformer' not in mapping:
-            values[mapping['odoo_field']] = nesto_value
+        # Mapeo con transformer
+        if step.transformer_name:
+            self._apply_transformer(step.transformer_name, nesto_value, values, context, step.transformer)
             return
 
-        # Mapeo con transformer
-        if 'transformer' in mapping:
-            self._apply_transformer(mapping['transformer'], nesto_value, values, context)
+        # Mapeo simple (sin transformer)
+        if step.odoo_field is not None:
+            values[step.odoo_field] = nesto_value
+
+    def _get_context_values(self):
+        """
+        Valores de los campos de tipo 'context' ({FieldStep: valor})
 
-    def _apply_transformer(self, transformer_name, value, values, context):
+        Solo dependen del usuario y la compañía: se resuelven una vez por
+        (usuario, compañía) en context_value_cache y se guardan en el
+        processor para reutilizarlos en el parent y en todos los children.
+        """
+        if self._context_values is None:
+            context_values = {}
+            for step in self.plan.context_steps:
+                try:
+                    if step.source is None:
+                        raise ValueError("expresión no soportada")
+                    context_values[step] = context_value_cache.get_or_load(self.env, step.source)
+                except Exception as e:
+                    _logger.error(f"Error evaluando campo de contexto {step.nesto_field}: {e}")
+                    context_values[step] = None
+            self._context_values = context_values
+        return self._context_values
+
+    def _apply_transformer(self, transformer_name, value, values, context, transformer=None):
         """
         Aplica un transformer a un valor
 
@@ -170,9 +182,11 @@ class GenericEntityProcessor:
             value: Valor a transformar
             values: Dict donde se añaden los valores transformados
             context: Dict con contexto
+            transformer: Instancia ya creada (la del plan); si no, se pide al registry
         """
         try:
-            transformer = FieldTransformerRegistry.get(transformer_name)
+            if transformer is None:
+                transformer = FieldTransformerRegistry.get(transformer_name)
             transformed = transformer.transform(value, context)
 
             # Procesar resultado del transformer
@@ -198,9 +212,7 @@ class GenericEntityProcessor:
             values: Dict donde se añaden los IDs
             child_data: Datos del child si aplica
         """
-        external_id_mapping = self.config.get('external_id_mapping', {})
-
-        for odoo_field, nesto_path in external_id_mapping.items():
+        for odoo_field, extract in self.plan.external_ids:
             # Determinar la fuente de datos según el campo
             if child_data:
                 # Si estamos procesando un child
@@ -214,7 +226,9 @@ class GenericEntityProcessor:
                 # Si es parent, todo viene del message
                 source = message
 
-            value = self._get_nested_value(source, nesto_path)
+            value = extract(source)
+            if value is MISSING:
+                value = None
 
             # Caso especial: mensajes PLANOS con PersonaContacto en la raíz
             # En mensajes jerárquicos, persona_contacto_externa viene de 'Id' dentro de PersonasContacto
@@ -243,12 +257,9 @@ class GenericEntityProcessor:
         Returns:
             Lista de dicts con valores de cada child
         """
-        hierarchy_config = self.config.get('hierarchy', {})
-        child_types = hierarchy_config.get('child_types', [])
-
         children_values_list = []
 
-        for child_type in child_types:
+        for child_type in self.plan.child_types:
             # Obtener lista de children de este tipo del mensaje
             children_data = message.get(child_type, [])
 
@@ -275,17 +286,16 @@ class GenericEntityProcessor:
         Returns:
             Tuple (parent_values, children_values_list) modificados
         """
-        post_processor_names = self.config.get('post_processors', [])
-
         context = {
             'env': self.env,
             'message': message,
             'entity_config': self.config
         }
 
-        for processor_name in post_processor_names:
+        for processor_name, processor in self.plan.post_processors:
             try:
-                processor = PostProcessorRegistry.get(processor_name)
+                if processor is None:
+                    processor = PostProcessorRegistry.get(processor_name)
                 parent_values, children_values_list = processor.process(
                     parent_values, children_values_list, context
                 )
@@ -306,16 +316,15 @@ class GenericEntityProcessor:
         Raises:
             Exception: Si algún validador falla
         """
-        validator_names = self.config.get('validators', [])
-
         context = {
             'env': self.env,
             'entity_config': self.config
         }
 
-        for validator_name in validator_names:
+        for validator_name, validator in self.plan.validators:
             try:
-                validator = ValidatorRegistry.get(validator_name)
+                if validator is None:
+                    validator = ValidatorRegistry.get(validator_name)
                 validator.validate(message, values, context)
             except Exception as e:
                 _logger.error(f"Error en validador {validator_name}: {e}")
@@ -334,58 +343,3 @@ class GenericEntityProcessor:
         # Esto se complementa con validate_required_fields validator
         # pero aquí hacemos una validación básica del mensaje en sí
         pass
-
-    def _get_nested_value(self, data, path):
-        """
-        Obtiene valor de un path anidado (ej: 'PersonaContacto.Id')
-
-        Args:
-            data: Dict con datos
-            path: String con path (puede tener puntos para anidamiento)
-
-        Returns:
-            Valor encontrado o None
-        """
-        if not path:
-            return None
-
-        if '.' not in path:
-            return data.get(path)
-
-        keys = path.split('.')
-        value = data
-
-        for key in keys:
-            if isinstance(value, dict):
-                value = value.get(key)
-            else:
-                return None
-
-        return value
-
-    def _field_present_in_data(self, data, path):
-        """
-        Comprueba si un campo existe como clave en los datos,
-        sin confundir ausencia con valor None.
-
-        Args:
-            data: Dict con datos
-            path: String con path (puede tener puntos para anidamiento)
-
-        Returns:
-            True si el campo existe en los datos
-        """
-        if not path or not isinstance(data, dict):
-            return False
-
-        if '.' not in path:
-            return path in data
-
-        keys = path.split('.')
-        current = data
-        for key in keys[:-1]:
-            if isinstance(current, dict) and key in current:
-                current = current[key]
-            else:
-                return False
-        return isinstance(current, dict) and keys[-1] in current
@@ -54,7 +54,7 @@ def _sanitize_value_for_logging(value):
 class GenericEntityService:
     """Service genérico para cualquier entidad"""
 
-    def __init__(self, env, entity_config, test_mode=False):
+    def __init__(self, env, entity_config, test_mode=False, batch_mode=False):
         """
         Inicializa el service
 
@@ -62,16 +62,24 @@ class GenericEntityService:
             env: Environment de Odoo
             entity_config: Dict con configuración de la entidad
             test_mode: Si True, no hace commits (para testing)
+            batch_mode: Si True, no hace commits ni rollbacks. El llamante
+                (BatchMessageProcessor) envuelve cada mensaje en un savepoint
+                y hace un único commit por lote.
         """
         self.env = env
         self.config = entity_config
         self.test_mode = test_mode
+        self.batch_mode = batch_mode
         self.model = env[entity_config['odoo_model']]
 
     def create_or_update_contact(self, processed_data):
         """
         Crea o actualiza un contacto principal y sus children
 
+        El parent y todos los children existentes se leen con un único
+        search_read (ver _load_snapshot) y los cambios se detectan sobre
+        esos diccionarios: como mucho un write por registro modificado.
+
         Args:
             processed_data: Dict con {'parent': {...}, 'children': [...]}
 
@@ -81,38 +89,55 @@ class GenericEntityService:
         parent_values = processed_data.get('parent', {})
         children_values_list = processed_data.get('children', [])
 
+        # Una sola lectura del parent y de todos los children existentes
+        snapshot = self._load_snapshot([parent_values] + children_values_list)
+
         # Rastrear si hubo cambios
         had_changes = False
 
         # Crear o actualizar el parent
-        parent_response = self._create_or_update_single(parent_values)
+        parent_response = self._create_or_update_single(parent_values, snapshot)
 
         # Si falló el parent, retornar error
         if parent_response.status_code != 200:
             return parent_response
 
         # Verificar si el parent tuvo cambios (creación o actualización)
-        parent_response_data = json.loads(parent_response.response[0].decode())
+        parent_response_data = self._response_data(parent_response)
         if parent_response_data.get('message') != 'Sin cambios':
             had_changes = True
 
-        # Obtener el parent_id para los children
-        parent_record = self._find_record(parent_values)
-        if parent_record:
-            # Crear o actualizar los children
+        # Obtener el parent_id para los children (del snapshot o de la respuesta de creación)
+        parent_row = snapshot.get(self._record_key(parent_values))
+        parent_id = parent_row['id'] if parent_row else parent_response_data.get('id')
+        if parent_id:
+            # Actualizar los children existentes y agrupar los nuevos
+            new_children = {}
             for child_values in children_values_list:
-                child_values['parent_id'] = parent_record.id
-                child_response = self._create_or_update_single(child_values)
+                child_values['parent_id'] = parent_id
+                child_key = self._record_key(child_values)
+
+                if child_key not in snapshot:
+                    # Si un child se repite en el mensaje, prevalecen sus últimos valores
+                    new_children[child_key] = dict(new_children.get(child_key, {}), **child_values)
+                    continue
+
+                child_response = self._create_or_update_single(child_values, snapshot)
 
                 # Si falla un child, loguear pero continuar
                 if child_response.status_code != 200:
                     _logger.warning(f"Falló creación/actualización de child: {child_response.response}")
                 else:
                     # Verificar si el child tuvo cambios
-                    child_response_data = json.loads(child_response.response[0].decode())
+                    child_response_data = self._response_data(child_response)
                     if child_response_data.get('message') != 'Sin cambios':
                         had_changes = True
 
+            # Crear todos los children nuevos con un único create
+            if new_children:
+                self._create_records(list(new_children.values()))
+                had_changes = True
+
         # Retornar mensaje apropiado según si hubo cambios
         message = 'Sincronización completada' if had_changes else 'Sin cambios'
         return Response(
@@ -121,24 +146,31 @@ class GenericEntityService:
             content_type='application/json'
         )
 
-    def _create_or_update_single(self, values):
+    def _create_or_update_single(self, values, snapshot=None):
         """
         Crea o actualiza un único registro
 
         Args:
             values: Dict con valores para el registro
+            snapshot: Dict {clave id_fields: valores actuales} de _load_snapshot.
+                Si no se pasa, el registro se busca con _find_record
 
         Returns:
             Response HTTP
         """
         # Buscar registro existente
-        record = self._find_record(values)
+        current_values = None
+        if snapshot is None:
+            record = self._find_record(values)
+        else:
+            current_values = snapshot.get(self._record_key(values))
+            record = self.model.sudo().browse(current_values['id']) if current_values else None
 
         if record:
             # Detectar cambios antes de actualizar (ANTI-BUCLE)
-            if self._has_changes(record, values):
+            if self._has_changes(record, values, current_values):
                 _logger.info(f"Cambios detectados, actualizando {self.config['odoo_model']}")
-                return self._update_record(record, values)
+                return self._update_record(record, values, current_values)
             else:
                 _logger.info(f"Sin cambios en {self.config['odoo_model']}, omitiendo actualización")
                 return Response(
@@ -149,7 +181,11 @@ class GenericEntityService:
         else:
             # Crear nuevo registro
             _logger.info(f"Creando nuevo {self.config['odoo_model']}")
-            return self._create_record(values)
+            response = self._create_record(values)
+            if snapshot is not None and response.status_code == 200:
+                # Registrar el nuevo registro por si se repite en el mismo mensaje
+                snapshot[self._record_key(values)] = dict(values, id=self._response_data(response).get('id'))
+            return response
 
     def _find_record(self, values):
         """
@@ -168,6 +204,67 @@ class GenericEntityService:
 
         return record if record else None
 
+    def _load_snapshot(self, values_list):
+        """
+        Lee en una sola consulta los registros existentes de una lista de valores
+
+        Busca por los id_fields de todos los valores a la vez (activos e
+        inactivos) y devuelve los campos que se van a comparar como dicts
+        planos (many2one como ID, sin name_get).
+
+        Args:
+            values_list: Lista de dicts de valores (parent y children)
+
+        Returns:
+            Dict {clave de id_fields: dict de valores actuales (incluye 'id')}
+        """
+        id_fields = self.config.get('id_fields', [])
+        if not id_fields or not values_list:
+            return {}
+
+        domain = []
+        for id_field in id_fields:
+            keys = {self._normalize_key_value(values.get(id_field)) for values in values_list}
+            if False in keys:
+                # False solo cubre NULL: '' también es "sin valor" (como en el índice único)
+                keys.add('')
+            domain.append((id_field, 'in', list(keys)))
+
+        field_names = set(id_fields)
+        for values in values_list:
+            field_names.update(field for field in values if field in self.model._fields)
+        parent_field = self.config.get('hierarchy', {}).get('parent_field')
+        if parent_field:
+            field_names.add(parent_field)
+
+        rows = self.model.sudo().with_context(active_test=False).search_read(
+            domain, list(field_names), load=None
+        )
+
+        # Mismo criterio que _find_record (limit=1): el primero en el orden del modelo
+        snapshot = {}
+        for row in rows:
+            snapshot.setdefault(self._record_key(row), row)
+        return snapshot
+
+    def _record_key(self, values):
+        """Clave de un registro según sus id_fields (None, False y '' equivalen)"""
+        return tuple(
+            self._normalize_key_value(values.get(id_field))
+            for id_field in self.config.get('id_fields', [])
+        )
+
+    @staticmethod
+    def _normalize_key_value(value):
+        if value is None or value is False or value == '':
+            return False
+        return str(value)
+
+    @staticmethod
+    def _response_data(response):
+        """Devuelve el cuerpo JSON de una Response del service"""
+        return json.loads(response.response[0].decode())
+
     def _build_search_domain(self, values):
         """
         Construye dominio de búsqueda basado en id_fields
@@ -193,7 +290,7 @@ class GenericEntityService:
 
         return domain
 
-    def _has_changes(self, record, new_values):
+    def _has_changes(self, record, new_values, current_values=None):
         """
         Detecta si hay cambios reales entre el registro y los nuevos valores
 
@@ -203,6 +300,8 @@ class GenericEntityService:
         Args:
             record: Recordset de Odoo
             new_values: Dict con nuevos valores
+            current_values: Dict con los valores actuales ya leídos (de
+                _load_snapshot). Si no se pasa, se leen del registro
 
         Returns:
             bool: True si hay cambios, False si todo es igual
@@ -214,7 +313,10 @@ class GenericEntityService:
                 continue
 
             # Obtener valor actual
-            current_value = getattr(record, field, None)
+            if current_values is not None and field in current_values:
+                current_value = current_values[field]
+            else:
+                current_value = getattr(record, field, None)
 
             # Comparar según tipo de campo
             if self._values_are_different(field, current_value, new_value, record):
@@ -265,7 +367,7 @@ class GenericEntityService:
 
         Args:
             field: Nombre del campo
-            current_value: Valor actual en Odoo
+            current_value: Valor actual en Odoo (del registro o de un read() sin name_get)
             new_value: Nuevo valor del mensaje
             record: Recordset de Odoo
 
@@ -276,13 +378,17 @@ class GenericEntityService:
 
         # Campos relacionales (many2one)
         if field_type == 'many2one':
-            current_id = current_value.id if current_value else None
+            if isinstance(current_value, models.BaseModel):
+                current_value = current_value.id
+            current_id = current_value or None
             new_id = new_value if isinstance(new_value, int) else None
             return current_id != new_id
 
         # Campos many2many o one2many
         if field_type in ('many2many', 'one2many'):
-            current_ids = set(current_value.ids) if current_value else set()
+            if isinstance(current_value, models.BaseModel):
+                current_value = current_value.ids
+            current_ids = set(current_value) if current_value else set()
             new_ids = set(new_value) if isinstance(new_value, (list, tuple)) else set()
             return current_ids != new_ids
 
@@ -349,8 +455,7 @@ class GenericEntityService:
                 if productos_kit_data is not None and self.config.get('odoo_model') == 'product.template':
                     self._sync_product_bom(record, productos_kit_data)
 
-                if not self.test_mode:
-                    self.env.cr.commit()
+                self._commit()
 
                 return Response(
                     response=json.dumps({
@@ -362,7 +467,7 @@ class GenericEntityService:
                 )
             else:
                 _logger.error(f"Error al crear {self.config['odoo_model']}")
-                self.env.cr.rollback()
+                self._rollback()
                 return Response(
                     response=json.dumps({'error': 'Error al crear registro'}),
                     status=500,
@@ -371,17 +476,49 @@ class GenericEntityService:
 
         except Exception as e:
             _logger.error(f"Excepción al crear {self.config['odoo_model']}: {str(e)}")
-            self.env.cr.rollback()
+            self._rollback()
             # Re-lanzar la excepción para que el controller active el sistema DLQ
             raise
 
-    def _update_record(self, record, values):
+    def _create_records(self, values_list):
+        """
+        Crea varios registros con un único create(vals_list) y un único commit
+
+        Args:
+            values_list: Lista de dicts con valores (sin campos especiales de BOM)
+
+        Returns:
+            Recordset con los registros creados
+        """
+        try:
+            values_list = [
+                {field: value for field, value in values.items() if field != '_productos_kit_data'}
+                for values in values_list
+            ]
+
+            # CRÍTICO: Añadir skip_sync=True para evitar bucle infinito
+            records = self.model.sudo().with_context(skip_sync=True).create(values_list)
+            _logger.info(
+                f"{len(records)} {self.config['odoo_model']} creados en bloque: IDs {records.ids}"
+            )
+
+            self._commit()
+            return records
+
+        except Exception as e:
+            _logger.error(f"Excepción al crear en bloque {self.config['odoo_model']}: {str(e)}")
+            self._rollback()
+            # Re-lanzar la excepción para que el controller active el sistema DLQ
+            raise
+
+    def _update_record(self, record, values, current_values=None):
         """
         Actualiza un registro existente
 
         Args:
             record: Recordset de Odoo
             values: Dict con valores a actualizar
+            current_values: Dict con los valores actuales ya leídos (opcional)
 
         Returns:
             Response HTTP
@@ -406,7 +543,10 @@ class GenericEntityService:
             # Esto evita que se disparen validaciones de unicidad innecesarias
             for id_field in self.config.get('id_fields', []):
                 if id_field in values:
-                    current_value = record[id_field]
+                    if current_values is not None and id_field in current_values:
+                        current_value = current_values[id_field]
+                    else:
+                        current_value = record[id_field]
                     new_value = values[id_field]
 
                     # Si el valor no ha cambiado, eliminarlo de la actualización
@@ -426,8 +566,7 @@ class GenericEntityService:
             if productos_kit_data is not None and self.config.get('odoo_model') == 'product.template':
                 self._sync_product_bom(record, productos_kit_data)
 
-            if not self.test_mode:
-                self.env.cr.commit()
+            self._commit()
 
             return Response(
                 response=json.dumps({
@@ -440,10 +579,20 @@ class GenericEntityService:
 
         except Exception as e:
             _logger.error(f"Error al actualizar {self.config['odoo_model']}: {str(e)}")
-            self.env.cr.rollback()
+            self._rollback()
             # Re-lanzar la excepción para que el controller active el sistema DLQ
             raise
 
+    def _commit(self):
+        """Hace commit salvo en modo test o dentro de un lote"""
+        if not self.test_mode and not self.batch_mode:
+            self.env.cr.commit()
+
+    def _rollback(self):
+        """Hace rollback salvo dentro de un lote (lo deshace el savepoint del mensaje)"""
+        if not self.batch_mode:
+            self.env.cr.rollback()
+
     def _sync_product_bom(self, product_record, productos_kit_data):
         """
         Sincroniza la BOM de un producto usando el post-processor SyncProductBom
@@ -0,0 +1,212 @@
+"""
+Idempotency - Descarte de mensajes de Nesto ya aplicados
+
+Pub/Sub entrega al menos una vez y Nesto reenvía actualizaciones idénticas.
+Antes, cada reentrega recorría el processor completo, los lookups de
+categorías/UoM y _has_changes para concluir "Sin cambios". Este módulo
+permite descartarlas antes de despachar a EntityRegistry:
+
+- Por messageId: una reentrega de un mensaje ya aplicado. Se guarda en una
+  LRU por proceso (respuesta en microsegundos, sin consultas) y en la tabla
+  nesto.sync.idempotency (para reentregas que llegan a otro worker)
+- Por (entidad, hash del payload): el mismo contenido para la misma clave
+  externa que el último aplicado. Solo en la tabla: una edición en Odoo
+  borra la fila (ver BidirectionalSyncMixin), y una LRU por proceso no se
+  enteraría de ello en los demás workers
+- Por orden (mensaje obsoleto): la fila del payload guarda también el
+  publishTime de Pub/Sub del último mensaje aplicado para esa clave. Un
+  mensaje publicado antes (reintento tardío, entrega en paralelo) se
+  descarta en lugar de sobrescribir la versión más reciente. Mientras se
+  procesa un mensaje con publishTime, su clave queda bloqueada (advisory
+  lock de la transacción), así que dos workers no aplican a la vez mensajes
+  de la misma clave y el procesamiento concurrente no pierde el orden
+
+Las filas caducan a las nesto_sync.idempotency_ttl_hours horas (0 desactiva
+el descarte). Los contadores son por proceso (ver /nesto_sync/stats).
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from ..infrastructure import json_codec
+from .processing_plan import ProcessingPlan, MISSING
+
+MESSAGE = 'message'
+PAYLOAD = 'payload'
+STALE = 'stale'
+
+# Respuesta (ACK) a un mensaje descartado, por motivo
+DUPLICATE_RESPONSES = {
+    MESSAGE: 'Mensaje duplicado',
+    PAYLOAD: 'Mensaje duplicado',
+    STALE: 'Mensaje obsoleto',
+}
+
+# Fracción de segundo de un timestamp RFC 3339 (Pub/Sub da nanosegundos)
+_FRACTION = re.compile(r'\.(\d+)')
+
+
+def normalize_key_value(value):
+    """Valor de una clave externa comparable entre el mensaje y el registro de Odoo"""
+    if value is None or value is False or value is MISSING:
+        return ''
+    return str(value).strip()
+
+
+def entity_key(config, data):
+    """
+    Clave externa de un mensaje (ej: '15191|0|' para cliente|contacto|persona)
+
+    Args:
+        config (dict): Configuración de la entidad
+        data (dict): Datos de la entidad (ya extraídos del wrapper)
+
+    Returns:
+        str: Valores de external_id_mapping separados por '|' ('' si no hay ninguno)
+    """
+    values = [normalize_key_value(extract(data)) for _field, extract in ProcessingPlan.for_config(config).external_ids]
+    return '|'.join(values) if any(values) else ''
+
+
+def record_key(config, record):
+    """
+    Clave externa de un registro de Odoo (la misma que la de su mensaje)
+
+    Args:
+        config (dict): Configuración de la entidad
+        record: Registro de Odoo (un solo registro)
+
+    Returns:
+        str: Valores de los campos de external_id_mapping separados por '|'
+    """
+    values = [
+        normalize_key_value(record[field] if field in record._fields else None)
+        for field in config.get('external_id_mapping', {})
+    ]
+    return '|'.join(values) if any(values) else ''
+
+
+def parse_publish_time(value):
+    """
+    publishTime de Pub/Sub como datetime UTC naive (precisión de microsegundos)
+
+    Acepta '2024-01-15T10:30:00.123456789Z' (push) y el isoformat de los
+    mensajes en modo pull ('2024-01-15T10:30:00.123456+00:00').
+
+    Returns:
+        datetime o None si no hay publishTime o no se puede interpretar
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip().replace('Z', '+00:00').replace('z', '+00:00')
+        text = _FRACTION.sub(lambda match: '.' + match.group(1)[:6].ljust(6, '0'), text, count=1)
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def payload_hash(data):
+    """SHA-256 del payload serializado de forma canónica"""
+    return hashlib.sha256(json_codec.dumps_canonical(data)).hexdigest()
+
+
+class IdempotencyCheck:
+    """
+    Resultado de comprobar un mensaje
+
+    Atributos:
+        message_id: messageId de PubSub (o None)
+        entity_type: Tipo de entidad
+        entity_key: Clave externa del mensaje ('' si no se puede identificar)
+        payload_hash: Hash del payload
+        published_at: publishTime del mensaje (datetime UTC o None)
+        duplicate: None, MESSAGE (messageId ya aplicado), PAYLOAD (mismo
+            contenido) o STALE (ya se aplicó un mensaje posterior de la clave)
+    """
+
+    __slots__ = ('message_id', 'entity_type', 'entity_key', 'payload_hash', 'published_at', 'duplicate')
+
+    def __init__(self, message_id, entity_type, entity_key, payload_hash, published_at=None, duplicate=None):
+        self.message_id = message_id
+        self.entity_type = entity_type
+        self.entity_key = entity_key
+        self.payload_hash = payload_hash
+        self.published_at = published_at
+        self.duplicate = duplicate
+
+    @property
+    def payload_key(self):
+        """Clave de la fila del payload en nesto.sync.idempotency"""
+        return f'{self.entity_type}:{self.entity_key}' if self.entity_key else None
+
+
+class IdempotencyCache:
+    """LRU por proceso de messageIds aplicados y contadores de trabajo ahorrado"""
+
+    MAX_SIZE = 50000
+    COUNTERS = ('checked', 'skipped_message', 'skipped_payload', 'skipped_stale', 'recorded')
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or self.MAX_SIZE
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def seen(self, dbname, message_id):
+        """True si el messageId ya se aplicó (y no ha caducado) en este proceso"""
+        if not message_id:
+            return False
+        key = (dbname, message_id)
+        with self._lock:
+            expires = self._seen.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._seen[key]
+                return False
+            self._seen.move_to_end(key)
+            return True
+
+    def add(self, dbname, message_id, ttl_seconds):
+        """Recuerda un messageId aplicado (llamar tras el commit)"""
+        if not message_id:
+            return
+        with self._lock:
+            self._seen[(dbname, message_id)] = time.monotonic() + ttl_seconds
+            self._seen.move_to_end((dbname, message_id))
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+
+    def count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def get_counters(self):
+        """Contadores del proceso (checked, skipped_*, recorded)"""
+        with self._lock:
+            return dict(self._counters)
+
+    def clear(self):
+        """Vacía la LRU y los contadores"""
+        with self._lock:
+            self._seen.clear()
+            self._counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._seen)
+
+
+# Instancia compartida por todo el proceso
+idempotency_cache = IdempotencyCache()
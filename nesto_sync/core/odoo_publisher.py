@@ -11,9 +11,13 @@ Usa la misma configuración declarativa (entity_configs.py)
 import logging
 from ..config.entity_configs import get_entity_config
 from ..infrastructure.publisher_factory import PublisherFactory
+from .publish_plan import PublishPlan, KEEP_EMPTY_FIELDS
 
 _logger = logging.getLogger(__name__)
 
+# Campos de transformers multi-campo que se envían aunque estén vacíos
+ALWAYS_INCLUDE_FIELDS = ('VendedorEmail',)
+
 
 class OdooPublisher:
     """
@@ -23,18 +27,23 @@ class OdooPublisher:
     Usa entity_configs para saber cómo mapear campos Odoo → Nesto.
     """
 
-    def __init__(self, entity_type, env):
+    def __init__(self, entity_type, env, publisher=None):
         """
         Inicializa el publisher
 
         Args:
             entity_type (str): Tipo de entidad ('cliente', 'producto', etc.)
             env: Odoo environment
+            publisher (IEventPublisher, optional): Publisher a reutilizar
+                (por defecto se crea con PublisherFactory)
         """
         self.entity_type = entity_type
         self.env = env
         self.config = get_entity_config(entity_type)
-        self.publisher = PublisherFactory.create_publisher(env)
+        self.plan = PublishPlan.for_entity(entity_type, self.config)
+        self.publisher = publisher or PublisherFactory.create_publisher(env)
+        # Children y BOMs precargados por build_messages() para el lote en curso
+        self._batch = None
 
     def publish_record(self, record):
         """
@@ -47,14 +56,8 @@ class OdooPublisher:
             bool: True si se publicó correctamente
         """
         try:
-            # 1. Construir mensaje en formato Nesto
-            data = self._build_message_from_odoo(record)
-
-            # 2. Envolver en estructura ExternalSyncMessageDTO
-            message = self._wrap_in_sync_message(data, record)
-
-            # 3. Obtener topic configurado
-            topic = self.config.get('pubsub_topic', 'sincronizacion-tablas')
+            # 1-3. Construir mensaje en formato Nesto y obtener topic
+            topic, message = self.build_message(record)
 
             # 4. Publicar
             # Obtener identificadores para mejor logging
@@ -68,7 +71,7 @@ class OdooPublisher:
                 f"(Cliente={cliente}, Contacto={contacto}, PersonaContacto={persona})"
             )
 
-            self.publisher.publish_event(topic, message)
+            self.publisher.publish_event(topic, message, ordering_key=self.ordering_key(record))
 
             return True
 
@@ -79,11 +82,160 @@ class OdooPublisher:
             )
             return False
 
+    def publish_records(self, records):
+        """
+        Publica varios registros construyendo sus mensajes por lotes
+
+        Los children, BOMs y campos relacionados de todos los registros se
+        cargan con unas pocas consultas agrupadas (ver build_messages).
+
+        Args:
+            records: Recordset del modelo de la entidad
+
+        Returns:
+            int: Número de registros publicados
+        """
+        messages, errors = self.build_messages(records)
+
+        for record_id, error in errors.items():
+            _logger.error(f"Error construyendo mensaje de {self.entity_type} ID {record_id}: {error}")
+
+        published = 0
+        for record in records:
+            if record.id not in messages:
+                continue
+            topic, message = messages[record.id]
+            try:
+                _logger.info(
+                    f"Publicando {self.entity_type} desde Odoo: {record._name} ID {record.id}"
+                )
+                self.publisher.publish_event(topic, message, ordering_key=self.ordering_key(record))
+                published += 1
+            except Exception as e:
+                _logger.error(
+                    f"Error publicando {self.entity_type} ID {record.id}: {str(e)}",
+                    exc_info=True
+                )
+
+        return published
+
+    def ordering_key(self, record):
+        """
+        Ordering key de Pub/Sub de un registro: entidad y clave externa principal
+
+        Los mensajes de un mismo cliente (con todos sus contactos) o producto
+        comparten clave y Pub/Sub los entrega en el orden en que se publicaron.
+
+        Args:
+            record: Registro de Odoo
+
+        Returns:
+            str: Ej: 'cliente:15191', o None si el registro no tiene clave externa
+        """
+        field = self.plan.ordering_key_field
+        value = record[field] if field and field in record._fields else None
+        if value in (None, False, ''):
+            return None
+        return f"{self.entity_type}:{str(value).strip()}"
+
+    def build_messages(self, records):
+        """
+        Construye los mensajes de varios registros, sin publicarlos
+
+        Antes de construir, precarga para todo el recordset:
+        - Los campos del plan y los que leen sus transformers (vendedor, provincia...)
+        - Los children (una búsqueda para todos los padres) y sus campos
+        - Las BOMs activas, sus líneas y el producto_externo de los componentes
+
+        Args:
+            records: Recordset del modelo de la entidad
+
+        Returns:
+            tuple: ({record_id: (topic, mensaje)}, {record_id: error})
+        """
+        messages = {}
+        errors = {}
+        if not records:
+            return messages, errors
+
+        self._batch = self._prefetch_batch(records)
+        try:
+            for record in records:
+                try:
+                    messages[record.id] = self.build_message(record)
+                except Exception as e:
+                    errors[record.id] = str(e)
+        finally:
+            self._batch = None
+
+        return messages, errors
+
+    def _prefetch_batch(self, records):
+        """
+        Carga children y BOMs de todo el lote con consultas agrupadas
+
+        Returns:
+            dict con 'children' {parent_id: recordset} y/o 'boms' {template_id: mrp.bom}
+        """
+        plan = self.plan
+        batch = {}
+
+        plan.prefetch(records, plan.record_paths)
+
+        if plan.hierarchical:
+            children = self.env[self.config['odoo_model']].search([
+                (plan.parent_field, 'in', records.ids)
+            ])
+            plan.prefetch(children, plan.child_paths)
+
+            # Agrupar respetando el orden de la búsqueda
+            children_ids = {record_id: [] for record_id in records.ids}
+            for child in children:
+                children_ids[child[plan.parent_field].id].append(child.id)
+            batch['children'] = {
+                record_id: children.browse(ids).with_prefetch(children._prefetch_ids)
+                for record_id, ids in children_ids.items()
+            }
+
+        if self.entity_type == 'producto':
+            boms = self.env['mrp.bom'].search([
+                ('product_tmpl_id', 'in', records.ids),
+                ('active', '=', True)
+            ])
+            boms.mapped('bom_line_ids.product_id.product_tmpl_id.producto_externo')
+
+            # La primera BOM de cada producto en el orden del modelo (como search limit=1)
+            batch['boms'] = {}
+            for bom in boms:
+                batch['boms'].setdefault(bom.product_tmpl_id.id, bom)
+
+        return batch
+
+    def build_message(self, record):
+        """
+        Construye el mensaje a publicar para un registro, sin publicarlo
+
+        Args:
+            record: Registro de Odoo
+
+        Returns:
+            tuple: (topic, mensaje ExternalSyncMessageDTO)
+        """
+        # 1. Construir mensaje en formato Nesto
+        data = self._build_message_from_odoo(record)
+
+        # 2. Envolver en estructura ExternalSyncMessageDTO
+        message = self._wrap_in_sync_message(data, record)
+
+        # 3. Obtener topic configurado
+        return self.plan.topic, message
+
     def _build_message_from_odoo(self, record):
         """
         Construye mensaje en formato Nesto a partir de registro Odoo
 
         Este método convierte de Odoo → Nesto (inverso de GenericProcessor)
+        recorriendo el plan compilado de la entidad (ver core/publish_plan.py)
 
         Args:
             record: Registro de Odoo
@@ -92,60 +244,37 @@ class OdooPublisher:
             dict: Mensaje en formato Nesto (idéntico al que envía NestoAPI)
         """
         message = {}
-
-        # Mapeo de campos según reverse_field_mappings
-        # SIEMPRE inferir desde field_mappings primero
-        reverse_mappings = self._infer_reverse_mappings()
-
-        # Sobrescribir con reverse_field_mappings explícitos (para identificadores)
-        explicit_mappings = self.config.get('reverse_field_mappings', {})
-        if explicit_mappings:
-            reverse_mappings.update(explicit_mappings)
+        serialize = self._serialize_odoo_value
 
         # Procesar cada campo de Odoo → Nesto
-        for odoo_field, mapping in reverse_mappings.items():
-            nesto_field = mapping.get('nesto_field')
-            if not nesto_field:
-                continue
-
-            # Obtener valor del registro
-            value = getattr(record, odoo_field, None)
-
-            # Serializar objetos Odoo (Many2one, Many2many, etc.)
-            value = self._serialize_odoo_value(value)
+        for odoo_field, nesto_field, transform, read_value in self.plan.fields:
+            # Obtener valor del registro y serializar objetos Odoo (Many2one, Many2many, etc.)
+            value = serialize(getattr(record, odoo_field, None)) if read_value else None
 
             # Aplicar transformer inverso si existe
-            if 'reverse_transformer' in mapping:
-                transformer_name = mapping['reverse_transformer']
-                transformed_value = self._apply_reverse_transformer(
-                    transformer_name, value, record, mapping
-                )
+            if transform is not None:
+                value = transform(value, record)
 
                 # Si el transformer devuelve un dict, es un transformer multi-campo
                 # Ejemplo: {'Tamanno': 50, 'UnidadMedida': 'ml'}
-                if isinstance(transformed_value, dict):
-                    # Añadir todos los campos del dict al mensaje
+                if isinstance(value, dict):
                     # Algunos campos DEBEN enviarse aunque estén vacíos (ej: VendedorEmail)
                     # para indicar "quitar vendedor" vs "no modificar vendedor"
-                    fields_always_include = ('VendedorEmail',)
-                    for key, val in transformed_value.items():
-                        if val not in (None, False, '', 0) or key in fields_always_include:
+                    for key, val in value.items():
+                        if val not in (None, False, '', 0) or key in ALWAYS_INCLUDE_FIELDS:
                             message[key] = val
-                    # Continuar con el siguiente campo
                     continue
-                else:
-                    value = transformed_value
 
             # Solo añadir el campo si tiene valor real
             # Omitir: None, False, 0, string vacío
             # Excepto para campos que son genuinamente booleanos en Nesto
-            if value in (None, False, '', 0) and nesto_field not in ('ClientePrincipal',):
+            if value in (None, False, '', 0) and nesto_field not in KEEP_EMPTY_FIELDS:
                 continue
 
             message[nesto_field] = value
 
         # Procesar children si es jerárquico
-        if self.config.get('hierarchy', {}).get('enabled'):
+        if self.plan.hierarchical:
             self._add_children_to_message(record, message)
 
         # Procesar ProductosKit si es un producto
@@ -184,7 +313,7 @@ class OdooPublisher:
         message = data.copy()
 
         # Añadir metadatos
-        message["Tabla"] = self.config.get('nesto_table', 'Clientes')
+        message["Tabla"] = self.plan.nesto_table
         message["Source"] = "Odoo"
 
         # Añadir Usuario en formato ODOO\login (barra invertida + login)
@@ -193,292 +322,6 @@ class OdooPublisher:
 
         return message
 
-    def _infer_reverse_mappings(self):
-        """
-        Infiere reverse_field_mappings desde field_mappings
-
-        Si no se definió reverse_field_mappings explícitamente,
-        lo generamos automáticamente desde field_mappings
-
-        Returns:
-            dict: Reverse mappings inferidos
-        """
-        reverse = {}
-        field_mappings = self.config.get('field_mappings', {})
-
-        for nesto_field, mapping in field_mappings.items():
-            # Saltar campos internos (que empiezan con _)
-            # Estos son solo para sincronización Nesto → Odoo
-            if nesto_field.startswith('_'):
-                continue
-
-            # Campos simples
-            if 'odoo_field' in mapping:
-                odoo_field = mapping['odoo_field']
-                reverse[odoo_field] = {
-                    'nesto_field': nesto_field
-                }
-
-            # Campos con transformer
-            elif 'odoo_fields' in mapping:
-                for odoo_field in mapping['odoo_fields']:
-                    if odoo_field not in reverse:
-                        reverse[odoo_field] = {
-                            'nesto_field': nesto_field,
-                            'reverse_transformer': mapping.get('transformer')
-                        }
-
-        return reverse
-
-    def _infer_reverse_child_mappings(self):
-        """
-        Infiere reverse_child_field_mappings desde child_field_mappings
-
-        Análogo a _infer_reverse_mappings pero para children
-
-        Returns:
-            dict: Reverse mappings inferidos para children
-        """
-        reverse = {}
-        child_field_mappings = self.config.get('child_field_mappings', {})
-
-        for nesto_field, mapping in child_field_mappings.items():
-            # Saltar campos internos (que empiezan con _)
-            # Estos son solo para sincronización Nesto → Odoo
-            if nesto_field.startswith('_'):
-                continue
-
-            # Campos simples
-            if 'odoo_field' in mapping:
-                odoo_field = mapping['odoo_field']
-                reverse[odoo_field] = {
-                    'nesto_field': nesto_field
-                }
-
-            # Campos con transformer
-            elif 'odoo_fields' in mapping:
-                for odoo_field in mapping['odoo_fields']:
-                    if odoo_field not in reverse:
-                        reverse[odoo_field] = {
-                            'nesto_field': nesto_field,
-                            'reverse_transformer': mapping.get('transformer')
-                        }
-
-        return reverse
-
-    def _apply_reverse_transformer(self, transformer_name, value, record, mapping):
-        """
-        Aplica transformer inverso (Odoo → Nesto)
-
-        Por ejemplo:
-        - 'phone' transformer (Nesto → Odoo): "666111111/912345678" → mobile="666111111", phone="912345678"
-        - Reverse transformer (Odoo → Nesto): mobile="666111111", phone="912345678" → "666111111/912345678"
-
-        Args:
-            transformer_name (str): Nombre del transformer
-            value: Valor actual del campo
-            record: Registro completo (para obtener otros campos si es necesario)
-            mapping: Configuración del mapeo
-
-        Returns:
-            Valor transformado
-        """
-        # Implementación de transformers inversos
-        if transformer_name == 'phone':
-            # Combinar mobile + phone en formato "mobile/phone"
-            # Si solo hay mobile, devolver solo mobile
-            mobile = getattr(record, 'mobile', None) or ''
-            phone = getattr(record, 'phone', None) or ''
-
-            if mobile and phone:
-                return f"{mobile}/{phone}"
-            elif mobile:
-                return mobile
-            elif phone:
-                return phone
-            else:
-                return None
-
-        elif transformer_name == 'country_state':
-            # Convertir state_id (Many2one) a nombre de provincia EN MAYÚSCULAS
-            state = getattr(record, 'state_id', None)
-            if state and hasattr(state, 'name'):
-                return state.name.upper()
-            return None
-
-        elif transformer_name == 'estado_to_active':
-            # Convertir active (bool) a Estado (int)
-            # active=True → Estado=9, active=False → Estado=-1
-            active = getattr(record, 'active', True)
-            return 9 if active else -1
-
-        elif transformer_name == 'cliente_principal':
-            # Convertir type a ClientePrincipal (bool)
-            # type='invoice' → ClientePrincipal=true
-            # type='delivery' → ClientePrincipal=false
-            record_type = getattr(record, 'type', 'delivery')
-            return record_type == 'invoice'
-
-        elif transformer_name == 'spain_country':
-            # No enviar country_id en mensajes salientes
-            # (es un campo fijo solo para entrada)
-            return None
-
-        elif transformer_name == 'cargos':
-            # Convertir function (string) a número de cargo
-            # Usar mapeo inverso de cargos_funciones
-            from ..models.cargos import cargos_funciones
-
-            # Crear diccionario inverso: string → código
-            funciones_cargos = {v: k for k, v in cargos_funciones.items()}
-
-            # Buscar el código correspondiente al string
-            if value and isinstance(value, str):
-                cargo_code = funciones_cargos.get(value)
-                return cargo_code if cargo_code else None
-
-            return None
-
-        elif transformer_name == 'ficticio_to_detailed_type':
-            # Convertir detailed_type (odoo) a Ficticio (nesto)
-            # 'product' → Ficticio=0
-            # 'service' → Ficticio=1 (con Grupo=CUR)
-            # 'consu' → Ficticio=1
-            detailed_type = getattr(record, 'detailed_type', 'product')
-
-            if detailed_type == 'product':
-                return 0  # Almacenable
-            else:
-                return 1  # Ficticio (service o consumible)
-
-        elif transformer_name == 'grupo':
-            # Convertir grupo_id (Many2one a product.category) a nombre de Grupo
-            grupo = getattr(record, 'grupo_id', None)
-            if grupo and hasattr(grupo, 'name'):
-                return grupo.name
-            return None
-
-        elif transformer_name == 'subgrupo':
-            # Convertir subgrupo_id (Many2one a product.category) a nombre de Subgrupo
-            subgrupo = getattr(record, 'subgrupo_id', None)
-            if subgrupo and hasattr(subgrupo, 'name'):
-                return subgrupo.name
-            return None
-
-        elif transformer_name == 'familia':
-            # Convertir familia_id (Many2one a product.category) a nombre de Familia
-            familia = getattr(record, 'familia_id', None)
-            if familia and hasattr(familia, 'name'):
-                return familia.name
-            return None
-
-        elif transformer_name == 'url_to_image':
-            # Convertir image_1920 a URL
-            # Solo devolver la URL guardada (url_imagen_actual)
-            # No intentamos reconstruir la imagen desde base64
-            url = getattr(record, 'url_imagen_actual', None)
-            return url if url else None
-
-        elif transformer_name == 'vendedor':
-            # Convertir user_id a VendedorEmail (solo email, sin código)
-            # NestoAPI resolverá el código de vendedor desde el email
-            user_id = getattr(record, 'user_id', None)
-
-            # Email del vendedor (desde user_id.login o user_id.email)
-            if user_id and hasattr(user_id, 'login') and user_id.login:
-                return {'VendedorEmail': user_id.login}
-            elif user_id and hasattr(user_id, 'email') and user_id.email:
-                return {'VendedorEmail': user_id.email}
-
-            # IMPORTANTE: Devolver string vacío (no None) para que se incluya en el mensaje
-            # Nesto interpretará VendedorEmail='' como "quitar vendedor" (asignar NV)
-            return {'VendedorEmail': ''}
-
-        elif transformer_name == 'unidad_medida_y_tamanno':
-            # Convertir weight/volume_ml/volume/product_length a Tamaño y UnidadMedida
-            # Este transformer debe reconstruir el valor original desde Odoo
-
-            # Prioridad: volume_ml > volume > weight > product_length
-            volume_ml = getattr(record, 'volume_ml', 0)
-            volume = getattr(record, 'volume', 0)
-            weight = getattr(record, 'weight', 0)
-            product_length = getattr(record, 'product_length', 0)
-
-            # Determinar qué campo usar y su unidad
-            if volume_ml and volume_ml > 0:
-                # Ya tenemos el volumen en ml, usarlo directamente
-                if volume_ml < 1000:
-                    # Devolver en ml
-                    return {
-                        'Tamanno': round(volume_ml, 2),
-                        'UnidadMedida': 'ml'
-                    }
-                else:
-                    # Devolver en litros
-                    volume_l = volume_ml / 1000
-                    return {
-                        'Tamanno': round(volume_l, 2),
-                        'UnidadMedida': 'l'
-                    }
-
-            elif volume and volume > 0:
-                # Fallback: usar volume (m³) si volume_ml no está disponible
-                volume_ml_from_m3 = volume * 1000000  # 1 m³ = 1,000,000 ml
-
-                if volume_ml_from_m3 < 1000:
-                    # Devolver en ml
-                    return {
-                        'Tamanno': round(volume_ml_from_m3, 2),
-                        'UnidadMedida': 'ml'
-                    }
-                else:
-                    # Devolver en litros
-                    volume_l = volume_ml_from_m3 / 1000
-                    return {
-                        'Tamanno': round(volume_l, 2),
-                        'UnidadMedida': 'l'
-                    }
-
-            elif weight and weight > 0:
-                # Convertir de kg a g o kg (lo más apropiado)
-                if weight < 1:
-                    # Devolver en gramos
-                    weight_g = weight * 1000
-                    return {
-                        'Tamanno': round(weight_g, 2),
-                        'UnidadMedida': 'g'
-                    }
-                else:
-                    # Devolver en kg
-                    return {
-                        'Tamanno': round(weight, 2),
-                        'UnidadMedida': 'kg'
-                    }
-
-            elif product_length and product_length > 0:
-                # Convertir de m a cm o m (lo más apropiado)
-                if product_length < 1:
-                    # Devolver en cm
-                    length_cm = product_length * 100
-                    return {
-                        'Tamanno': round(length_cm, 2),
-                        'UnidadMedida': 'cm'
-                    }
-                else:
-                    # Devolver en metros
-                    return {
-                        'Tamanno': round(product_length, 2),
-                        'UnidadMedida': 'm'
-                    }
-
-            # Si no hay ningún valor, devolver None
-            return None
-
-        else:
-            # Transformer no implementado
-            _logger.warning(f"Reverse transformer '{transformer_name}' no implementado, usando valor directo")
-            return value
-
     def _add_children_to_message(self, record, message):
         """
         Añade children al mensaje si el modelo es jerárquico
@@ -487,56 +330,31 @@ class OdooPublisher:
             record: Registro parent
             message (dict): Mensaje a modificar (se añade campo PersonasContacto, etc.)
         """
-        hierarchy_config = self.config.get('hierarchy', {})
-        parent_field = hierarchy_config.get('parent_field', 'parent_id')
+        plan = self.plan
 
-        # Buscar children
-        children = self.env[self.config['odoo_model']].search([
-            (parent_field, '=', record.id)
-        ])
+        # Buscar children (o tomarlos de los precargados para el lote)
+        if self._batch and record.id in self._batch.get('children', {}):
+            children = self._batch['children'][record.id]
+        else:
+            children = self.env[self.config['odoo_model']].search([
+                (plan.parent_field, '=', record.id)
+            ])
 
         if not children:
             return
 
-        # Obtener tipo de children desde config
-        child_types = hierarchy_config.get('child_types', ['PersonasContacto'])
-
-        # Por ahora, asumimos un solo tipo de children
-        child_field_name = child_types[0] if child_types else 'PersonasContacto'
-
-        # Construir lista de children
+        serialize = self._serialize_odoo_value
         children_list = []
 
-        # Usar reverse_child_field_mappings para sincronización Odoo → Nesto
-        # SIEMPRE inferir desde child_field_mappings primero
-        reverse_child_mappings = self._infer_reverse_child_mappings()
-
-        # Sobrescribir con reverse_child_field_mappings explícitos (para identificadores)
-        explicit_child_mappings = self.config.get('reverse_child_field_mappings', {})
-        if explicit_child_mappings:
-            reverse_child_mappings.update(explicit_child_mappings)
-
         for child in children:
             child_data = {}
 
-            # Mapear campos del child usando reverse mappings
-            for odoo_field, mapping in reverse_child_mappings.items():
-                nesto_field = mapping.get('nesto_field')
-                if not nesto_field:
-                    continue
+            # Mapear campos del child con el plan compilado
+            for odoo_field, nesto_field, transform, read_value in plan.child_fields:
+                value = serialize(getattr(child, odoo_field, None)) if read_value else None
 
-                # Obtener valor del child
-                value = getattr(child, odoo_field, None)
-
-                # Serializar objetos Odoo
-                value = self._serialize_odoo_value(value)
-
-                # Aplicar transformer inverso si existe
-                if 'reverse_transformer' in mapping:
-                    transformer_name = mapping['reverse_transformer']
-                    value = self._apply_reverse_transformer(
-                        transformer_name, value, child, mapping
-                    )
+                if transform is not None:
+                    value = transform(value, child)
 
                 # Solo añadir el campo si tiene valor real
                 if value in (None, False, '', 0):
@@ -546,7 +364,7 @@ class OdooPublisher:
 
             children_list.append(child_data)
 
-        message[child_field_name] = children_list
+        message[plan.child_field_name] = children_list
 
     def _add_productos_kit_to_message(self, record, message):
         """
@@ -556,11 +374,14 @@ class OdooPublisher:
             record: Registro product.template
             message (dict): Mensaje a modificar (se añade campo ProductosKit)
         """
-        # Buscar BOM del producto
-        bom = self.env['mrp.bom'].search([
-            ('product_tmpl_id', '=', record.id),
-            ('active', '=', True)
-        ], limit=1)
+        # Buscar BOM del producto (o tomarla de las precargadas para el lote)
+        if self._batch and 'boms' in self._batch:
+            bom = self._batch['boms'].get(record.id, self.env['mrp.bom'])
+        else:
+            bom = self.env['mrp.bom'].search([
+                ('product_tmpl_id', '=', record.id),
+                ('active', '=', True)
+            ], limit=1)
 
         if not bom:
             # No tiene BOM, añadir array vacío
@@ -0,0 +1,225 @@
+"""
+Processing Plan - Plan compilado de mapeo Nesto → Odoo por entidad
+
+GenericEntityProcessor interpretaba la configuración de la entidad en cada
+campo de cada mensaje: ramas por 'type', comprobaciones de claves del mapeo,
+split de rutas con puntos y una instancia nueva de transformer por campo.
+Todo eso depende solo de entity_configs.py, así que se compila una vez por
+proceso y configuración:
+
+- Cada mapeo se convierte en un FieldStep con su tipo ya decidido
+- Las rutas con puntos se dividen una vez en un extractor (presencia + valor
+  en un solo recorrido, sin confundir ausencia con None)
+- Transformers, post_processors y validadores se instancian una vez (no
+  guardan estado) y se reutilizan en todos los mensajes
+- Los campos 'fixed' guardan su valor; los 'context' guardan su
+  ContextExpression, que GenericEntityProcessor resuelve una vez por
+  (usuario, compañía)
+
+Procesar un mensaje queda reducido a recorrer una lista de pasos.
+"""
+
+import logging
+import threading
+
+from ..transformers.field_transformers import FieldTransformerRegistry
+from ..transformers.validators import ValidatorRegistry
+from ..transformers.post_processors import PostProcessorRegistry
+from .context_expression import ContextExpression
+
+_logger = logging.getLogger(__name__)
+
+# Marca de campo ausente (distinto de un campo presente con valor None)
+MISSING = object()
+
+FIXED = 'fixed'
+CONTEXT = 'context'
+VALUE = 'value'
+
+
+def compile_path(path):
+    """
+    Extractor de una ruta con puntos (ej: 'PersonaContacto.Id')
+
+    Args:
+        path (str): Ruta del campo en el mensaje de Nesto
+
+    Returns:
+        callable: extract(data) que devuelve el valor o MISSING si la clave no existe
+    """
+    if not path:
+        return lambda data: MISSING
+
+    keys = tuple(path.split('.'))
+    if len(keys) == 1:
+        key = keys[0]
+
+        def extract(data):
+            if isinstance(data, dict):
+                return data.get(key, MISSING)
+            return MISSING
+        return extract
+
+    parents, last = keys[:-1], keys[-1]
+
+    def extract_nested(data):
+        for key in parents:
+            if not isinstance(data, dict) or key not in data:
+                return MISSING
+            data = data[key]
+        if isinstance(data, dict):
+            return data.get(last, MISSING)
+        return MISSING
+    return extract_nested
+
+
+def _instantiate(registry, name):
+    """
+    Instancia compartida de un transformer, post_processor o validador
+
+    Si no está registrado devuelve None: el error se sigue lanzando al
+    procesar un mensaje que lo use (como antes de compilar).
+    """
+    try:
+        return registry.get(name)
+    except ValueError:
+        _logger.warning(f"'{name}' no registrado en {registry.__name__}")
+        return None
+
+
+class FieldStep:
+    """
+    Paso compilado de un mapeo de campo
+
+    Atributos:
+        kind: FIXED, CONTEXT o VALUE
+        nesto_field: Nombre del campo en Nesto (para mensajes de error)
+        odoo_field: Campo Odoo de destino (None si el mapeo no tiene)
+        value: Valor de un campo 'fixed'
+        source: ContextExpression de un campo 'context' (None si no es válida)
+        extract: Extractor de la ruta (campos VALUE)
+        has_default, default, required: Tratamiento del valor extraído
+        transformer_name, transformer: Transformer del mapeo (o None)
+    """
+
+    __slots__ = (
+        'kind', 'nesto_field', 'odoo_field', 'value', 'source', 'extract',
+        'has_default', 'default', 'required', 'transformer_name', 'transformer',
+    )
+
+    def __init__(self, nesto_field, mapping):
+        self.nesto_field = nesto_field
+        self.odoo_field = mapping.get('odoo_field')
+        self.value = None
+        self.source = None
+        self.extract = None
+        self.has_default = 'default' in mapping
+        self.default = mapping.get('default')
+        self.required = bool(mapping.get('required'))
+        self.transformer_name = mapping.get('transformer')
+        self.transformer = None
+
+        mapping_type = mapping.get('type')
+        if mapping_type == 'fixed':
+            self.kind = FIXED
+            self.value = mapping['value']
+        elif mapping_type == 'context':
+            self.kind = CONTEXT
+            self.source = self._compile_source(nesto_field, mapping['source'])
+        else:
+            self.kind = VALUE
+            self.extract = compile_path(nesto_field)
+            if 'odoo_field' not in mapping and 'transformer' not in mapping:
+                # Solo se valida (required), no se asigna nada
+                self.odoo_field = None
+            if self.transformer_name:
+                self.transformer = _instantiate(FieldTransformerRegistry, self.transformer_name)
+
+    @staticmethod
+    def _compile_source(nesto_field, source):
+        try:
+            return ContextExpression(source)
+        except ValueError as e:
+            _logger.error(f"Campo de contexto {nesto_field}: {e}")
+            return None
+
+
+class ProcessingPlan:
+    """
+    Plan compilado de una configuración de entidad
+
+    Atributos:
+        fields: FieldSteps de field_mappings (parent)
+        child_fields: FieldSteps de child_field_mappings
+        context_steps: FieldSteps de tipo 'context' (parent y children)
+        external_ids: Tuplas (odoo_field, extract) de external_id_mapping
+        hierarchical, child_types: Configuración de jerarquía
+        post_processors, validators: Tuplas (nombre, instancia o None)
+    """
+
+    _plans = {}
+    _lock = threading.Lock()
+
+    def __init__(self, config):
+        self.config = config
+
+        self.fields = self._compile(config.get('field_mappings', {}))
+        self.child_fields = self._compile(config.get('child_field_mappings', {}))
+        self.context_steps = tuple(
+            step for step in self.fields + self.child_fields if step.kind == CONTEXT
+        )
+
+        self.external_ids = tuple(
+            (odoo_field, compile_path(nesto_path))
+            for odoo_field, nesto_path in config.get('external_id_mapping', {}).items()
+        )
+
+        hierarchy = config.get('hierarchy', {})
+        self.hierarchical = bool(hierarchy.get('enabled'))
+        self.child_types = tuple(hierarchy.get('child_types', []))
+
+        self.post_processors = tuple(
+            (name, _instantiate(PostProcessorRegistry, name))
+            for name in config.get('post_processors', [])
+        )
+        self.validators = tuple(
+            (name, _instantiate(ValidatorRegistry, name))
+            for name in config.get('validators', [])
+        )
+
+    @classmethod
+    def for_config(cls, config):
+        """
+        Plan compilado de una configuración (se compila la primera vez)
+
+        Las configuraciones de ENTITY_CONFIGS viven todo el proceso, así que
+        el plan se indexa por identidad del dict.
+
+        Args:
+            config (dict): Configuración de la entidad
+
+        Returns:
+            ProcessingPlan
+        """
+        key = id(config)
+        plan = cls._plans.get(key)
+        if plan is None or plan.config is not config:
+            with cls._lock:
+                plan = cls._plans.get(key)
+                if plan is None or plan.config is not config:
+                    plan = cls(config)
+                    cls._plans[key] = plan
+        return plan
+
+    @classmethod
+    def clear(cls):
+        """Descarta los planes compilados"""
+        with cls._lock:
+            cls._plans.clear()
+
+    @staticmethod
+    def _compile(field_mappings):
+        return tuple(
+            FieldStep(nesto_field, mapping)
+            for nesto_field, mapping in field_mappings.items()
+        )
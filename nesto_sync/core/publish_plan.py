@@ -0,0 +1,200 @@
+"""
+Publish Plan - Plan compilado de mapeo Odoo → Nesto por entidad
+
+OdooPublisher necesita, para cada mensaje, la lista de campos Odoo a leer,
+su campo Nesto y el transformer inverso a aplicar. Todo eso depende solo de
+entity_configs.py, así que se compila una vez por proceso y entidad:
+
+- Se infieren los mapeos inversos desde field_mappings / child_field_mappings
+  y se sobrescriben con reverse_field_mappings / reverse_child_field_mappings
+- Cada transformer inverso se resuelve en ReverseTransformerRegistry y se
+  guarda como callable ya ligado (sin if/elif por campo y mensaje)
+- Se reúnen los campos que leen el mapeo y sus transformers (depends), para
+  cargarlos de una vez para todo un lote de registros (prefetch)
+
+Construir un mensaje queda reducido a recorrer una lista de tuplas.
+"""
+
+import logging
+import threading
+
+from ..config.entity_configs import get_entity_config
+from ..transformers.reverse_transformers import ReverseTransformerRegistry
+
+_logger = logging.getLogger(__name__)
+
+# Campos que se envían aunque estén vacíos (False es un valor con significado)
+KEEP_EMPTY_FIELDS = ('ClientePrincipal',)
+
+
+def _identity(value, record):
+    return value
+
+
+def resolve_reverse_transformer(transformer_name):
+    """
+    Devuelve el callable transform(value, record) de un transformer inverso
+
+    Los transformers no implementados devuelven el valor directo.
+    """
+    return _resolve(transformer_name)[0]
+
+
+def _resolve(transformer_name):
+    """(transform, depends, uses_value) de un transformer inverso"""
+    if ReverseTransformerRegistry.is_registered(transformer_name):
+        transformer = ReverseTransformerRegistry.get(transformer_name)
+        return (
+            transformer.transform,
+            tuple(getattr(transformer, 'depends', ())),
+            getattr(transformer, 'uses_value', True),
+        )
+
+    _logger.warning(f"Reverse transformer '{transformer_name}' no implementado, usando valor directo")
+    return _identity, (), True
+
+
+class PublishPlan:
+    """
+    Plan compilado de una entidad
+
+    Atributos:
+        fields: Tuplas (odoo_field, nesto_field, transform o None, read_value) del
+            registro; read_value es False si el transformer no usa el valor del campo
+        child_fields: Ídem para los children (entidades jerárquicas)
+        record_paths, child_paths: Campos (rutas con puntos) que se leen al construir
+        hierarchical, parent_field, child_field_name: Configuración de jerarquía
+        topic, nesto_table: Destino del mensaje
+        ordering_key_field: Campo Odoo de la ordering key (el primero de
+            external_id_mapping: cliente_externo, producto_externo...)
+    """
+
+    _plans = {}
+    _lock = threading.Lock()
+
+    def __init__(self, entity_type, config):
+        self.entity_type = entity_type
+        self.config = config
+
+        self.fields, self.record_paths = self._compile(
+            config.get('field_mappings', {}), config.get('reverse_field_mappings', {})
+        )
+        self.child_fields, self.child_paths = self._compile(
+            config.get('child_field_mappings', {}), config.get('reverse_child_field_mappings', {})
+        )
+
+        hierarchy = config.get('hierarchy', {})
+        self.hierarchical = bool(hierarchy.get('enabled'))
+        self.parent_field = hierarchy.get('parent_field', 'parent_id')
+        child_types = hierarchy.get('child_types', ['PersonasContacto'])
+        self.child_field_name = child_types[0] if child_types else 'PersonasContacto'
+
+        self.topic = config.get('pubsub_topic', 'sincronizacion-tablas')
+        self.nesto_table = config.get('nesto_table', 'Clientes')
+        self.ordering_key_field = next(iter(config.get('external_id_mapping', {})), None)
+
+    @classmethod
+    def for_entity(cls, entity_type, config=None):
+        """
+        Plan compilado de una entidad (se compila la primera vez)
+
+        Args:
+            entity_type (str): Tipo de entidad
+            config (dict, optional): Configuración (por defecto, la de ENTITY_CONFIGS)
+
+        Returns:
+            PublishPlan
+        """
+        config = config or get_entity_config(entity_type)
+        plan = cls._plans.get(entity_type)
+        if plan is None or plan.config is not config:
+            with cls._lock:
+                plan = cls._plans.get(entity_type)
+                if plan is None or plan.config is not config:
+                    plan = cls(entity_type, config)
+                    cls._plans[entity_type] = plan
+        return plan
+
+    @classmethod
+    def clear(cls):
+        """Descarta los planes compilados"""
+        with cls._lock:
+            cls._plans.clear()
+
+    @staticmethod
+    def prefetch(records, paths):
+        """
+        Carga en caché los campos de todo el recordset (una consulta por modelo)
+
+        Args:
+            records: Recordset a precargar
+            paths: Rutas de campos (ej: 'user_id.login')
+        """
+        if not records:
+            return
+        for path in paths:
+            if path.split('.', 1)[0] not in records._fields:
+                # Campo de un módulo no instalado (ej: product_length)
+                continue
+            try:
+                records.mapped(path)
+            except (KeyError, AttributeError):
+                continue
+
+    @staticmethod
+    def infer_reverse_mappings(field_mappings):
+        """
+        Infiere los mapeos inversos desde field_mappings
+
+        Returns:
+            dict: {odoo_field: {'nesto_field': ..., 'reverse_transformer': ...}}
+        """
+        reverse = {}
+        for nesto_field, mapping in field_mappings.items():
+            # Saltar campos internos (que empiezan con _)
+            # Estos son solo para sincronización Nesto → Odoo
+            if nesto_field.startswith('_'):
+                continue
+
+            # Campos simples
+            if 'odoo_field' in mapping:
+                reverse[mapping['odoo_field']] = {'nesto_field': nesto_field}
+
+            # Campos con transformer
+            elif 'odoo_fields' in mapping:
+                for odoo_field in mapping['odoo_fields']:
+                    if odoo_field not in reverse:
+                        reverse[odoo_field] = {
+                            'nesto_field': nesto_field,
+                            'reverse_transformer': mapping.get('transformer')
+                        }
+        return reverse
+
+    @classmethod
+    def _compile(cls, field_mappings, explicit_mappings):
+        """
+        Lista de (odoo_field, nesto_field, transform, read_value) en el orden del mensaje
+
+        Returns:
+            tuple: (campos compilados, rutas de campos leídos)
+        """
+        # SIEMPRE inferir desde field_mappings primero y sobrescribir con los explícitos
+        reverse = cls.infer_reverse_mappings(field_mappings)
+        reverse.update(explicit_mappings)
+
+        compiled = []
+        paths = []
+        for odoo_field, mapping in reverse.items():
+            nesto_field = mapping.get('nesto_field')
+            if not nesto_field:
+                continue
+
+            transform = None
+            read_value = True
+            if 'reverse_transformer' in mapping:
+                transform, depends, read_value = _resolve(mapping['reverse_transformer'])
+                paths.extend(depends)
+            if read_value:
+                paths.append(odoo_field)
+            compiled.append((odoo_field, nesto_field, transform, read_value))
+        return compiled, tuple(dict.fromkeys(paths))
@@ -0,0 +1,127 @@
+"""
+Sync Index - Índice modelo Odoo → configuración de sincronización compilada
+
+El hook de write()/create() de BidirectionalSyncMixin necesita saber, para
+cada registro, qué entidad corresponde a su modelo, qué campos son
+obligatorios para sincronizar y si la entidad es jerárquica. Todo eso
+depende solo de entity_configs.py, así que se compila una vez (al cargar el
+registry de Odoo, ver BidirectionalSyncMixin._register_hook) en un dict
+indexado por nombre de modelo: el hook solo hace búsquedas en diccionarios.
+"""
+
+import logging
+import threading
+
+from ..config.entity_configs import ENTITY_CONFIGS
+from .publish_plan import PublishPlan
+
+_logger = logging.getLogger(__name__)
+
+
+class SyncConfig:
+    """
+    Configuración de sincronización Odoo → Nesto de un modelo
+
+    Atributos:
+        entity_type: Tipo de entidad ('cliente', 'producto', ...)
+        model: Modelo de Odoo
+        config: Configuración original de ENTITY_CONFIGS
+        id_fields: Campos identificadores de la entidad
+        required_id_fields: Campos que deben tener valor para sincronizar
+        hierarchical, parent_field: Configuración de jerarquía
+        plan: PublishPlan compilado de la entidad
+        synced_fields: Campos de Odoo que escribe o publica la sincronización
+    """
+
+    __slots__ = (
+        'entity_type', 'model', 'config', 'id_fields', 'required_id_fields',
+        'hierarchical', 'parent_field', 'plan', 'synced_fields',
+    )
+
+    def __init__(self, entity_type, config):
+        self.entity_type = entity_type
+        self.model = config['odoo_model']
+        self.config = config
+        self.id_fields = tuple(config.get('id_fields', []))
+        # required_id_fields especifica qué campos son OBLIGATORIOS para sincronizar
+        # (si no está definido, se usan los id_fields)
+        self.required_id_fields = tuple(config.get('required_id_fields', self.id_fields))
+
+        hierarchy = config.get('hierarchy', {})
+        self.hierarchical = bool(hierarchy.get('enabled', False))
+        self.parent_field = hierarchy.get('parent_field', 'parent_id')
+
+        self.plan = PublishPlan.for_entity(entity_type, config)
+        self.synced_fields = self._collect_synced_fields(config)
+
+    def _collect_synced_fields(self, config):
+        """Campos de los mapeos en ambos sentidos, identificadores y parent"""
+        synced = set(config.get('external_id_mapping', {})) | set(self.id_fields)
+        if self.hierarchical:
+            synced.add(self.parent_field)
+        for mappings_key in ('field_mappings', 'child_field_mappings'):
+            for mapping in config.get(mappings_key, {}).values():
+                if 'odoo_field' in mapping:
+                    synced.add(mapping['odoo_field'])
+                synced.update(mapping.get('odoo_fields', ()))
+        for odoo_field, _nesto_field, _transform, _read_value in self.plan.fields + self.plan.child_fields:
+            synced.add(odoo_field)
+        for path in self.plan.record_paths + self.plan.child_paths:
+            synced.add(path.split('.', 1)[0])
+        return frozenset(synced)
+
+
+class SyncConfigIndex:
+    """Índice {modelo: SyncConfig} de las entidades con bidirectional=True"""
+
+    _index = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def build(cls, configs=None):
+        """
+        Compila el índice (sustituye al anterior)
+
+        Si varias entidades usan el mismo modelo, gana la primera (mismo
+        criterio que el recorrido de ENTITY_CONFIGS al que sustituye).
+
+        Args:
+            configs (dict, optional): Configuraciones (por defecto, ENTITY_CONFIGS)
+
+        Returns:
+            dict: {modelo: SyncConfig}
+        """
+        configs = ENTITY_CONFIGS if configs is None else configs
+        index = {}
+        for entity_type, config in configs.items():
+            model = config.get('odoo_model')
+            if not model or not config.get('bidirectional', False) or model in index:
+                continue
+            index[model] = SyncConfig(entity_type, config)
+
+        with cls._lock:
+            cls._index = index
+        _logger.debug(f"Índice de sincronización compilado: {sorted(index)}")
+        return index
+
+    @classmethod
+    def for_model(cls, model_name):
+        """
+        Configuración de sincronización de un modelo
+
+        Args:
+            model_name (str): Nombre del modelo (ej: 'res.partner')
+
+        Returns:
+            SyncConfig o None si el modelo no tiene sincronización bidireccional
+        """
+        index = cls._index
+        if index is None:
+            index = cls.build()
+        return index.get(model_name)
+
+    @classmethod
+    def clear(cls):
+        """Descarta el índice (se recompila en el siguiente acceso)"""
+        with cls._lock:
+            cls._index = None
@@ -1,2 +1,9 @@
 from . import google_pubsub_publisher
+from . import local_file_publisher
 from . import publisher_factory
+from . import google_pubsub_subscriber
+from . import subscriber_factory
+from . import pull_worker
+from . import lookup_cache
+from . import json_codec
+from . import image_downloader
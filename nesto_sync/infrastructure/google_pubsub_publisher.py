@@ -2,10 +2,24 @@
 Google Cloud Pub/Sub Publisher - Implementación de IEventPublisher para Google Pub/Sub
 
 Similar a GooglePubSubEventPublisher en NestoAPI
+
+El PublisherClient se comparte por proceso (uno por credenciales y
+configuración de batching): crear uno por publisher abre canales gRPC nuevos
+y no deja que la librería agrupe mensajes. El cliente es thread-safe, así que
+lo usan a la vez todos los hilos (workers HTTP, crons) del proceso. Con BatchSettings, publish_event_async devuelve en
+cuanto el mensaje entra en el lote; la librería lo envía al llenarse el lote
+o al pasar max_latency.
+
+Con message_ordering, los mensajes se publican con ordering key (ver
+OdooPublisher.ordering_key): Pub/Sub entrega en orden los de la misma clave
+a las suscripciones con ordenación activada. Si falla una publicación con
+clave, la librería bloquea esa clave hasta llamar a resume_publish, que se
+hace aquí para que el reintento (outbox) pueda volver a publicarla.
 """
 
 import json
 import logging
+import threading
 from google.cloud import pubsub_v1
 from google.api_core.exceptions import GoogleAPIError
 
@@ -21,7 +35,12 @@ class GooglePubSubPublisher(IEventPublisher):
     Esta clase publica mensajes a Google Cloud Pub/Sub de manera asíncrona.
     """
 
-    def __init__(self, project_id, credentials_path=None):
+    # Clientes compartidos por proceso:
+    # {(credentials_path, batch_settings, message_ordering): PublisherClient}
+    _clients = {}
+    _clients_lock = threading.Lock()
+
+    def __init__(self, project_id, credentials_path=None, batch_settings=None, message_ordering=False):
         """
         Inicializa el publisher de Google Pub/Sub
 
@@ -29,8 +48,14 @@ class GooglePubSubPublisher(IEventPublisher):
             project_id (str): ID del proyecto de Google Cloud
             credentials_path (str, optional): Path al archivo de credenciales JSON
                 Si no se proporciona, usa las credenciales por defecto del sistema
+            batch_settings (tuple, optional): (max_messages, max_bytes, max_latency)
+                para pubsub_v1.types.BatchSettings. Sin él, los de la librería
+            message_ordering (bool): Publicar con ordering key (si el mensaje la tiene)
         """
         self.project_id = project_id
+        self.credentials_path = credentials_path or None
+        self.batch_settings = tuple(batch_settings) if batch_settings else None
+        self.message_ordering = bool(message_ordering)
 
         # Configurar credenciales si se proporcionan
         if credentials_path:
@@ -42,12 +67,66 @@ class GooglePubSubPublisher(IEventPublisher):
 
     @property
     def publisher(self):
-        """Lazy initialization del publisher client"""
+        """Lazy initialization del publisher client (compartido por proceso)"""
         if self._publisher is None:
-            self._publisher = pubsub_v1.PublisherClient()
+            self._publisher = self.get_client(
+                self.batch_settings, self.credentials_path, self.message_ordering
+            )
         return self._publisher
 
-    def publish_event(self, topic, message):
+    @classmethod
+    def get_client(cls, batch_settings=None, credentials_path=None, message_ordering=False):
+        """
+        PublisherClient compartido para unas credenciales y configuración de batching
+
+        Args:
+            batch_settings (tuple, optional): (max_messages, max_bytes, max_latency)
+            credentials_path (str, optional): Credenciales del cliente (por
+                defecto, las del sistema)
+            message_ordering (bool): Cliente con enable_message_ordering
+
+        Returns:
+            pubsub_v1.PublisherClient
+        """
+        key = (credentials_path, batch_settings, message_ordering)
+        client = cls._clients.get(key)
+        if client is None:
+            with cls._clients_lock:
+                client = cls._clients.get(key)
+                if client is None:
+                    kwargs = {}
+                    if batch_settings:
+                        max_messages, max_bytes, max_latency = batch_settings
+                        kwargs['batch_settings'] = pubsub_v1.types.BatchSettings(
+                            max_messages=max_messages,
+                            max_bytes=max_bytes,
+                            max_latency=max_latency,
+                        )
+                    if message_ordering:
+                        kwargs['publisher_options'] = pubsub_v1.types.PublisherOptions(
+                            enable_message_ordering=True
+                        )
+                    if credentials_path:
+                        client = pubsub_v1.PublisherClient.from_service_account_file(
+                            credentials_path, **kwargs
+                        )
+                    else:
+                        client = pubsub_v1.PublisherClient(**kwargs)
+                    cls._clients[key] = client
+                    _logger.info(
+                        f"PublisherClient de Pub/Sub creado (batch_settings={batch_settings}, "
+                        f"message_ordering={message_ordering}, "
+                        f"credentials={'custom' if credentials_path else 'default'})"
+                    )
+        return client
+
+    @classmethod
+    def reset_clients(cls):
+        """Descarta los clientes compartidos (se crean de nuevo al publicar)"""
+        with cls._clients_lock:
+            cls._clients.clear()
+
+    def publish_event(self, topic, message, ordering_key=None):
         """
         Publica un evento a Google Pub/Sub
 
@@ -56,6 +135,7 @@ class GooglePubSubPublisher(IEventPublisher):
             message (dict or str): Mensaje a publicar
                 - Si es dict: será serializado a JSON
                 - Si es str: se asume que ya está en JSON
+            ordering_key (str, optional): Clave de ordenación (solo con message_ordering)
 
         Returns:
             bool: True si se publicó correctamente
@@ -80,7 +160,7 @@ class GooglePubSubPublisher(IEventPublisher):
             topic_path = self.publisher.topic_path(self.project_id, topic)
 
             # Publicar mensaje (la librería NO serializa de nuevo, solo envía bytes)
-            future = self.publisher.publish(topic_path, message_bytes)
+            future = self._publish(topic_path, message_bytes, ordering_key)
 
             # Esperar confirmación (blocking)
             message_id = future.result(timeout=30)
@@ -104,7 +184,7 @@ class GooglePubSubPublisher(IEventPublisher):
             _logger.error(f"Error inesperado publicando a {topic}: {str(e)}", exc_info=True)
             raise
 
-    def publish_event_async(self, topic, message, callback=None):
+    def publish_event_async(self, topic, message, callback=None, ordering_key=None):
         """
         Publica un evento de manera asíncrona (no blocking)
 
@@ -112,6 +192,7 @@ class GooglePubSubPublisher(IEventPublisher):
             topic (str): Nombre del topic
             message (dict): Mensaje a publicar
             callback (callable, optional): Función a llamar cuando se complete
+            ordering_key (str, optional): Clave de ordenación (solo con message_ordering)
 
         Returns:
             Future: Objeto future para tracking asíncrono
@@ -121,7 +202,7 @@ class GooglePubSubPublisher(IEventPublisher):
             message_bytes = message_json.encode('utf-8')
 
             topic_path = self.publisher.topic_path(self.project_id, topic)
-            future = self.publisher.publish(topic_path, message_bytes)
+            future = self._publish(topic_path, message_bytes, ordering_key)
 
             if callback:
                 future.add_done_callback(callback)
@@ -131,3 +212,31 @@ class GooglePubSubPublisher(IEventPublisher):
         except Exception as e:
             _logger.error(f"Error iniciando publicación asíncrona a {topic}: {str(e)}")
             raise
+
+    def _publish(self, topic_path, message_bytes, ordering_key):
+        """
+        Lanza la publicación, con ordering key si el cliente tiene ordenación
+
+        Si la publicación con clave falla, se reanuda la clave (resume_publish)
+        para que los siguientes mensajes con esa clave no fallen también.
+
+        Returns:
+            Future de la librería de Pub/Sub
+        """
+        if not (self.message_ordering and ordering_key):
+            return self.publisher.publish(topic_path, message_bytes)
+
+        publisher = self.publisher
+        try:
+            future = publisher.publish(topic_path, message_bytes, ordering_key=ordering_key)
+        except Exception:
+            publisher.resume_publish(topic_path, ordering_key)
+            raise
+
+        def resume_on_error(done):
+            if done.exception() is not None:
+                _logger.warning(f"Publicación fallida con ordering key {ordering_key}, se reanuda la clave")
+                publisher.resume_publish(topic_path, ordering_key)
+
+        future.add_done_callback(resume_on_error)
+        return future
@@ -0,0 +1,119 @@
+"""
+Google Cloud Pub/Sub Subscriber - Consumo en modo pull
+
+Alternativa al push HTTP: el consumidor pide lotes de mensajes a la
+suscripción y confirma (ack) o rechaza (nack) cada uno según el resultado
+del procesamiento.
+"""
+
+import base64
+import logging
+from google.cloud import pubsub_v1
+
+_logger = logging.getLogger(__name__)
+
+
+class GooglePubSubSubscriber:
+    """
+    Wrapper sobre SubscriberClient para pull síncrono por lotes
+
+    Convierte los mensajes recibidos al mismo formato de envelope que usa
+    el endpoint push, para reutilizar GooglePubSubMessageAdapter.
+    """
+
+    def __init__(self, project_id, subscription, credentials_path=None):
+        """
+        Inicializa el subscriber de Google Pub/Sub
+
+        Args:
+            project_id (str): ID del proyecto de Google Cloud
+            subscription (str): Nombre de la suscripción (sin project_id)
+            credentials_path (str, optional): Path al archivo de credenciales JSON
+        """
+        self.project_id = project_id
+        self.subscription = subscription
+
+        if credentials_path:
+            import os
+            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = credentials_path
+
+        self._subscriber = None
+
+    @property
+    def subscriber(self):
+        """Lazy initialization del subscriber client"""
+        if self._subscriber is None:
+            self._subscriber = pubsub_v1.SubscriberClient()
+        return self._subscriber
+
+    @property
+    def subscription_path(self):
+        """Path completo de la suscripción"""
+        return self.subscriber.subscription_path(self.project_id, self.subscription)
+
+    def pull(self, max_messages, timeout=30):
+        """
+        Pide un lote de mensajes a la suscripción
+
+        Args:
+            max_messages (int): Número máximo de mensajes a recibir
+            timeout (int): Timeout de la llamada en segundos
+
+        Returns:
+            List[tuple]: (ack_id, envelope, size_bytes) por mensaje recibido
+        """
+        response = self.subscriber.pull(
+            request={
+                'subscription': self.subscription_path,
+                'max_messages': max_messages,
+            },
+            timeout=timeout,
+        )
+
+        leased = []
+        for received in response.received_messages:
+            leased.append((
+                received.ack_id,
+                self._to_envelope(received.message),
+                len(received.message.data),
+            ))
+
+        _logger.debug(f"Pull de {self.subscription}: {len(leased)} mensajes recibidos")
+        return leased
+
+    def acknowledge(self, ack_ids):
+        """Confirma los mensajes procesados (no se volverán a entregar)"""
+        if not ack_ids:
+            return
+        self.subscriber.acknowledge(
+            request={'subscription': self.subscription_path, 'ack_ids': list(ack_ids)}
+        )
+
+    def nack(self, ack_ids):
+        """Rechaza los mensajes para que PubSub los reentregue inmediatamente"""
+        self.modify_ack_deadline(ack_ids, 0)
+
+    def modify_ack_deadline(self, ack_ids, seconds):
+        """Extiende (o anula con 0) el plazo de ack de los mensajes en vuelo"""
+        if not ack_ids:
+            return
+        self.subscriber.modify_ack_deadline(
+            request={
+                'subscription': self.subscription_path,
+                'ack_ids': list(ack_ids),
+                'ack_deadline_seconds': seconds,
+            }
+        )
+
+    def _to_envelope(self, message):
+        """Convierte un PubsubMessage al formato de envelope push"""
+        publish_time = getattr(message, 'publish_time', None)
+        return {
+            'message': {
+                'data': base64.b64encode(message.data).decode('ascii'),
+                'messageId': message.message_id,
+                'attributes': dict(message.attributes),
+                'publishTime': publish_time.isoformat() if publish_time else None,
+            },
+            'subscription': self.subscription_path,
+        }
@@ -0,0 +1,191 @@
+"""
+Image Cache - Caché en disco de imágenes de producto direccionada por contenido
+
+Estructura bajo <data_dir>/nesto_sync/images:
+- blobs/<sha[:2]>/<sha256>: Contenido de cada imagen distinta (una vez aunque
+  la usen varias URLs)
+- meta/<sha256(url)>.json: Por URL, ETag, Last-Modified y SHA-256 del cuerpo
+
+Permite hacer peticiones condicionales (If-None-Match / If-Modified-Since):
+un 304 reutiliza el blob sin volver a descargarlo, y comparar el SHA-256 con
+el de la imagen actual del producto evita reescribir image_1920.
+
+Las escrituras son atómicas (fichero temporal + rename), así que varios
+workers pueden compartir la caché.
+
+Tamaño acotado: cada uso de un blob actualiza su mtime y cleanup() borra los
+menos usados recientemente (LRU) hasta quedar bajo el máximo, junto con los
+metadatos que apuntaban a ellos (cron diario, ver models/image_fetcher.py).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+_logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    """Caché en disco de imágenes por URL y contenido"""
+
+    def __init__(self, root):
+        """
+        Inicializa la caché
+
+        Args:
+            root (str): Directorio raíz de la caché
+        """
+        self.root = root
+
+    @classmethod
+    def default(cls):
+        """Caché en el data_dir de Odoo"""
+        from odoo.tools import config
+        return cls(os.path.join(config['data_dir'], 'nesto_sync', 'images'))
+
+    @staticmethod
+    def sha256(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def get_meta(self, url):
+        """
+        Metadatos cacheados de una URL
+
+        Returns:
+            Dict con etag, last_modified y sha256, o None si no hay (o falta el blob)
+        """
+        try:
+            with open(self._meta_path(url), encoding='utf-8') as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+        if not meta.get('sha256') or not self._touch(self._blob_path(meta['sha256'])):
+            return None
+        return meta
+
+    def get_content(self, sha256):
+        """Contenido de un blob o None si no existe"""
+        try:
+            with open(self._blob_path(sha256), 'rb') as blob_file:
+                content = blob_file.read()
+        except OSError:
+            return None
+        self._touch(self._blob_path(sha256))
+        return content
+
+    def store(self, url, content, etag=None, last_modified=None):
+        """
+        Guarda el contenido (si no existía) y los metadatos de la URL
+
+        Returns:
+            str: SHA-256 del contenido
+        """
+        sha256 = self.sha256(content)
+        blob_path = self._blob_path(sha256)
+        try:
+            if not self._touch(blob_path):
+                self._write_atomic(blob_path, content)
+            self._write_atomic(self._meta_path(url), json.dumps({
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'sha256': sha256,
+            }).encode('utf-8'))
+        except OSError as e:
+            # La caché es una optimización: un fallo de disco no debe romper la descarga
+            _logger.warning(f"No se pudo guardar la imagen en caché ({url}): {e}")
+        return sha256
+
+    def cleanup(self, max_bytes):
+        """
+        Borra los blobs menos usados recientemente hasta quedar bajo max_bytes
+
+        También borra los metadatos de las URLs cuyo blob se ha borrado.
+
+        Args:
+            max_bytes (int): Tamaño máximo de los blobs
+
+        Returns:
+            Dict con removed (blobs borrados), freed (bytes liberados) y
+            size (bytes que quedan)
+        """
+        blobs = []
+        for directory in self._scan(os.path.join(self.root, 'blobs')):
+            if directory.is_dir():
+                for entry in self._scan(directory.path):
+                    if entry.is_file() and not entry.name.startswith('.tmp-'):
+                        stat = entry.stat()
+                        blobs.append((stat.st_mtime, stat.st_size, entry.name, entry.path))
+
+        size = sum(blob[1] for blob in blobs)
+        removed = set()
+        freed = 0
+        for _mtime, blob_size, sha256, path in sorted(blobs):
+            if size <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            removed.add(sha256)
+            size -= blob_size
+            freed += blob_size
+
+        if removed:
+            self._remove_meta(removed)
+            _logger.info(
+                f"Caché de imágenes: {len(removed)} imágenes borradas ({freed} bytes), "
+                f"quedan {size} bytes"
+            )
+        return {'removed': len(removed), 'freed': freed, 'size': size}
+
+    def _remove_meta(self, removed):
+        """Borra los metadatos que apuntan a blobs borrados"""
+        for entry in self._scan(os.path.join(self.root, 'meta')):
+            try:
+                with open(entry.path, encoding='utf-8') as meta_file:
+                    sha256 = json.load(meta_file).get('sha256')
+                if sha256 in removed:
+                    os.unlink(entry.path)
+            except (OSError, ValueError):
+                continue
+
+    @staticmethod
+    def _scan(path):
+        try:
+            with os.scandir(path) as entries:
+                return list(entries)
+        except OSError:
+            return []
+
+    @staticmethod
+    def _touch(path):
+        """Marca el blob como usado ahora (LRU). False si no existe"""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.root, 'blobs', sha256[:2], sha256)
+
+    def _meta_path(self, url):
+        return os.path.join(self.root, 'meta', f"{self.sha256(url.encode('utf-8'))}.json")
+
+    @staticmethod
+    def _write_atomic(path, content):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
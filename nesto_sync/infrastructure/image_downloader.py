@@ -0,0 +1,224 @@
+"""
+Image Downloader - Descarga y validación de imágenes de producto
+
+Comparte una requests.Session por proceso (pool de conexiones keep-alive
+por host) con reintentos y backoff exponencial ante errores transitorios.
+No usa el Environment de Odoo, así que puede ejecutarse en hilos.
+
+Si tiene una ImageCache, hace peticiones condicionales (ETag /
+Last-Modified) y reutiliza el contenido cacheado ante un 304.
+
+Lo usan UrlToImageTransformer (modo síncrono) y el fetcher en segundo
+plano de imágenes (models/image_fetcher.py).
+"""
+
+import base64
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from .image_cache import ImageCache
+
+_logger = logging.getLogger(__name__)
+
+
+class ImageDownloader:
+    """Descarga imágenes con un pool de conexiones y reintentos"""
+
+    TIMEOUT = 10
+    RETRIES = 3
+    BACKOFF_FACTOR = 0.5
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    }
+
+    def __init__(self, pool_size=8, cache=None):
+        """
+        Inicializa el downloader
+
+        Args:
+            pool_size (int): Conexiones simultáneas por host
+            cache (ImageCache): Caché en disco para peticiones condicionales (opcional)
+        """
+        self.pool_size = pool_size
+        self.cache = cache
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """requests.Session compartida (lazy)"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    from urllib3.util.retry import Retry
+
+                    retry = Retry(
+                        total=self.RETRIES,
+                        backoff_factor=self.BACKOFF_FACTOR,
+                        status_forcelist=self.RETRY_STATUS,
+                        allowed_methods=frozenset(['GET', 'HEAD']),
+                        raise_on_status=False,
+                    )
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_size,
+                        pool_maxsize=self.pool_size,
+                        max_retries=retry,
+                    )
+                    session = requests.Session()
+                    session.headers.update(self.HEADERS)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def fetch(self, url, known_sha256=None):
+        """
+        Descarga y valida una imagen
+
+        Args:
+            url (str): URL HTTP/HTTPS de la imagen
+            known_sha256 (str): SHA-256 de la imagen que ya tiene el producto.
+                Si coincide, no se devuelve la imagen (unchanged=True)
+
+        Returns:
+            Dict con:
+                - url: URL solicitada
+                - image (str|None): Imagen en base64 si es válida y cambió
+                - sha256 (str|None): SHA-256 del contenido
+                - unchanged (bool): True si el contenido es el de known_sha256
+                - error (str|None): Motivo del fallo
+                - retry (bool): True si el fallo es transitorio (reintentar más tarde)
+        """
+        import requests
+
+        try:
+            meta = self.cache.get_meta(url) if self.cache else None
+            headers = {}
+            if meta and meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta and meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+            _logger.info(f"Descargando imagen desde: {url}")
+            response = self.session.get(url, timeout=self.TIMEOUT, headers=headers)
+
+            if response.status_code == 304 and meta:
+                _logger.info(f"Imagen no modificada (304): {url}")
+                return self._cached_result(url, meta['sha256'], known_sha256)
+
+            response.raise_for_status()
+
+            # Verificar que sea una imagen
+            content_type = response.headers.get('Content-Type', '')
+            if not content_type.startswith('image/'):
+                _logger.warning(f"URL no devuelve una imagen (Content-Type: {content_type}): {url}")
+                return self._result(url, error=f"Content-Type no es imagen: {content_type}")
+
+            image_data = response.content
+            error = self.verify(image_data)
+            if error:
+                _logger.warning(f"Imagen corrupta o formato inválido: {url} - Error: {error}")
+                return self._result(url, error=error)
+
+            _logger.info(f"Imagen descargada correctamente: {url} ({len(image_data)} bytes)")
+            if self.cache:
+                sha256 = self.cache.store(
+                    url, image_data,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                )
+            else:
+                sha256 = hashlib.sha256(image_data).hexdigest()
+
+            if sha256 == known_sha256:
+                return self._result(url, sha256=sha256, unchanged=True)
+            return self._result(
+                url, image=base64.b64encode(image_data).decode('utf-8'), sha256=sha256
+            )
+
+        except requests.exceptions.Timeout:
+            _logger.warning(f"Timeout al descargar imagen: {url}")
+            return self._result(url, error='Timeout', retry=True)
+
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code
+            _logger.warning(f"Error HTTP al descargar imagen ({status}): {url}")
+            return self._result(url, error=f"HTTP {status}", retry=status in self.RETRY_STATUS)
+
+        except requests.exceptions.RequestException as e:
+            _logger.warning(f"Error al descargar imagen: {url} - Error: {e}")
+            return self._result(url, error=str(e), retry=True)
+
+        except Exception as e:
+            _logger.error(f"Error inesperado al procesar imagen: {url} - Error: {e}")
+            return self._result(url, error=str(e))
+
+    def fetch_many(self, requests_list, concurrency=None):
+        """
+        Descarga varias imágenes en paralelo (concurrencia acotada)
+
+        Args:
+            requests_list: Iterable de (url, known_sha256); cada par se descarga una vez
+            concurrency (int): Descargas simultáneas (por defecto, pool_size)
+
+        Returns:
+            Dict {(url, known_sha256): resultado de fetch()}
+        """
+        unique = list(dict.fromkeys(requests_list))
+        if not unique:
+            return {}
+
+        workers = min(concurrency or self.pool_size, len(unique))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='nesto-img') as executor:
+            results = executor.map(lambda item: self.fetch(*item), unique)
+            return dict(zip(unique, results))
+
+    @staticmethod
+    def verify(image_data):
+        """Valida la integridad de la imagen con PIL. Devuelve el error o None"""
+        from PIL import Image
+
+        try:
+            Image.open(BytesIO(image_data)).verify()
+        except Exception as e:
+            return str(e) or 'Imagen inválida'
+        return None
+
+    def _cached_result(self, url, sha256, known_sha256):
+        """Resultado de un 304: la imagen sale de la caché en disco"""
+        if sha256 == known_sha256:
+            return self._result(url, sha256=sha256, unchanged=True)
+        content = self.cache.get_content(sha256)
+        if content is None:
+            return self._result(url, error='Imagen cacheada no disponible', retry=True)
+        return self._result(url, image=base64.b64encode(content).decode('utf-8'), sha256=sha256)
+
+    @staticmethod
+    def _result(url, image=None, sha256=None, unchanged=False, error=None, retry=False):
+        return {
+            'url': url,
+            'image': image,
+            'sha256': sha256,
+            'unchanged': unchanged,
+            'error': error,
+            'retry': retry,
+        }
+
+
+_downloader = None
+_downloader_lock = threading.Lock()
+
+
+def get_image_downloader(pool_size=8):
+    """Devuelve el ImageDownloader compartido del proceso (con caché en disco)"""
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None or _downloader.pool_size < pool_size:
+            _downloader = ImageDownloader(pool_size=pool_size, cache=ImageCache.default())
+        return _downloader
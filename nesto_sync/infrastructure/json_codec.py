@@ -0,0 +1,80 @@
+"""
+JSON Codec - Decodificación JSON con ruta rápida opcional
+
+Los envelopes de Pub/Sub (y sobre todo los productos con ProductosKit y los
+lotes) se decodifican en cada petición. Si está instalado orjson (o, en su
+defecto, ujson) se usa para decodificar directamente desde bytes, sin la
+copia intermedia a str; si no, se usa json de la librería estándar.
+
+Todas las variantes lanzan ValueError (o subclases) con JSON inválido, igual
+que json.loads, así que los llamantes no distinguen qué backend se usa.
+
+dumps_canonical serializa con claves ordenadas para calcular hashes de
+payloads (ver core/idempotency.py).
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _ujson_loads(data):
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode('utf-8')
+    return ujson.loads(data)
+
+
+def _json_loads(data):
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
+
+
+if orjson is not None:
+    BACKEND, _loads = 'orjson', orjson.loads
+elif ujson is not None:
+    BACKEND, _loads = 'ujson', _ujson_loads
+else:
+    BACKEND, _loads = 'json', _json_loads
+
+
+def loads(data):
+    """
+    Decodifica JSON desde str o bytes (UTF-8)
+
+    Args:
+        data (str | bytes): Documento JSON
+
+    Returns:
+        Objeto decodificado
+
+    Raises:
+        ValueError: Si el documento no es JSON válido
+    """
+    return _loads(data)
+
+
+def dumps_canonical(data):
+    """
+    Serialización canónica (claves ordenadas, sin espacios) para calcular hashes
+
+    Dos documentos con el mismo contenido producen los mismos bytes sea cual
+    sea el orden de sus claves.
+
+    Args:
+        data: Objeto serializable (los valores no JSON se convierten con str)
+
+    Returns:
+        bytes: Documento JSON en UTF-8
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
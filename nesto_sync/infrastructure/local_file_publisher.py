@@ -0,0 +1,171 @@
+"""
+Local File Publisher - Implementación de IEventPublisher sobre ficheros locales
+
+Publica los eventos en un log de segmentos en disco (JSON por líneas), sin
+red: permite ejecutar el camino Odoo → Nesto completo en staging y CI, y
+medir el rendimiento de la publicación sin la latencia de Pub/Sub.
+
+Estructura bajo <data_dir>/nesto_sync/events (o nesto_sync.local_publisher_path):
+- segment-<pid>-<n>.ndjson: una línea por evento
+  {"topic": ..., "published_at": ..., "message": {...}}
+  (con "ordering_key" si el evento se publicó con clave de ordenación)
+
+Cada proceso escribe en sus propios segmentos (sin mezclar líneas entre
+workers) y pasa al siguiente al superar max_segment_bytes. El fsync se hace
+por lotes: cada fsync_every eventos o fsync_interval segundos, y al cerrar.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from ..interfaces.event_publisher import IEventPublisher
+
+_logger = logging.getLogger(__name__)
+
+
+class LocalFilePublisher(IEventPublisher):
+    """Publica eventos en un log de segmentos NDJSON local"""
+
+    DEFAULT_FSYNC_EVERY = 100  # Eventos por fsync (nesto_sync.local_publisher_fsync_every)
+    DEFAULT_FSYNC_INTERVAL = 1.0  # Segundos máximos sin fsync
+    DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024  # Tamaño de segmento (nesto_sync.local_publisher_segment_mb)
+
+    def __init__(self, root, fsync_every=DEFAULT_FSYNC_EVERY, fsync_interval=DEFAULT_FSYNC_INTERVAL,
+                 max_segment_bytes=DEFAULT_MAX_SEGMENT_BYTES):
+        """
+        Inicializa el publisher local
+
+        Args:
+            root (str): Directorio de los segmentos
+            fsync_every (int): Eventos escritos entre fsync (1 = fsync por evento)
+            fsync_interval (float): Segundos máximos entre fsync
+            max_segment_bytes (int): Tamaño a partir del cual se abre otro segmento
+        """
+        self.root = root
+        self.fsync_every = max(1, int(fsync_every))
+        self.fsync_interval = fsync_interval
+        self.max_segment_bytes = max_segment_bytes
+
+        self._lock = threading.Lock()
+        self._fd = None
+        self._segment = 0
+        self._segment_bytes = 0
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+
+    @staticmethod
+    def default_root():
+        """Directorio de eventos en el data_dir de Odoo"""
+        from odoo.tools import config
+        return os.path.join(config['data_dir'], 'nesto_sync', 'events')
+
+    def publish_event(self, topic, message, ordering_key=None):
+        """
+        Añade un evento al segmento actual
+
+        Args:
+            topic (str): Nombre del topic
+            message (dict or str): Mensaje (un str se asume JSON ya serializado)
+            ordering_key (str, optional): Clave de ordenación (se guarda en el evento)
+
+        Returns:
+            bool: True si se escribió
+
+        Raises:
+            ValueError: Si el mensaje no es dict ni str
+            OSError: Si no se puede escribir
+        """
+        if isinstance(message, str):
+            message = json.loads(message)
+        elif not isinstance(message, dict):
+            raise ValueError(f"Mensaje debe ser dict o str, recibido: {type(message)}")
+
+        event = {
+            'topic': topic,
+            'published_at': datetime.now(timezone.utc).isoformat(),
+            'message': message,
+        }
+        if ordering_key:
+            event['ordering_key'] = ordering_key
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        data = line.encode('utf-8')
+
+        with self._lock:
+            fd = self._get_fd(len(data))
+            os.write(fd, data)
+            self._segment_bytes += len(data)
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_fsync >= self.fsync_interval):
+                self._fsync()
+
+        _logger.debug(f"Evento local publicado a {topic}: {len(data)} bytes")
+        return True
+
+    def flush(self):
+        """Fuerza el fsync de los eventos pendientes"""
+        with self._lock:
+            self._fsync()
+
+    def close(self):
+        """Sincroniza y cierra el segmento actual"""
+        with self._lock:
+            self._fsync()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _get_fd(self, incoming_bytes):
+        """Descriptor del segmento actual (abre otro si este se llenaría)"""
+        if self._fd is not None and self._segment_bytes + incoming_bytes > self.max_segment_bytes:
+            self._fsync()
+            os.close(self._fd)
+            self._fd = None
+
+        if self._fd is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._segment += 1
+            path = os.path.join(self.root, f'segment-{os.getpid()}-{self._segment:06d}.ndjson')
+            self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o640)
+            self._segment_bytes = os.fstat(self._fd).st_size
+        return self._fd
+
+    def _fsync(self):
+        if self._fd is not None and self._unsynced:
+            os.fsync(self._fd)
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+
+    @staticmethod
+    def read_events(root, topic=None):
+        """
+        Lee los eventos publicados (para tests, benchmarks y depuración)
+
+        Args:
+            root (str): Directorio de los segmentos
+            topic (str, optional): Solo los de este topic
+
+        Returns:
+            list: Eventos {'topic', 'published_at', 'message'[, 'ordering_key']} por segmento y orden de escritura
+        """
+        events = []
+        for path in sorted(glob.glob(os.path.join(root, 'segment-*.ndjson'))):
+            with open(path, encoding='utf-8') as segment:
+                for line in segment:
+                    if not line.strip():
+                        continue
+                    event = json.loads(line)
+                    if topic is None or event['topic'] == topic:
+                        events.append(event)
+        return events
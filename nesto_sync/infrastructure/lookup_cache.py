@@ -0,0 +1,174 @@
+"""
+Lookup Cache - Caché compartida de resoluciones many2one
+
+Los transformers resuelven en cada mensaje los mismos valores (categorías
+de Grupo/Subgrupo/Familia, UoM, vendedores por email, países por código).
+Esta caché guarda esas resoluciones (solo IDs) por proceso:
+
+- Clave: (base de datos, modelo, clave normalizada por el llamante)
+- Expulsión LRU (MAX_SIZE entradas) y caducidad por TTL
+- Invalidación al crear/modificar/borrar registros de los modelos cacheados
+  (ver models/lookup_cache_invalidation.py)
+
+Invalidación entre workers: cada invalidación inserta una fila en
+nesto_sync_lookup_cache_generation dentro de la transacción que cambia los
+datos. La generación es max(id) de esa tabla: cada transacción la lee una
+vez (con la primera resolución) y cada entrada guarda la generación con la
+que se resolvió. Al hacer commit la invalidación, el resto de workers ven
+una generación mayor y descartan sus entradas anteriores. Como la
+generación y los valores se leen en la misma transacción, una entrada
+nunca queda marcada con una generación más nueva que sus datos.
+
+Transaccionalidad: lo resuelto dentro de una transacción (incluidos los
+registros recién creados) queda en una caché pendiente asociada al cursor
+y solo pasa a la caché compartida tras el commit. Un rollback la descarta,
+así otra petición nunca recibe el ID de un registro que no llegó a existir.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+_logger = logging.getLogger(__name__)
+
+# Clave de cr.postcommit.data donde se guardan las resoluciones pendientes
+PENDING_KEY = 'nesto_sync.lookup_cache'
+
+# Clave de cr.postcommit.data con la generación leída por la transacción
+GENERATION_KEY = 'nesto_sync.lookup_cache_generation'
+
+# Tabla de generaciones (modelo nesto.sync.lookup.cache.generation)
+GENERATION_TABLE = 'nesto_sync_lookup_cache_generation'
+
+_MISS = object()
+
+
+class LookupCache:
+    """Caché LRU con TTL de resoluciones many2one, compartida por el proceso"""
+
+    MAX_SIZE = 10000
+    TTL = 300  # Segundos (los cambios de otros workers llegan por la generación)
+
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or self.MAX_SIZE
+        self.ttl = ttl or self.TTL
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, env, model, key, loader):
+        """
+        Devuelve el valor cacheado o lo calcula con loader()
+
+        Args:
+            env: Environment de Odoo (para la base de datos y el cursor)
+            model (str): Modelo resuelto (ej: 'uom.uom')
+            key: Clave hashable ya normalizada por el llamante
+            loader: Función sin argumentos que resuelve el valor (ID o None)
+
+        Returns:
+            Valor cacheado o resuelto
+        """
+        pending = self._pending(env.cr)
+        cache_key = (env.cr.dbname, model, key)
+
+        value = pending.get(cache_key, _MISS)
+        if value is _MISS:
+            value = self._get_shared(cache_key, self._generation(env.cr))
+
+        if value is not _MISS:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = loader()
+        pending[cache_key] = value
+        return value
+
+    def invalidate(self, env, model):
+        """
+        Descarta las entradas de un modelo (compartidas y pendientes)
+
+        Se repite tras el commit por si otra transacción volvió a cargar
+        el valor antiguo mientras esta seguía abierta. Los demás workers
+        descartan sus entradas al ver la nueva generación tras el commit.
+        """
+        cr = env.cr
+        dbname = cr.dbname
+        pending = self._pending(cr)
+        for cache_key in [k for k in pending if k[0] == dbname and k[1] == model]:
+            del pending[cache_key]
+
+        cr.execute(f'INSERT INTO "{GENERATION_TABLE}" (model) VALUES (%s) RETURNING id', (model,))
+        cr.postcommit.data[GENERATION_KEY] = cr.fetchone()[0]
+
+        self._invalidate_shared(dbname, model)
+        cr.postcommit.add(lambda: self._invalidate_shared(dbname, model))
+
+    def discard_pending(self, cr):
+        """Descarta lo resuelto en la transacción actual (rollback a savepoint)"""
+        cr.postcommit.data.get(PENDING_KEY, {}).clear()
+
+    def clear(self):
+        """Vacía la caché compartida"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    def _pending(self, cr):
+        """Resoluciones de la transacción actual; se publican en el commit"""
+        data = cr.postcommit.data
+        if PENDING_KEY not in data:
+            pending = data[PENDING_KEY] = {}
+            # data se vacía después de ejecutar los postcommit: la generación sigue ahí
+            cr.postcommit.add(lambda: self._publish(pending, data.get(GENERATION_KEY, 0)))
+        return data[PENDING_KEY]
+
+    @staticmethod
+    def _generation(cr):
+        """Generación de la caché vista por la transacción actual (una consulta por transacción)"""
+        data = cr.postcommit.data
+        generation = data.get(GENERATION_KEY)
+        if generation is None:
+            cr.execute(f'SELECT COALESCE(max(id), 0) FROM "{GENERATION_TABLE}"')
+            generation = data[GENERATION_KEY] = cr.fetchone()[0]
+        return generation
+
+    def _publish(self, pending, generation):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for cache_key, value in pending.items():
+                self._entries[cache_key] = (expires, generation, value)
+                self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, cache_key, generation):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return _MISS
+            expires, entry_generation, value = entry
+            if expires < time.monotonic() or entry_generation < generation:
+                del self._entries[cache_key]
+                return _MISS
+            self._entries.move_to_end(cache_key)
+            return value
+
+    def _invalidate_shared(self, dbname, model):
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[0] == dbname and k[1] == model]:
+                del self._entries[cache_key]
+
+
+# Instancia compartida por todo el proceso
+lookup_cache = LookupCache()
@@ -3,11 +3,20 @@ Publisher Factory - Factory para crear publishers según configuración
 
 Permite cambiar de proveedor (Google Pub/Sub, Azure Service Bus, RabbitMQ, etc.)
 solo cambiando parámetros de configuración en Odoo
+
+Los publishers se cachean por proceso y base de datos, con la configuración
+como parte de la clave: cada write de un modelo sincronizado reutiliza el
+mismo publisher (y su cliente gRPC) en lugar de construir uno nuevo. Si los
+parámetros cambian, la clave cambia y se crea otro (en todos los workers, ya
+que get_param se invalida entre procesos); además, al modificar un parámetro
+nesto_sync.* se descartan los publishers de esa base de datos.
 """
 
 import logging
+import threading
 from ..interfaces.event_publisher import IEventPublisher
 from .google_pubsub_publisher import GooglePubSubPublisher
+from .local_file_publisher import LocalFilePublisher
 
 _logger = logging.getLogger(__name__)
 
@@ -20,15 +29,25 @@ class PublisherFactory:
     el publisher apropiado según el proveedor configurado
     """
 
+    # Publishers por proceso: {(dbname, provider, *configuración): IEventPublisher}
+    _cache = {}
+    _cache_lock = threading.Lock()
+
     @staticmethod
     def create_publisher(env) -> IEventPublisher:
         """
         Crea un publisher según configuración de Odoo
 
         Lee los parámetros:
-        - nesto_sync.event_publisher: Proveedor a usar (google_pubsub, azure_servicebus, rabbitmq)
+        - nesto_sync.event_publisher: Proveedor a usar (google_pubsub, local, azure_servicebus, rabbitmq)
         - nesto_sync.google_project_id: ID del proyecto de Google Cloud (si usa google_pubsub)
         - nesto_sync.google_credentials_path: Path a credenciales (opcional)
+        - nesto_sync.pubsub_batch_max_messages / _max_bytes / _max_latency:
+          BatchSettings del cliente de Google Pub/Sub (opcionales)
+        - nesto_sync.pubsub_message_ordering: Publicar con ordering key por
+          entidad y clave externa (opcional, desactivado por defecto)
+        - nesto_sync.local_publisher_path / _fsync_every / _segment_mb:
+          Directorio, fsync por lotes y tamaño de segmento (si usa local)
 
         Args:
             env: Odoo environment
@@ -44,10 +63,19 @@ class PublisherFactory:
         # Obtener proveedor configurado (por defecto: google_pubsub)
         provider = config.get_param('nesto_sync.event_publisher', 'google_pubsub')
 
-        _logger.info(f"Creando publisher para proveedor: {provider}")
-
         if provider == 'google_pubsub':
-            return PublisherFactory._create_google_pubsub_publisher(config)
+            settings = PublisherFactory._get_google_pubsub_settings(config)
+            return PublisherFactory._get_cached(
+                (env.cr.dbname, provider) + settings,
+                lambda: PublisherFactory._create_google_pubsub_publisher(config, settings)
+            )
+
+        elif provider == 'local':
+            settings = PublisherFactory._get_local_settings(config)
+            return PublisherFactory._get_cached(
+                (env.cr.dbname, provider) + settings,
+                lambda: PublisherFactory._create_local_publisher(settings)
+            )
 
         elif provider == 'azure_servicebus':
             raise NotImplementedError(
@@ -64,19 +92,47 @@ class PublisherFactory:
         else:
             raise ValueError(
                 f"Proveedor no soportado: {provider}. "
-                f"Valores válidos: google_pubsub, azure_servicebus, rabbitmq"
+                f"Valores válidos: google_pubsub, local, azure_servicebus, rabbitmq"
             )
 
     @staticmethod
-    def _create_google_pubsub_publisher(config) -> GooglePubSubPublisher:
+    def _get_cached(key, build):
         """
-        Crea publisher de Google Pub/Sub
+        Publisher cacheado para la clave, construido con build() si no existe
+
+        Al construir uno nuevo se descartan los de la misma base de datos y
+        proveedor (configuración anterior).
+        """
+        publisher = PublisherFactory._cache.get(key)
+        if publisher is None:
+            with PublisherFactory._cache_lock:
+                publisher = PublisherFactory._cache.get(key)
+                if publisher is None:
+                    _logger.info(f"Creando publisher para proveedor: {key[1]}")
+                    publisher = build()
+                    for stale in [k for k in PublisherFactory._cache if k[:2] == key[:2]]:
+                        del PublisherFactory._cache[stale]
+                    PublisherFactory._cache[key] = publisher
+        return publisher
+
+    @staticmethod
+    def clear_cache(dbname=None):
+        """
+        Descarta los publishers cacheados
 
         Args:
-            config: Objeto ir.config_parameter para leer configuración
+            dbname (str, optional): Solo los de esta base de datos (por defecto, todos)
+        """
+        with PublisherFactory._cache_lock:
+            for key in list(PublisherFactory._cache):
+                if dbname is None or key[0] == dbname:
+                    del PublisherFactory._cache[key]
 
-        Returns:
-            GooglePubSubPublisher: Publisher configurado
+    @staticmethod
+    def _get_google_pubsub_settings(config):
+        """
+        Configuración de Google Pub/Sub:
+        (project_id, credentials_path, batch_settings, message_ordering)
 
         Raises:
             ValueError: Si falta configuración obligatoria
@@ -89,19 +145,91 @@ class PublisherFactory:
                 "Configúralo en Configuración → Parámetros del Sistema"
             )
 
-        credentials_path = config.get_param('nesto_sync.google_credentials_path')
+        credentials_path = config.get_param('nesto_sync.google_credentials_path') or None
+        message_ordering = (config.get_param('nesto_sync.pubsub_message_ordering') or '').lower() in (
+            'true', '1'
+        )
+        return (
+            project_id,
+            credentials_path,
+            PublisherFactory._get_batch_settings(config),
+            message_ordering,
+        )
+
+    @staticmethod
+    def _create_google_pubsub_publisher(config, settings=None) -> GooglePubSubPublisher:
+        """
+        Crea publisher de Google Pub/Sub
+
+        Args:
+            config: Objeto ir.config_parameter para leer configuración
+            settings (tuple, optional): Resultado de _get_google_pubsub_settings
+
+        Returns:
+            GooglePubSubPublisher: Publisher configurado
+
+        Raises:
+            ValueError: Si falta configuración obligatoria
+        """
+        project_id, credentials_path, batch_settings, message_ordering = (
+            settings or PublisherFactory._get_google_pubsub_settings(config)
+        )
 
         _logger.info(
             f"Configurando Google Pub/Sub Publisher: "
             f"project_id={project_id}, "
-            f"credentials={'custom' if credentials_path else 'default'}"
+            f"credentials={'custom' if credentials_path else 'default'}, "
+            f"batch_settings={batch_settings}, "
+            f"message_ordering={message_ordering}"
         )
 
         return GooglePubSubPublisher(
             project_id=project_id,
-            credentials_path=credentials_path
+            credentials_path=credentials_path,
+            batch_settings=batch_settings,
+            message_ordering=message_ordering
         )
 
+    @staticmethod
+    def _get_batch_settings(config):
+        """
+        BatchSettings de Pub/Sub: (max_messages, max_bytes, max_latency)
+
+        Valores por defecto de la librería salvo max_latency, algo mayor para
+        que los mensajes de una misma transacción viajen en pocos lotes.
+        """
+        return (
+            int(config.get_param('nesto_sync.pubsub_batch_max_messages', 100)),
+            int(config.get_param('nesto_sync.pubsub_batch_max_bytes', 1024 * 1024)),
+            float(config.get_param('nesto_sync.pubsub_batch_max_latency', 0.05)),
+        )
+
+    @staticmethod
+    def _get_local_settings(config):
+        """Configuración del publisher local: (root, fsync_every, max_segment_bytes)"""
+        root = config.get_param('nesto_sync.local_publisher_path') or LocalFilePublisher.default_root()
+        fsync_every = int(config.get_param(
+            'nesto_sync.local_publisher_fsync_every', LocalFilePublisher.DEFAULT_FSYNC_EVERY))
+        segment_mb = int(config.get_param(
+            'nesto_sync.local_publisher_segment_mb',
+            LocalFilePublisher.DEFAULT_MAX_SEGMENT_BYTES // (1024 * 1024)))
+        return root, fsync_every, segment_mb * 1024 * 1024
+
+    @staticmethod
+    def _create_local_publisher(settings) -> LocalFilePublisher:
+        """
+        Crea el publisher local (segmentos NDJSON en disco, sin red)
+
+        Args:
+            settings (tuple): Resultado de _get_local_settings
+
+        Returns:
+            LocalFilePublisher: Publisher configurado
+        """
+        root, fsync_every, max_segment_bytes = settings
+        _logger.info(f"Configurando publisher local: path={root}, fsync_every={fsync_every}")
+        return LocalFilePublisher(root, fsync_every=fsync_every, max_segment_bytes=max_segment_bytes)
+
     # Métodos para crear otros publishers (futuro)
 
     @staticmethod
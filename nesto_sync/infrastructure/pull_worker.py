@@ -0,0 +1,316 @@
+"""
+Pull Subscriber Worker - Consumidor PubSub de larga duración
+
+Alternativa al push HTTP para cargas masivas (re-sincronizaciones nocturnas):
+- Un hilo "puller" pide lotes a la suscripción respetando el control de
+  flujo (máximo de mensajes y bytes pendientes) y los deja en una cola acotada
+- N hilos de base de datos vacían la cola por lotes y los procesan con
+  BatchMessageProcessor, cada uno con su propio cursor
+- Un hilo extiende el plazo de ack de los mensajes en vuelo mientras se procesan
+
+La contrapresión es natural: si la BD no da abasto, la cola se llena, los
+mensajes pendientes llegan al límite y el puller deja de pedir más.
+
+Se arranca con el comando `odoo-bin nesto_pull` (ver cli/nesto_pull.py).
+"""
+
+import logging
+import queue
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+
+class PullWorkerSettings:
+    """
+    Configuración del worker pull, leída de ir.config_parameter
+
+    Parámetros:
+    - nesto_sync.pull_workers: Hilos de base de datos (4)
+    - nesto_sync.pull_queue_size: Capacidad de la cola en memoria (1000)
+    - nesto_sync.pull_batch_size: Mensajes por pull y por lote de BD (100)
+    - nesto_sync.pull_max_outstanding_messages: Mensajes pendientes máximos (1000)
+    - nesto_sync.pull_max_outstanding_bytes: Bytes pendientes máximos (10 MB)
+    - nesto_sync.pull_ack_deadline: Plazo de ack en segundos que se renueva (60)
+    """
+
+    DEFAULTS = {
+        'workers': 4,
+        'queue_size': 1000,
+        'batch_size': 100,
+        'max_outstanding_messages': 1000,
+        'max_outstanding_bytes': 10 * 1024 * 1024,
+        'ack_deadline': 60,
+    }
+
+    # Tiempo máximo que un hilo de BD espera para completar un lote
+    MAX_BATCH_WAIT = 1.0
+
+    def __init__(self, **kwargs):
+        for key, default in self.DEFAULTS.items():
+            setattr(self, key, int(kwargs.get(key) or default))
+
+    @classmethod
+    def from_env(cls, env):
+        """Crea la configuración desde los parámetros del sistema"""
+        config = env['ir.config_parameter'].sudo()
+        return cls(**{
+            key: config.get_param(f'nesto_sync.pull_{key}', default)
+            for key, default in cls.DEFAULTS.items()
+        })
+
+    def __repr__(self):
+        values = ', '.join(f"{key}={getattr(self, key)}" for key in self.DEFAULTS)
+        return f"PullWorkerSettings({values})"
+
+
+class OutstandingLeases:
+    """
+    Mensajes recibidos de PubSub y aún no confirmados/rechazados
+
+    Thread-safe. Sirve para el control de flujo del puller y para saber
+    qué plazos de ack hay que extender.
+    """
+
+    def __init__(self, max_messages, max_bytes):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._leases = {}
+        self._bytes = 0
+        self._condition = threading.Condition()
+
+    def add(self, ack_id, size):
+        with self._condition:
+            self._leases[ack_id] = size
+            self._bytes += size
+
+    def release(self, ack_ids):
+        with self._condition:
+            for ack_id in ack_ids:
+                self._bytes -= self._leases.pop(ack_id, 0)
+            self._condition.notify_all()
+
+    def room(self):
+        """Número de mensajes que se pueden pedir sin superar los límites"""
+        with self._condition:
+            if self._bytes >= self.max_bytes:
+                return 0
+            return max(self.max_messages - len(self._leases), 0)
+
+    def wait_for_room(self, timeout):
+        """Espera hasta que haya hueco o venza el timeout. Devuelve el hueco"""
+        with self._condition:
+            if self._bytes < self.max_bytes and len(self._leases) < self.max_messages:
+                return self.max_messages - len(self._leases)
+            self._condition.wait(timeout)
+        return self.room()
+
+    def ack_ids(self):
+        with self._condition:
+            return list(self._leases)
+
+    def __len__(self):
+        with self._condition:
+            return len(self._leases)
+
+
+class PullSubscriberWorker:
+    """Worker pull con cola acotada y N hilos de base de datos"""
+
+    # Máximo de ack_ids por llamada a modify_ack_deadline
+    ACK_CHUNK_SIZE = 500
+
+    def __init__(self, dbname, subscriber, settings):
+        """
+        Inicializa el worker
+
+        Args:
+            dbname (str): Base de datos de Odoo donde aplicar los mensajes
+            subscriber: GooglePubSubSubscriber
+            settings (PullWorkerSettings): Configuración de flujo y concurrencia
+        """
+        self.dbname = dbname
+        self.subscriber = subscriber
+        self.settings = settings
+        self.queue = queue.Queue(maxsize=settings.queue_size)
+        self.outstanding = OutstandingLeases(
+            settings.max_outstanding_messages, settings.max_outstanding_bytes
+        )
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Arranca los hilos puller, extensor de plazos y de base de datos"""
+        _logger.info(f"Arrancando worker pull para {self.dbname}: {self.settings}")
+
+        self._threads = [
+            threading.Thread(target=self._pull_loop, name='nesto-pull', daemon=True),
+            threading.Thread(target=self._lease_loop, name='nesto-pull-lease', daemon=True),
+        ]
+        for index in range(self.settings.workers):
+            self._threads.append(threading.Thread(
+                target=self._db_loop, name=f'nesto-pull-db-{index}', daemon=True
+            ))
+
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=30):
+        """
+        Para el worker: deja de pedir mensajes, termina los lotes en curso
+        y rechaza (nack) lo que quede en la cola para que se reentregue
+        """
+        _logger.info("Parando worker pull...")
+        self._stop.set()
+
+        for thread in self._threads:
+            thread.join(timeout)
+
+        pending = []
+        while True:
+            try:
+                pending.append(self.queue.get_nowait()[0])
+            except queue.Empty:
+                break
+
+        if pending:
+            self._safe_nack(pending)
+            self.outstanding.release(pending)
+
+        _logger.info(f"Worker pull parado ({len(pending)} mensajes devueltos a PubSub)")
+
+    def run_forever(self):
+        """Arranca el worker y bloquea hasta KeyboardInterrupt / SystemExit"""
+        self.start()
+        try:
+            while not self._stop.is_set():
+                time.sleep(1)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.stop()
+
+    # ------------------------------------------------------------------
+    # Hilos
+    # ------------------------------------------------------------------
+
+    def _pull_loop(self):
+        """Pide mensajes mientras haya hueco según el control de flujo"""
+        while not self._stop.is_set():
+            room = self.outstanding.wait_for_room(timeout=1)
+            if room <= 0:
+                continue
+
+            try:
+                leased = self.subscriber.pull(min(self.settings.batch_size, room))
+            except Exception as e:
+                # DeadlineExceeded cuando la suscripción está vacía, cortes de red...
+                _logger.debug(f"Pull sin mensajes o con error: {str(e)}")
+                self._stop.wait(1)
+                continue
+
+            for ack_id, envelope, size in leased:
+                self.outstanding.add(ack_id, size)
+                # Bloquea si la cola está llena (contrapresión)
+                while not self._stop.is_set():
+                    try:
+                        self.queue.put((ack_id, envelope), timeout=1)
+                        break
+                    except queue.Full:
+                        continue
+                else:
+                    self._safe_nack([ack_id])
+                    self.outstanding.release([ack_id])
+
+    def _lease_loop(self):
+        """Extiende el plazo de ack de los mensajes en vuelo"""
+        interval = max(self.settings.ack_deadline / 2, 1)
+        while not self._stop.wait(interval):
+            ack_ids = self.outstanding.ack_ids()
+            for start in range(0, len(ack_ids), self.ACK_CHUNK_SIZE):
+                chunk = ack_ids[start:start + self.ACK_CHUNK_SIZE]
+                try:
+                    self.subscriber.modify_ack_deadline(chunk, self.settings.ack_deadline)
+                except Exception as e:
+                    _logger.warning(f"Error extendiendo plazo de ack: {str(e)}")
+
+    def _db_loop(self):
+        """Vacía la cola por lotes y los aplica en base de datos"""
+        while not (self._stop.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._process_batch(batch)
+
+    def _next_batch(self):
+        """Toma hasta batch_size mensajes de la cola, esperando como mucho MAX_BATCH_WAIT"""
+        try:
+            batch = [self.queue.get(timeout=1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.settings.MAX_BATCH_WAIT
+        while len(batch) < self.settings.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    # ------------------------------------------------------------------
+    # Procesamiento
+    # ------------------------------------------------------------------
+
+    def _process_batch(self, batch):
+        """
+        Procesa un lote y confirma/rechaza cada mensaje tras el commit
+
+        Args:
+            batch: Lista de (ack_id, envelope)
+        """
+        ack_ids = [ack_id for ack_id, _envelope in batch]
+        envelopes = [envelope for _ack_id, envelope in batch]
+
+        try:
+            results = self._run_batch(envelopes)
+        except Exception as e:
+            _logger.error(f"Error procesando lote pull ({len(batch)} mensajes): {str(e)}", exc_info=True)
+            self._safe_nack(ack_ids)
+            self.outstanding.release(ack_ids)
+            return
+
+        to_ack = [ack_id for ack_id, result in zip(ack_ids, results) if result['ack']]
+        to_nack = [ack_id for ack_id, result in zip(ack_ids, results) if not result['ack']]
+
+        try:
+            self.subscriber.acknowledge(to_ack)
+        except Exception as e:
+            # Los cambios ya están en BD: si se reentregan, la detección de cambios los omitirá
+            _logger.warning(f"Error confirmando {len(to_ack)} mensajes: {str(e)}")
+        self._safe_nack(to_nack)
+        self.outstanding.release(ack_ids)
+
+    def _run_batch(self, envelopes):
+        """Aplica un lote en su propio cursor (BatchMessageProcessor hace el commit)"""
+        import odoo
+        from odoo import api, SUPERUSER_ID
+        from ..core.batch_processor import BatchMessageProcessor
+
+        threading.current_thread().dbname = self.dbname
+        registry = odoo.registry(self.dbname).check_signaling()
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            return BatchMessageProcessor(env).process_batch(envelopes)
+
+    def _safe_nack(self, ack_ids):
+        if not ack_ids:
+            return
+        try:
+            self.subscriber.nack(ack_ids)
+        except Exception as e:
+            # Si falla el nack, PubSub los reentregará al vencer el plazo
+            _logger.warning(f"Error rechazando {len(ack_ids)} mensajes: {str(e)}")
@@ -0,0 +1,59 @@
+"""
+Subscriber Factory - Factory para crear consumidores pull según configuración
+
+Simétrico a PublisherFactory: lee ir.config_parameter y crea el subscriber
+del proveedor configurado.
+"""
+
+import logging
+from .google_pubsub_subscriber import GooglePubSubSubscriber
+
+_logger = logging.getLogger(__name__)
+
+
+class SubscriberFactory:
+    """Factory para crear subscribers de eventos en modo pull"""
+
+    @staticmethod
+    def create_subscriber(env) -> GooglePubSubSubscriber:
+        """
+        Crea un subscriber según configuración de Odoo
+
+        Lee los parámetros:
+        - nesto_sync.google_project_id: ID del proyecto de Google Cloud
+        - nesto_sync.pull_subscription: Suscripción de la que consumir
+        - nesto_sync.google_credentials_path: Path a credenciales (opcional)
+
+        Args:
+            env: Odoo environment
+
+        Returns:
+            GooglePubSubSubscriber: Subscriber configurado
+
+        Raises:
+            ValueError: Si falta configuración obligatoria
+        """
+        config = env['ir.config_parameter'].sudo()
+
+        project_id = config.get_param('nesto_sync.google_project_id')
+        subscription = config.get_param('nesto_sync.pull_subscription')
+
+        if not project_id or not subscription:
+            raise ValueError(
+                "Falta configuración obligatoria para el modo pull: "
+                "nesto_sync.google_project_id y nesto_sync.pull_subscription. "
+                "Configúralos en Configuración → Parámetros del Sistema"
+            )
+
+        credentials_path = config.get_param('nesto_sync.google_credentials_path')
+
+        _logger.info(
+            f"Configurando Google Pub/Sub Subscriber: "
+            f"project_id={project_id}, subscription={subscription}"
+        )
+
+        return GooglePubSubSubscriber(
+            project_id=project_id,
+            subscription=subscription,
+            credentials_path=credentials_path
+        )
@@ -5,6 +5,7 @@ Similar a ISincronizacionEventPublisher en NestoAPI
 """
 
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
 
 
 class IEventPublisher(ABC):
@@ -18,13 +19,15 @@ class IEventPublisher(ABC):
     """
 
     @abstractmethod
-    def publish_event(self, topic, message):
+    def publish_event(self, topic, message, ordering_key=None):
         """
         Publica un evento de sincronización
 
         Args:
             topic (str): Nombre del topic/queue donde publicar
             message (dict): Mensaje a publicar (será serializado a JSON)
+            ordering_key (str, optional): Clave de ordenación (los mensajes con
+                la misma clave se entregan en orden de publicación)
 
         Returns:
             bool: True si se publicó correctamente, False en caso contrario
@@ -33,3 +36,28 @@ class IEventPublisher(ABC):
             Exception: Si hay error al publicar
         """
         pass
+
+    def publish_event_async(self, topic, message, callback=None, ordering_key=None):
+        """
+        Publica un evento sin esperar la confirmación
+
+        Implementación por defecto para proveedores sin API asíncrona:
+        publica de forma síncrona y devuelve un Future ya resuelto.
+
+        Args:
+            topic (str): Nombre del topic/queue donde publicar
+            message (dict): Mensaje a publicar
+            callback (callable, optional): Función a llamar cuando se complete
+            ordering_key (str, optional): Clave de ordenación (ver publish_event)
+
+        Returns:
+            Future: Resuelto con el resultado de publish_event (o su excepción)
+        """
+        future = Future()
+        try:
+            future.set_result(self.publish_event(topic, message, ordering_key=ordering_key))
+        except Exception as e:
+            future.set_exception(e)
+        if callback:
+            future.add_done_callback(callback)
+        return future
@@ -4,6 +4,12 @@ from . import product_template  # Modelo de productos
 from . import google_pubsub_message_adapter
 from . import failed_message  # DLQ para mensajes fallidos
 from . import message_retry  # Tracking de reintentos
+from . import pull_consumer  # Consumo PubSub en modo pull
+from . import lookup_cache_invalidation  # Invalidación de caché de lookups
+from . import image_fetcher  # Descarga de imágenes en segundo plano
+from . import outbox  # Outbox transaccional de publicaciones a Nesto
+from . import ir_config_parameter  # Invalidación de la caché de publishers
+from . import idempotency  # Descarte de mensajes de Nesto ya aplicados
 
 # Los imports de client_service y client_processor ya no son necesarios
 # porque ahora usamos el sistema genérico (core/)
\ No newline at end of file
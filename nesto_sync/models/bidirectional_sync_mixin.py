@@ -11,10 +11,13 @@ Ejemplo:
         _inherit = ['res.partner', 'bidirectional.sync.mixin']
 """
 
+import base64
+import binascii
+import hashlib
 import logging
 from odoo import models
-from ..config.entity_configs import ENTITY_CONFIGS
 from ..core.odoo_publisher import OdooPublisher
+from ..core.sync_index import SyncConfigIndex
 
 _logger = logging.getLogger(__name__)
 
@@ -63,6 +66,11 @@ class BidirectionalSyncMixin(models.AbstractModel):
     _name = 'bidirectional.sync.mixin'
     _description = 'Mixin para sincronización bidireccional Odoo → Nesto'
 
+    def _register_hook(self):
+        """Compila el índice modelo → configuración de sincronización al cargar el registry"""
+        super()._register_hook()
+        SyncConfigIndex.build()
+
     def write(self, vals):
         """
         Override de write() para sincronizar cambios a Nesto
@@ -79,40 +87,36 @@ class BidirectionalSyncMixin(models.AbstractModel):
             f"IDs: {self.ids}"
         )
 
-        # Guardar valores originales ANTES del write para detectar cambios
-        # Mapeamos {record.id: {field: old_value}}
-        original_values = {}
-        for record in self:
-            original_values[record.id] = {}
-            for field in vals.keys():
-                if field not in ('write_date', 'write_uid', '__last_update'):
-                    if hasattr(record, field):
-                        old_value = getattr(record, field, None)
-                        # Serializar Many2one
-                        if hasattr(old_value, 'id'):
-                            old_value = old_value.id
-                        original_values[record.id][field] = old_value
-
-        # Ejecutar write original
-        result = super(BidirectionalSyncMixin, self).write(vals)
-
         # Obtener entity_type para este modelo
         entity_type = self._get_entity_type_for_sync()
 
         if not entity_type:
             # Este modelo no tiene sincronización bidireccional configurada
-            return result
+            return super(BidirectionalSyncMixin, self).write(vals)
 
-        # Verificar si debemos saltarnos la sincronización
+        # Verificar si debemos saltarnos la sincronización (antes de leer nada)
         if self._should_skip_sync():
             _logger.debug(
                 f"Saltando sincronización para {len(self)} registros "
                 f"(contexto skip_sync o modo instalación)"
             )
-            return result
+            return super(BidirectionalSyncMixin, self).write(vals)
+
+        # Un cambio en Odoo de un campo sincronizado invalida el último payload
+        # de Nesto aplicado, para que un reenvío idéntico vuelva a aplicarse
+        sync_config = self._get_sync_config()
+        if sync_config and not sync_config.synced_fields.isdisjoint(vals):
+            self.env['nesto.sync.idempotency'].sudo().forget_records(sync_config, self)
+
+        # Guardar valores originales ANTES del write para detectar cambios
+        # Mapeamos {record.id: {field: old_value}} (una sola lectura)
+        original_values = self._snapshot_original_values(vals)
+
+        # Ejecutar write original
+        result = super(BidirectionalSyncMixin, self).write(vals)
 
         # Sincronizar cambios (pasando valores originales para comparación)
-        self._sync_to_nesto(entity_type, vals, original_values)
+        self._sync_to_nesto(entity_type, self._comparable_vals(vals), original_values)
 
         return result
 
@@ -149,24 +153,122 @@ class BidirectionalSyncMixin(models.AbstractModel):
 
         return records
 
+    def unlink(self):
+        """Override de unlink(): un reenvío de Nesto debe poder recrear el registro"""
+        sync_config = self._get_sync_config()
+        if sync_config and self.ids:
+            self.env['nesto.sync.idempotency'].sudo().forget_records(sync_config, self)
+        return super(BidirectionalSyncMixin, self).unlink()
+
+    def _snapshot_original_values(self, vals):
+        """
+        Valores de los campos de vals antes del write, con una sola lectura
+
+        - Campos normales: un read() restringido a las claves de vals
+          (Many2one como ID, sin cargar los registros relacionados)
+        - Campos binarios: checksum de su adjunto en lugar del contenido
+
+        Args:
+            vals (dict): Valores del write
+
+        Returns:
+            dict: {record.id: {field: old_value}}
+        """
+        snapshot = {record_id: {} for record_id in self.ids}
+        field_names = [
+            field for field in vals
+            if field in self._fields and field not in ('write_date', 'write_uid', '__last_update')
+        ]
+        if not field_names:
+            return snapshot
+
+        binary_fields = [field for field in field_names if self._fields[field].type == 'binary']
+        plain_fields = [field for field in field_names if field not in binary_fields]
+
+        if plain_fields:
+            for row in self.read(plain_fields, load=None):
+                snapshot[row.pop('id')].update(row)
+
+        if binary_fields:
+            for record_id, checksums in self._binary_checksums(binary_fields).items():
+                snapshot[record_id].update(checksums)
+
+        return snapshot
+
+    def _binary_checksums(self, field_names):
+        """
+        Checksums (SHA-1, como ir.attachment) de campos binarios, sin leer el contenido
+
+        Los binarios guardados como adjunto se resuelven con una consulta a
+        ir.attachment. Los que no son adjunto se leen (no hay checksum guardado).
+
+        Returns:
+            dict: {record.id: {field: checksum o False}}
+        """
+        checksums = {record_id: dict.fromkeys(field_names, False) for record_id in self.ids}
+
+        attachment_fields = [field for field in field_names if self._fields[field].attachment]
+        if attachment_fields:
+            attachments = self.env['ir.attachment'].sudo().search_read([
+                ('res_model', '=', self._name),
+                ('res_field', 'in', attachment_fields),
+                ('res_id', 'in', self.ids),
+            ], ['res_id', 'res_field', 'checksum'])
+            for attachment in attachments:
+                checksums[attachment['res_id']][attachment['res_field']] = attachment['checksum']
+
+        column_fields = [field for field in field_names if field not in attachment_fields]
+        if column_fields:
+            for row in self.read(column_fields, load=None):
+                record_id = row.pop('id')
+                for field, value in row.items():
+                    checksums[record_id][field] = self._binary_checksum(value)
+
+        return checksums
+
+    @staticmethod
+    def _binary_checksum(value):
+        """SHA-1 del contenido de un valor binario en base64 (False si está vacío)"""
+        if not value:
+            return False
+        if isinstance(value, str):
+            value = value.encode('ascii')
+        try:
+            return hashlib.sha1(base64.b64decode(value)).hexdigest()
+        except (binascii.Error, ValueError):
+            return hashlib.sha1(value).hexdigest()
+
+    def _comparable_vals(self, vals):
+        """vals con los binarios sustituidos por su checksum (ver _snapshot_original_values)"""
+        binary_fields = [
+            field for field in vals
+            if field in self._fields and self._fields[field].type == 'binary'
+        ]
+        if not binary_fields:
+            return vals
+        comparable = dict(vals)
+        for field in binary_fields:
+            comparable[field] = self._binary_checksum(vals[field])
+        return comparable
+
+    def _get_sync_config(self):
+        """
+        Configuración de sincronización compilada del modelo actual
+
+        Returns:
+            SyncConfig or None: None si el modelo no tiene sincronización bidireccional
+        """
+        return SyncConfigIndex.for_model(self._name)
+
     def _get_entity_type_for_sync(self):
         """
         Determina el entity_type basado en el modelo actual
 
-        Busca en ENTITY_CONFIGS qué entidad corresponde a este modelo
-        y si tiene sincronización bidireccional activada
-
         Returns:
             str or None: entity_type si está configurado, None si no
         """
-        for entity_type, config in ENTITY_CONFIGS.items():
-            # Verificar que el modelo coincida
-            if config.get('odoo_model') == self._name:
-                # Verificar que tenga bidireccional activado
-                if config.get('bidirectional', False):
-                    return entity_type
-
-        return None
+        sync_config = self._get_sync_config()
+        return sync_config.entity_type if sync_config else None
 
     def _should_skip_sync(self):
         """
@@ -201,6 +303,10 @@ class BidirectionalSyncMixin(models.AbstractModel):
         Esto asegura que NestoAPI reciba el formato correcto:
         {Cliente: ..., PersonasContacto: [...]}
 
+        Según nesto_sync.publish_mode, los registros se encolan en el outbox
+        transaccional (por defecto, se publican tras el commit), se publican en
+        el postcommit sin pasar por el outbox (async) o en el momento (sync).
+
         Args:
             entity_type (str): Tipo de entidad ('cliente', 'producto', etc.)
             vals (dict): Valores que se están actualizando/creando
@@ -214,14 +320,17 @@ class BidirectionalSyncMixin(models.AbstractModel):
                 'nesto_sync.batch_size', 50
             ))
 
-            # Crear publisher
-            publisher = OdooPublisher(entity_type, self.env)
+            Outbox = self.env['nesto.sync.outbox'].sudo()
+            publish_mode = Outbox.get_publish_mode()
+            use_outbox = publish_mode in ('outbox', 'async')
+
+            # Crear publisher (solo para publicación síncrona)
+            publisher = None if use_outbox else OdooPublisher(entity_type, self.env)
 
-            # Obtener configuración para detectar si es jerárquico
-            config = ENTITY_CONFIGS.get(entity_type, {})
-            hierarchy_config = config.get('hierarchy', {})
-            is_hierarchical = hierarchy_config.get('enabled', False)
-            parent_field = hierarchy_config.get('parent_field', 'parent_id')
+            # Configuración compilada para detectar si es jerárquico
+            sync_config = self._get_sync_config()
+            is_hierarchical = sync_config.hierarchical if sync_config else False
+            parent_field = sync_config.parent_field if sync_config else 'parent_id'
 
             # Procesar en bloques
             total = len(self)
@@ -243,6 +352,7 @@ class BidirectionalSyncMixin(models.AbstractModel):
                     f"({len(batch)} registros)"
                 )
 
+                to_publish = self.browse()
                 for record in batch:
                     try:
                         # Solo sincronizar si es relevante
@@ -257,9 +367,7 @@ class BidirectionalSyncMixin(models.AbstractModel):
                         )
 
                         if record_to_publish:
-                            # Publicar el registro completo con todos sus campos
-                            # NestoAPI comparará y solo actualizará los que hayan cambiado
-                            publisher.publish_record(record_to_publish)
+                            to_publish |= record_to_publish
 
                     except Exception as e:
                         _logger.error(
@@ -267,6 +375,21 @@ class BidirectionalSyncMixin(models.AbstractModel):
                         )
                         # Continuar con el siguiente registro
 
+                if not to_publish:
+                    continue
+
+                if publish_mode == 'async':
+                    # Se publicarán en el postcommit, sin esperar mensaje a mensaje
+                    Outbox.publish_after_commit(entity_type, to_publish)
+                elif use_outbox:
+                    # Se publicarán tras el commit (nada si la transacción hace rollback)
+                    Outbox.enqueue(entity_type, to_publish)
+                else:
+                    # Publicar los registros completos con todos sus campos (mensajes
+                    # construidos por lotes). NestoAPI comparará y solo actualizará
+                    # los que hayan cambiado
+                    publisher.publish_records(to_publish)
+
         except Exception as e:
             _logger.error(
                 f"Error en sincronización bidireccional de {entity_type}: {str(e)}",
@@ -340,14 +463,11 @@ class BidirectionalSyncMixin(models.AbstractModel):
         Returns:
             bool: True si el padre tiene los campos requeridos
         """
-        entity_type = self._get_entity_type_for_sync()
-        if not entity_type:
+        sync_config = self._get_sync_config()
+        if not sync_config:
             return True
 
-        config = ENTITY_CONFIGS.get(entity_type, {})
-        required_fields = config.get('required_id_fields', config.get('id_fields', []))
-
-        for field in required_fields:
+        for field in sync_config.required_id_fields:
             if hasattr(parent, field):
                 value = getattr(parent, field, None)
                 if not value:
@@ -373,8 +493,9 @@ class BidirectionalSyncMixin(models.AbstractModel):
 
         Args:
             record: Registro a evaluar
-            vals (dict): Valores que se están modificando
-            original_values (dict): Valores originales {field: old_value}
+            vals (dict): Valores que se están modificando (binarios como checksum)
+            original_values (dict): Valores originales {field: old_value}, tal como
+                los devuelve _snapshot_original_values (IDs y checksums, no recordsets)
 
         Returns:
             bool: True si debe sincronizarse
@@ -383,19 +504,16 @@ class BidirectionalSyncMixin(models.AbstractModel):
             original_values = {}
 
         # 1. Verificar identificadores externos usando configuración de la entidad
-        entity_type = self._get_entity_type_for_sync()
-        if entity_type:
-            config = ENTITY_CONFIGS.get(entity_type, {})
-            # Usar required_id_fields si está definido, sino id_fields como fallback
-            # required_id_fields especifica qué campos son OBLIGATORIOS para sincronizar
+        sync_config = self._get_sync_config()
+        if sync_config:
+            entity_type = sync_config.entity_type
+            # required_id_fields (o id_fields como fallback) ya resuelto en el índice
             # Por ejemplo, para clientes: cliente_externo y contacto_externo son obligatorios,
             # pero persona_contacto_externa es opcional (solo aplica a personas de contacto)
-            id_fields = config.get('required_id_fields', config.get('id_fields', []))
-
             # Verificar que los campos requeridos tengan valor
             missing_fields = []
             id_values = {}
-            for id_field in id_fields:
+            for id_field in sync_config.required_id_fields:
                 if hasattr(record, id_field):
                     field_value = getattr(record, id_field, None)
                     id_values[id_field] = field_value
@@ -454,13 +572,10 @@ class BidirectionalSyncMixin(models.AbstractModel):
 
             if not has_real_changes:
                 # Construir mensaje de debug con los id_fields de la entidad
-                entity_type = self._get_entity_type_for_sync()
-                if entity_type:
-                    config = ENTITY_CONFIGS.get(entity_type, {})
-                    id_fields = config.get('id_fields', [])
+                if sync_config:
                     id_debug = ', '.join([
                         f"{k}={getattr(record, k, None)}"
-                        for k in id_fields if hasattr(record, k)
+                        for k in sync_config.id_fields if hasattr(record, k)
                     ])
                 else:
                     id_debug = f"ID {record.id}"
@@ -1,40 +1,62 @@
 import unicodedata
 
+from ..infrastructure.lookup_cache import lookup_cache
+
+
 class CountryManager:
+    # Clave del índice de provincias en lookup_cache (se invalida al cambiar provincias)
+    STATE_INDEX_KEY = '__indice_provincias__'
+
     def __init__(self, env):
         self.env = env
 
     def get_spain_id(self):
-        """ Devuelve el ID de España. """
-        spain = self.env['res.country'].search([('code', '=', 'ES')], limit=1)
-        if not spain:
+        """ Devuelve el ID de España (memoizado en lookup_cache). """
+        def _search():
+            spain = self.env['res.country'].search([('code', '=', 'ES')], limit=1)
+            return spain.id or None
+
+        spain_id = lookup_cache.get_or_load(self.env, 'res.country', 'ES', _search)
+        if not spain_id:
             raise ValueError("El país España no está configurado en la base de datos")
-        # Si es una lista, toma el primer elemento
-        if isinstance(spain, list):
-            return spain[0].id
-        return spain.id
+        return spain_id
 
     def get_or_create_state(self, state_name):
         """ Busca o crea una provincia según su nombre. """
         if not state_name:
             raise ValueError("El nombre de la provincia no puede estar vacío")
 
-        spain_id = self.get_spain_id()
-        
+        # Sin España configurada no se resuelven provincias
+        self.get_spain_id()
+
         # Quitamos las tildes para que CORDOBA y CÓRDOBA sean iguales
-        normalized_state_name = self.remove_accents(state_name)
-        all_states = self.env['res.country.state'].search([])
+        return self._get_state_index().get(self.normalize_state_name(state_name))
+
+    def _get_state_index(self):
+        """
+        Índice nombre normalizado → state_id de todas las provincias.
 
-        # Filtrar manualmente los estados que coincidan
-        matching_state = next((state for state in all_states if self.remove_accents(state.name).lower() == normalized_state_name.lower()), None)
+        Se construye con una sola consulta y queda en lookup_cache hasta que
+        se crea, modifica o borra alguna provincia. Si varias provincias
+        (de distintos países) normalizan al mismo nombre, gana la primera en
+        el orden de búsqueda de res.country.state, como al recorrerlas una a
+        una.
 
+        Returns:
+            dict: {nombre_normalizado: state_id}
+        """
+        def _build():
+            index = {}
+            for state in self.env['res.country.state'].search_read([], ['name']):
+                index.setdefault(self.normalize_state_name(state['name']), state['id'])
+            return index
 
-        if not matching_state:
-            return None
-        
-        return matching_state.id
+        return lookup_cache.get_or_load(
+            self.env, 'res.country.state', self.STATE_INDEX_KEY, _build
+        )
 
-        
+    def normalize_state_name(self, text):
+        return self.remove_accents(text).lower()
 
     def remove_accents(self, text):
         if not text:
@@ -6,9 +6,11 @@ Este modelo almacena mensajes de PubSub que no pudieron procesarse después de
 varios reintentos, permitiendo su revisión y reprocesamiento manual.
 """
 
-from odoo import models, fields, api
+import json
 import logging
 
+from odoo import models, fields, api
+
 _logger = logging.getLogger(__name__)
 
 
@@ -110,6 +112,61 @@ class NestoSyncFailedMessage(models.Model):
         help='ID del registro creado/actualizado (si existe)'
     )
 
+    @api.model
+    def store_failed_message(self, message_id, raw_data, error_message, error_traceback,
+                             entity_type, retry_count):
+        """
+        Crea o actualiza el registro DLQ de un mensaje.
+
+        No hace commit: el llamante decide cuándo persistir (el controller
+        hace commit inmediato, el procesamiento por lotes al final del lote).
+
+        Args:
+            message_id: ID del mensaje de PubSub
+            raw_data: Datos crudos del mensaje (bytes, str o dict)
+            error_message: Mensaje de error
+            error_traceback: Stack trace del error
+            entity_type: Tipo de entidad
+            retry_count: Número de reintentos realizados
+
+        Returns:
+            Registro nesto.sync.failed.message
+        """
+        now = fields.Datetime.now()
+
+        # Verificar si ya existe (para evitar duplicados)
+        existing = self.search([('message_id', '=', message_id)], limit=1)
+
+        if existing:
+            existing.write({
+                'error_message': error_message,
+                'error_traceback': error_traceback,
+                'retry_count': retry_count,
+                'last_attempt_date': now,
+                'state': 'failed'
+            })
+            _logger.info(f"[{message_id}] Registro DLQ actualizado")
+            return existing
+
+        if isinstance(raw_data, bytes):
+            raw_data = raw_data.decode('utf-8')
+        elif isinstance(raw_data, dict):
+            raw_data = json.dumps(raw_data, ensure_ascii=False)
+
+        record = self.create({
+            'message_id': message_id,
+            'raw_data': str(raw_data),
+            'entity_type': entity_type,
+            'error_message': error_message,
+            'error_traceback': error_traceback,
+            'retry_count': retry_count,
+            'state': 'failed',
+            'first_attempt_date': now,
+            'last_attempt_date': now
+        })
+        _logger.info(f"[{message_id}] Mensaje movido a DLQ después de {retry_count} intentos")
+        return record
+
     def action_reprocess(self):
         """Reintenta procesar el mensaje manualmente."""
         self.ensure_one()
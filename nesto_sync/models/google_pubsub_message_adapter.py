@@ -1,19 +1,70 @@
 # nesto_sync/models/google_pubsub_message_adapter.py
-import json
 import base64
-from odoo import models
+
+from ..infrastructure import json_codec
+
+
+class PubSubEnvelope:
+    """
+    Envelope PubSub (formato push) ya decodificado
+
+    Atributos:
+        message_id: messageId de PubSub (o None)
+        attributes: Atributos del mensaje (dict)
+        publish_time: publishTime (str ISO 8601 o None)
+        ordering_key: orderingKey (o None)
+        subscription: Suscripción de origen (o None)
+        data: Payload de Nesto decodificado (dict)
+    """
+
+    __slots__ = ('message_id', 'attributes', 'publish_time', 'ordering_key', 'subscription', 'data')
+
+    def __init__(self, message_id, attributes, publish_time, ordering_key, subscription, data):
+        self.message_id = message_id
+        self.attributes = attributes
+        self.publish_time = publish_time
+        self.ordering_key = ordering_key
+        self.subscription = subscription
+        self.data = data
+
+    def __repr__(self):
+        return f'PubSubEnvelope(message_id={self.message_id!r})'
+
 
 class GooglePubSubMessageAdapter:
-    def decode_message(self, raw_data):
-        if isinstance(raw_data, bytes):
-            raw_data = raw_data.decode('utf-8')
-        
-        message_data = json.loads(raw_data)
-        pubsub_message = message_data.get('message', {})
+    def parse(self, raw_data):
+        """
+        Decodifica el cuerpo de una petición push en un PubSubEnvelope
+
+        El envelope y el payload se parsean una sola vez (con orjson/ujson si
+        están instalados, directamente desde bytes).
+        """
+        return self.parse_envelope(json_codec.loads(raw_data))
+
+    def parse_envelope(self, envelope):
+        """Decodifica un envelope PubSub ya parseado (dict), p.ej. de un lote"""
+        if not isinstance(envelope, dict):
+            raise ValueError("El envelope PubSub debe ser un objeto JSON")
+
+        pubsub_message = envelope.get('message') or {}
         data = pubsub_message.get('data')
-        
+
         if not data:
             raise ValueError("No se encontró el campo 'data'")
-            
-        decoded_data = base64.b64decode(data).decode('utf-8')
-        return json.loads(decoded_data)
\ No newline at end of file
+
+        return PubSubEnvelope(
+            message_id=pubsub_message.get('messageId') or pubsub_message.get('message_id'),
+            attributes=pubsub_message.get('attributes') or {},
+            publish_time=pubsub_message.get('publishTime') or pubsub_message.get('publish_time'),
+            ordering_key=pubsub_message.get('orderingKey') or None,
+            subscription=envelope.get('subscription'),
+            data=json_codec.loads(base64.b64decode(data)),
+        )
+
+    def decode_message(self, raw_data):
+        """Payload de Nesto del cuerpo de una petición push"""
+        return self.parse(raw_data).data
+
+    def decode_envelope(self, envelope):
+        """Payload de Nesto de un envelope PubSub ya parseado (dict)"""
+        return self.parse_envelope(envelope).data
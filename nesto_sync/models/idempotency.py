@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de mensajes de Nesto ya aplicados (idempotencia).
+
+Dos tipos de fila, con caducidad (expires_at):
+- message: messageId de PubSub aplicado con éxito
+- payload: hash y publishTime del último mensaje aplicado por entidad y
+  clave externa (el publishTime descarta los mensajes obsoletos)
+
+El controller y BatchMessageProcessor consultan check() antes de despachar
+a EntityRegistry y llaman a remember() tras aplicar el mensaje, en la misma
+transacción: si esta hace rollback, el mensaje no queda como aplicado.
+
+Una edición en Odoo de un registro sincronizado olvida el hash de la fila
+payload de su clave (forget_records), para que un reenvío idéntico desde
+Nesto vuelva a aplicarse sobre el cambio local; el publishTime se conserva.
+Ver core/idempotency.py.
+"""
+
+from odoo import models, fields, api
+import logging
+
+from ..core.idempotency import (
+    MESSAGE, PAYLOAD, STALE, IdempotencyCheck, entity_key, payload_hash, parse_publish_time,
+    record_key, idempotency_cache,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+class NestoSyncIdempotency(models.Model):
+    """Mensajes y payloads de Nesto ya aplicados."""
+
+    _name = 'nesto.sync.idempotency'
+    _description = 'Idempotencia de mensajes de Nesto'
+    _order = 'id desc'
+
+    DEFAULT_TTL_HOURS = 24  # Caducidad de las filas (nesto_sync.idempotency_ttl_hours, 0 = desactivado)
+    LOCK_NAMESPACE = 7410  # Primer argumento de pg_advisory_xact_lock para las claves de entidad
+
+    kind = fields.Selection([
+        (MESSAGE, 'messageId'),
+        (PAYLOAD, 'Payload'),
+    ], string='Tipo', required=True)
+
+    key = fields.Char(
+        string='Clave',
+        required=True,
+        help='messageId de PubSub o entidad:clave externa'
+    )
+
+    entity_type = fields.Char(
+        string='Tipo de entidad'
+    )
+
+    payload_hash = fields.Char(
+        string='Hash del payload'
+    )
+
+    published_at = fields.Datetime(
+        string='Publicado',
+        help='publishTime de Pub/Sub del último mensaje aplicado para la clave'
+    )
+
+    expires_at = fields.Datetime(
+        string='Caduca',
+        required=True,
+        index=True
+    )
+
+    _sql_constraints = [
+        ('kind_key_uniq', 'unique(kind, key)',
+         'Solo puede haber una fila por tipo y clave'),
+    ]
+
+    @api.model
+    def get_ttl_hours(self):
+        """Horas de caducidad (0 desactiva el descarte de duplicados)"""
+        try:
+            return float(self.env['ir.config_parameter'].sudo().get_param(
+                'nesto_sync.idempotency_ttl_hours', self.DEFAULT_TTL_HOURS
+            ))
+        except (TypeError, ValueError):
+            return self.DEFAULT_TTL_HOURS
+
+    @api.model
+    def check(self, message_id, entity_type, config, data, publish_time=None):
+        """
+        Comprueba si un mensaje ya se aplicó o es obsoleto
+
+        Un messageId ya visto en este proceso se resuelve sin consultas; si
+        no, una sola consulta comprueba el messageId, el hash del payload y el
+        publishTime del último mensaje aplicado para la clave.
+
+        Con publishTime, antes se bloquea la clave hasta el final de la
+        transacción: un mensaje de la misma clave en otro worker espera a que
+        esta confirme y después ve su publishTime.
+
+        Args:
+            message_id (str): messageId de PubSub (o None)
+            entity_type (str): Tipo de entidad
+            config (dict): Configuración de la entidad
+            data (dict): Datos de la entidad (ya extraídos del wrapper)
+            publish_time (str, optional): publishTime del envelope de PubSub
+
+        Returns:
+            IdempotencyCheck (duplicate indica el motivo) o None si está desactivado
+        """
+        dbname = self.env.cr.dbname
+        if idempotency_cache.seen(dbname, message_id):
+            idempotency_cache.count('checked')
+            idempotency_cache.count('skipped_message')
+            return IdempotencyCheck(message_id, entity_type, None, None, duplicate=MESSAGE)
+
+        if self.get_ttl_hours() <= 0:
+            return None
+
+        idempotency_cache.count('checked')
+        result = IdempotencyCheck(
+            message_id, entity_type, entity_key(config, data), payload_hash(data),
+            published_at=parse_publish_time(publish_time),
+        )
+        if not message_id and not result.payload_key:
+            return result
+
+        if result.published_at and result.payload_key:
+            self.env.cr.execute(
+                "SELECT pg_advisory_xact_lock(%s, hashtext(%s))",
+                (self.LOCK_NAMESPACE, result.payload_key)
+            )
+
+        self.env.cr.execute(f"""
+            SELECT kind, payload_hash, published_at
+              FROM "{self._table}"
+             WHERE expires_at > now() at time zone 'UTC'
+               AND ((kind = %s AND key = %s) OR (kind = %s AND key = %s))
+        """, (MESSAGE, message_id or '', PAYLOAD, result.payload_key or ''))
+        stored = {kind: (hash_value, published_at) for kind, hash_value, published_at in self.env.cr.fetchall()}
+        stored_hash, stored_published_at = stored.get(PAYLOAD, (None, None))
+
+        if MESSAGE in stored:
+            result.duplicate = MESSAGE
+        elif stored_hash and stored_hash == result.payload_hash:
+            result.duplicate = PAYLOAD
+        elif result.published_at and stored_published_at and stored_published_at > result.published_at:
+            result.duplicate = STALE
+            _logger.info(
+                f"Mensaje obsoleto para {result.payload_key}: publicado {result.published_at}, "
+                f"ya aplicado uno de {stored_published_at}"
+            )
+
+        if result.duplicate:
+            idempotency_cache.count(f'skipped_{result.duplicate}')
+            self._remember_after_commit(message_id)
+        return result
+
+    @api.model
+    def remember(self, check):
+        """
+        Registra un mensaje aplicado (en la transacción del mensaje)
+
+        Args:
+            check (IdempotencyCheck): Resultado de check() del mensaje
+        """
+        if check is None or check.duplicate:
+            return
+
+        rows = []
+        if check.message_id:
+            rows.append((MESSAGE, check.message_id, check.entity_type, None, None))
+        if check.payload_key:
+            rows.append((PAYLOAD, check.payload_key, check.entity_type, check.payload_hash, check.published_at))
+        if not rows:
+            return
+
+        ttl_seconds = self.get_ttl_hours() * 3600
+        uid = self.env.uid
+        for kind, key, entity_type, hash_value, published_at in rows:
+            # El publishTime solo avanza (GREATEST ignora los NULL)
+            self.env.cr.execute(f"""
+                INSERT INTO "{self._table}"
+                    (kind, key, entity_type, payload_hash, published_at, expires_at,
+                     create_uid, create_date, write_uid, write_date)
+                VALUES (%s, %s, %s, %s, %s, now() at time zone 'UTC' + make_interval(secs => %s),
+                        %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')
+                ON CONFLICT (kind, key)
+                DO UPDATE SET payload_hash = EXCLUDED.payload_hash,
+                              published_at = GREATEST("{self._table}".published_at, EXCLUDED.published_at),
+                              entity_type = EXCLUDED.entity_type,
+                              expires_at = EXCLUDED.expires_at,
+                              write_uid = EXCLUDED.write_uid,
+                              write_date = EXCLUDED.write_date
+            """, (kind, key, entity_type, hash_value, published_at, ttl_seconds, uid, uid))
+        self.invalidate_model()
+
+        idempotency_cache.count('recorded')
+        self._remember_after_commit(check.message_id)
+
+    @api.model
+    def forget_records(self, sync_config, records):
+        """
+        Olvida el último payload aplicado de registros editados en Odoo
+
+        Así un reenvío idéntico desde Nesto vuelve a aplicarse. En entidades
+        jerárquicas, un child invalida el mensaje de su padre (que lo incluye).
+        Se conserva el publishTime: los mensajes obsoletos se siguen descartando.
+
+        Args:
+            sync_config (SyncConfig): Configuración compilada de la entidad
+            records: Registros creados/modificados/borrados
+        """
+        if not records or self.get_ttl_hours() <= 0:
+            return
+
+        keys = set()
+        for record in records:
+            if sync_config.hierarchical and record[sync_config.parent_field]:
+                record = record[sync_config.parent_field]
+            key = record_key(sync_config.config, record)
+            if key:
+                keys.add(f'{sync_config.entity_type}:{key}')
+        if not keys:
+            return
+
+        self.env.cr.execute(f"""
+            UPDATE "{self._table}" SET payload_hash = NULL
+             WHERE kind = %s AND key = ANY(%s) AND payload_hash IS NOT NULL
+        """, (PAYLOAD, sorted(keys)))
+        self.invalidate_model()
+
+    @api.model
+    def cleanup_expired(self):
+        """Borra las filas caducadas (cron diario)"""
+        self.env.cr.execute(
+            f"""DELETE FROM "{self._table}" WHERE expires_at <= now() at time zone 'UTC'"""
+        )
+        count = self.env.cr.rowcount
+        if count:
+            _logger.info(f"Limpieza de idempotencia: {count} filas caducadas eliminadas")
+        return count
+
+    @api.model
+    def get_stats(self):
+        """
+        Estadísticas para /nesto_sync/stats
+
+        Returns:
+            dict con los contadores del proceso (mensajes comprobados,
+            descartados por messageId, por payload y por obsoletos, registrados)
+            y las filas vigentes
+        """
+        self.env.cr.execute(f"""
+            SELECT kind, count(*)
+              FROM "{self._table}"
+             WHERE expires_at > now() at time zone 'UTC'
+             GROUP BY kind
+        """)
+        rows = dict(self.env.cr.fetchall())
+        return dict(
+            idempotency_cache.get_counters(),
+            ttl_hours=self.get_ttl_hours(),
+            messages=rows.get(MESSAGE, 0),
+            payloads=rows.get(PAYLOAD, 0),
+        )
+
+    def _remember_after_commit(self, message_id):
+        """Añade el messageId a la LRU del proceso cuando la transacción confirme"""
+        if not message_id:
+            return
+        dbname = self.env.cr.dbname
+        ttl_seconds = self.get_ttl_hours() * 3600
+        self.env.cr.postcommit.add(lambda: idempotency_cache.add(dbname, message_id, ttl_seconds))
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Descarga en segundo plano de imágenes de producto.
+
+La sincronización de productos solo guarda url_imagen_actual y deja el
+producto con imagen_estado = 'pending'. Este cron descarga las imágenes
+pendientes por lotes, en paralelo (concurrencia acotada, pool de conexiones
+y reintentos con backoff) y fuera de la transacción del mensaje de Nesto.
+
+Cuando no quedan pendientes, revalida las imágenes comprobadas hace más de
+nesto_sync.image_revalidate_days días con peticiones condicionales (caché en
+disco con ETag/Last-Modified): detecta imágenes cambiadas bajo la misma URL
+sin volver a descargar ni reescribir las que no cambiaron. Si la
+revalidación falla, el producto conserva su imagen y su estado.
+
+Un cron diario recorta la caché en disco a nesto_sync.image_cache_max_mb.
+"""
+
+from odoo import models, fields, api
+import logging
+
+from ..infrastructure.image_cache import ImageCache
+from ..infrastructure.image_downloader import get_image_downloader
+
+_logger = logging.getLogger(__name__)
+
+
+class NestoSyncImageFetcher(models.AbstractModel):
+    """Descarga las imágenes de producto pendientes."""
+
+    _name = 'nesto.sync.image.fetcher'
+    _description = 'Descarga en segundo plano de imágenes de producto'
+
+    DEFAULT_BATCH_SIZE = 50  # Productos por ejecución (nesto_sync.image_fetch_batch_size)
+    DEFAULT_CONCURRENCY = 8  # Descargas simultáneas (nesto_sync.image_fetch_concurrency)
+    DEFAULT_MAX_ATTEMPTS = 5  # Intentos antes de marcar error (nesto_sync.image_fetch_max_attempts)
+    DEFAULT_REVALIDATE_DAYS = 7  # Antigüedad para revalidar, 0 = nunca (nesto_sync.image_revalidate_days)
+    DEFAULT_CACHE_MAX_MB = 1024  # Tamaño máximo de la caché en disco (nesto_sync.image_cache_max_mb)
+
+    @api.model
+    def process_pending(self, limit=None):
+        """
+        Descarga un lote de imágenes pendientes y las asigna a sus productos.
+
+        Si quedan más pendientes, vuelve a lanzar el cron al terminar.
+
+        Args:
+            limit: Número máximo de productos (por defecto, parámetro de sistema)
+
+        Returns:
+            int: Número de productos procesados
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        batch_size = limit or int(config.get_param(
+            'nesto_sync.image_fetch_batch_size', self.DEFAULT_BATCH_SIZE))
+        concurrency = int(config.get_param(
+            'nesto_sync.image_fetch_concurrency', self.DEFAULT_CONCURRENCY))
+        max_attempts = int(config.get_param(
+            'nesto_sync.image_fetch_max_attempts', self.DEFAULT_MAX_ATTEMPTS))
+
+        Product = self.env['product.template'].sudo().with_context(active_test=False)
+        products = Product.search(
+            [('imagen_estado', '=', 'pending')],
+            order='imagen_intentos, id',
+            limit=batch_size
+        )
+        revalidation = False
+        if not products:
+            products = self._mark_stale_for_revalidation(batch_size)
+            revalidation = True
+        if not products:
+            return 0
+
+        jobs = {
+            product.id: (product.url_imagen_actual, product.imagen_sha256 or None)
+            for product in products
+        }
+
+        # Las descargas no usan el cursor: se hacen en paralelo en hilos
+        downloader = get_image_downloader(pool_size=concurrency)
+        results = downloader.fetch_many([job for job in jobs.values() if job[0]], concurrency)
+
+        # Releer la URL por si el producto cambió durante la descarga
+        products.invalidate_recordset(['url_imagen_actual'])
+        for product in products:
+            job = jobs[product.id]
+            if product.url_imagen_actual != job[0]:
+                continue
+            self._apply_result(product, results.get(job), max_attempts, revalidation)
+
+        _logger.info(f"Imágenes procesadas: {len(products)} productos")
+
+        if len(products) == batch_size:
+            self.env['product.template']._trigger_image_fetcher()
+
+        return len(products)
+
+    @api.model
+    def _mark_stale_for_revalidation(self, limit):
+        """
+        Deja pendientes las imágenes descargadas que hace tiempo que no se comprueban
+
+        Returns:
+            product.template marcados como pendientes
+        """
+        days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'nesto_sync.image_revalidate_days', self.DEFAULT_REVALIDATE_DAYS))
+        if days <= 0:
+            return self.env['product.template']
+
+        limit_date = fields.Datetime.subtract(fields.Datetime.now(), days=days)
+        products = self.env['product.template'].sudo().with_context(active_test=False).search([
+            ('imagen_estado', '=', 'done'),
+            ('url_imagen_actual', '!=', False),
+            '|', ('imagen_comprobada', '=', False), ('imagen_comprobada', '<', limit_date),
+        ], order='imagen_comprobada, id', limit=limit)
+
+        if products:
+            _logger.info(f"Revalidando {len(products)} imágenes de producto")
+            products.with_context(skip_sync=True).write({'imagen_estado': 'pending'})
+        return products
+
+    @api.model
+    def cleanup_image_cache(self):
+        """
+        Recorta la caché de imágenes en disco (cron diario)
+
+        Returns:
+            dict: Resultado de ImageCache.cleanup
+        """
+        max_mb = float(self.env['ir.config_parameter'].sudo().get_param(
+            'nesto_sync.image_cache_max_mb', self.DEFAULT_CACHE_MAX_MB))
+        return ImageCache.default().cleanup(int(max_mb * 1024 * 1024))
+
+    @api.model
+    def _apply_result(self, product, result, max_attempts, revalidation=False):
+        """
+        Asigna la imagen descargada o registra el fallo.
+
+        Args:
+            product: product.template pendiente
+            result: Resultado de ImageDownloader.fetch (None si no hay URL)
+            max_attempts: Intentos transitorios antes de marcar error
+            revalidation: True si el producto ya tenía la imagen descargada
+                (ver _mark_stale_for_revalidation)
+        """
+        product = product.with_context(skip_sync=True)
+
+        if not result:
+            product.write({'imagen_estado': False, 'imagen_intentos': 0})
+            return
+
+        if result['unchanged']:
+            # Misma imagen que la actual (304 o mismo hash): no se reescribe
+            product.write({
+                'imagen_estado': 'done',
+                'imagen_intentos': 0,
+                'imagen_comprobada': fields.Datetime.now(),
+            })
+            return
+
+        if result['image']:
+            product.write({
+                'image_1920': result['image'],
+                'imagen_sha256': result['sha256'],
+                'imagen_estado': 'done',
+                'imagen_intentos': 0,
+                'imagen_comprobada': fields.Datetime.now(),
+            })
+            return
+
+        if revalidation:
+            # La imagen actual sigue valiendo: un fallo al revalidar no la toca.
+            # Los fallos transitorios se reintentan en la próxima ejecución; el
+            # resto, en la próxima revalidación
+            _logger.warning(
+                f"No se pudo revalidar la imagen de {product.producto_externo or product.id} "
+                f"({result['url']}), se mantiene la actual: {result['error']}"
+            )
+            vals = {'imagen_estado': 'done', 'imagen_intentos': 0}
+            if not result['retry']:
+                vals['imagen_comprobada'] = fields.Datetime.now()
+            product.write(vals)
+            return
+
+        attempts = product.imagen_intentos + 1
+        if result['retry'] and attempts < max_attempts:
+            # Sigue pendiente: se reintentará en la próxima ejecución
+            product.write({'imagen_intentos': attempts})
+            return
+
+        _logger.warning(
+            f"No se pudo descargar la imagen de {product.producto_externo or product.id} "
+            f"({result['url']}) tras {attempts} intentos: {result['error']}"
+        )
+        product.write({'imagen_estado': 'error', 'imagen_intentos': attempts})
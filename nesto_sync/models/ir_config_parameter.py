@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Invalidación de la caché de publishers (infrastructure/publisher_factory.py).
+
+Al crear, modificar o borrar un parámetro nesto_sync.* se descartan los
+publishers cacheados de la base de datos: el siguiente create_publisher los
+construye con la configuración nueva.
+"""
+
+from odoo import models, api
+
+from ..infrastructure.publisher_factory import PublisherFactory
+
+PARAM_PREFIX = 'nesto_sync.'
+
+
+class IrConfigParameter(models.Model):
+    _inherit = 'ir.config_parameter'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if any((vals.get('key') or '').startswith(PARAM_PREFIX) for vals in vals_list):
+            PublisherFactory.clear_cache(self.env.cr.dbname)
+        return records
+
+    def write(self, vals):
+        touched = self._touches_nesto_sync() or (vals.get('key') or '').startswith(PARAM_PREFIX)
+        result = super().write(vals)
+        if touched:
+            PublisherFactory.clear_cache(self.env.cr.dbname)
+        return result
+
+    def unlink(self):
+        touched = self._touches_nesto_sync()
+        result = super().unlink()
+        if touched:
+            PublisherFactory.clear_cache(self.env.cr.dbname)
+        return result
+
+    def _touches_nesto_sync(self):
+        return any(key.startswith(PARAM_PREFIX) for key in self.mapped('key'))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Invalidación de la caché de resoluciones many2one (infrastructure/lookup_cache.py).
+
+Los modelos que resuelven los transformers (categorías, UoM, usuarios,
+países y provincias) descartan sus entradas de caché al crear, borrar o modificar
+alguno de los campos por los que se buscan. Cambiar la compañía de un usuario
+vacía además la caché de los campos 'context' (core/context_expression.py).
+
+Cada invalidación registra una generación en nesto.sync.lookup.cache.generation
+para que los demás workers descarten también sus entradas.
+"""
+
+import logging
+
+from odoo import models, fields, api
+
+from ..infrastructure.lookup_cache import lookup_cache, GENERATION_TABLE
+from ..core.context_expression import context_value_cache
+
+_logger = logging.getLogger(__name__)
+
+
+class NestoSyncLookupCacheGeneration(models.Model):
+    """Generaciones de la caché de lookups (una fila por invalidación)."""
+
+    _name = 'nesto.sync.lookup.cache.generation'
+    _description = 'Generación de la caché de lookups de Nesto Sync'
+    _table = GENERATION_TABLE
+    _log_access = False
+    _order = 'id desc'
+
+    model = fields.Char(string='Modelo invalidado', required=True, readonly=True)
+
+    @api.model
+    def cleanup_old_generations(self):
+        """Borra las generaciones antiguas: solo cuenta la última (cron diario)"""
+        self.env.cr.execute(
+            f"""DELETE FROM "{self._table}" WHERE id < (SELECT max(id) FROM "{self._table}")"""
+        )
+        count = self.env.cr.rowcount
+        if count:
+            _logger.info(f"Caché de lookups: {count} generaciones antiguas eliminadas")
+        return count
+
+
+class NestoSyncLookupCacheMixin(models.AbstractModel):
+    """Invalida la caché de lookups del modelo en create/write/unlink."""
+
+    _name = 'nesto.sync.lookup.cache.mixin'
+    _description = 'Invalidación de caché de lookups de Nesto Sync'
+
+    # Campos que intervienen en las búsquedas cacheadas
+    _lookup_cache_fields = ()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        lookup_cache.invalidate(self.env, self._name)
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        if any(field in vals for field in self._lookup_cache_fields):
+            lookup_cache.invalidate(self.env, self._name)
+        return result
+
+    def unlink(self):
+        lookup_cache.invalidate(self.env, self._name)
+        return super().unlink()
+
+
+class ProductCategory(models.Model):
+    _name = 'product.category'
+    _inherit = ['product.category', 'nesto.sync.lookup.cache.mixin']
+
+    _lookup_cache_fields = ('name', 'parent_id')
+
+
+class UomUom(models.Model):
+    _name = 'uom.uom'
+    _inherit = ['uom.uom', 'nesto.sync.lookup.cache.mixin']
+
+    _lookup_cache_fields = ('name', 'active')
+
+
+class ResUsers(models.Model):
+    _name = 'res.users'
+    _inherit = ['res.users', 'nesto.sync.lookup.cache.mixin']
+
+    _lookup_cache_fields = ('login', 'active')
+
+    def write(self, vals):
+        result = super().write(vals)
+        if 'company_id' in vals:
+            # Los campos 'context' (env.user.company_id.id) se cachean por usuario
+            context_value_cache.clear()
+        return result
+
+
+class ResCountry(models.Model):
+    _name = 'res.country'
+    _inherit = ['res.country', 'nesto.sync.lookup.cache.mixin']
+
+    _lookup_cache_fields = ('code',)
+
+
+class ResCountryState(models.Model):
+    _name = 'res.country.state'
+    _inherit = ['res.country.state', 'nesto.sync.lookup.cache.mixin']
+
+    # code decide el orden de búsqueda (gana la primera con el mismo nombre)
+    _lookup_cache_fields = ('name', 'code', 'country_id')
@@ -0,0 +1,571 @@
+# -*- coding: utf-8 -*-
+"""
+Outbox transaccional para la sincronización Odoo → Nesto.
+
+BidirectionalSyncMixin no publica dentro de la transacción del usuario:
+inserta una fila por registro a publicar en esta tabla. Las filas solo
+existen si la transacción hace commit, así que nunca se publican cambios
+que terminaron en rollback.
+
+Deduplicación: un índice único parcial permite una sola fila pendiente por
+registro. Editar 500 veces el mismo cliente antes del siguiente drenado
+genera una única publicación con su estado final (el mensaje se construye
+al drenar, no al encolar).
+
+Coalescencia: cada fila nueva espera nesto_sync.outbox_coalesce_seconds
+(2 por defecto) antes de publicarse (available_at). Los cambios del mismo
+registro dentro de esa ventana no generan mensajes nuevos: solo suman
+coalesced_count. La ventana cuenta desde el primer cambio, así que un
+registro que se edita sin parar se sigue publicando cada pocos segundos.
+
+El cron de drenado se lanza para cuando vence la ventana (ir.cron._trigger)
+y publica los pendientes por lotes con publish_event_async: todas las
+publicaciones del lote van en paralelo y solo se espera a sus confirmaciones
+al final. Lo publicado y lo ahorrado por coalescencia se acumula por día y
+entidad en nesto.sync.outbox.stats (ver /nesto_sync/stats).
+
+Modo de publicación (nesto_sync.publish_mode):
+- outbox (por defecto): encolar y publicar tras el commit
+- async: construir los mensajes y publicarlos en el postcommit sin pasar
+  por la tabla (con el batching de la librería de
+  Pub/Sub); los que fallan se encolan aquí para reintentarlos
+- sync: publicar dentro de write()/create() como antes
+"""
+
+from odoo import models, fields, api, SUPERUSER_ID
+from datetime import timedelta
+import logging
+
+from ..core.odoo_publisher import OdooPublisher
+from ..infrastructure.publisher_factory import PublisherFactory
+from .unique_index import create_partial_unique_index
+
+_logger = logging.getLogger(__name__)
+
+
+class NestoSyncOutbox(models.Model):
+    """Registros pendientes de publicar a Nesto."""
+
+    _name = 'nesto.sync.outbox'
+    _description = 'Outbox de publicaciones Odoo → Nesto'
+    _order = 'id'
+
+    DEFAULT_BATCH_SIZE = 100  # Filas por drenado (nesto_sync.outbox_batch_size)
+    DEFAULT_MAX_ATTEMPTS = 5  # Intentos antes de marcar error (nesto_sync.outbox_max_attempts)
+    DEFAULT_COALESCE_SECONDS = 2  # Ventana de coalescencia (nesto_sync.outbox_coalesce_seconds)
+    PUBLISH_TIMEOUT = 30  # Segundos de espera por confirmación de PubSub
+
+    entity_type = fields.Char(
+        string='Tipo de entidad',
+        required=True,
+        index=True
+    )
+
+    res_model = fields.Char(
+        string='Modelo',
+        required=True
+    )
+
+    res_id = fields.Many2oneReference(
+        string='ID del registro',
+        model_field='res_model',
+        required=True
+    )
+
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('error', 'Error')
+    ], string='Estado', default='pending', required=True, index=True)
+
+    available_at = fields.Datetime(
+        string='Publicar a partir de',
+        index=True,
+        help='Fin de la ventana de coalescencia: antes no se publica'
+    )
+
+    coalesced_count = fields.Integer(
+        string='Cambios agrupados',
+        default=0,
+        help='Publicaciones ahorradas: cambios del registro absorbidos por esta fila'
+    )
+
+    attempts = fields.Integer(
+        string='Intentos',
+        default=0,
+        help='Número de publicaciones fallidas'
+    )
+
+    last_error = fields.Text(
+        string='Último error'
+    )
+
+    def init(self):
+        super().init()
+        # Una sola fila pendiente por registro (deduplicación al encolar)
+        create_partial_unique_index(
+            self.env.cr, 'nesto_sync_outbox_pending_uniq', self._table,
+            ['res_model', 'res_id'], "state = 'pending'",
+        )
+
+    @api.model
+    def get_publish_mode(self):
+        """Modo de publicación configurado: 'outbox', 'async' o 'sync'"""
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'nesto_sync.publish_mode', 'outbox'
+        )
+
+    @api.model
+    def enqueue(self, entity_type, records):
+        """
+        Encola registros para publicarlos tras el commit.
+
+        Si el registro ya tiene una fila pendiente no se duplica: se suma a su
+        coalesced_count, lo que además bloquea la fila hasta el commit y evita
+        que un drenado concurrente la publique con datos anteriores a este cambio.
+
+        Args:
+            entity_type (str): Tipo de entidad ('cliente', 'producto', etc.)
+            records: Registros a publicar (todos del mismo modelo)
+        """
+        if not records:
+            return
+
+        # Orden estable: filas bloqueadas siempre en el mismo orden
+        res_ids = sorted(set(records.ids))
+        uid = self.env.uid
+        window = self._get_coalesce_seconds()
+        self.flush_model()
+        self.env.cr.execute(f"""
+            INSERT INTO "{self._table}"
+                (entity_type, res_model, res_id, state, attempts, coalesced_count, available_at,
+                 create_uid, create_date, write_uid, write_date)
+            SELECT %s, %s, res_id, 'pending', 0, 0,
+                   now() at time zone 'UTC' + make_interval(secs => %s),
+                   %s, now() at time zone 'UTC', %s, now() at time zone 'UTC'
+              FROM unnest(%s::int[]) AS res_id
+            ON CONFLICT (res_model, res_id) WHERE state = 'pending'
+            DO UPDATE SET coalesced_count = "{self._table}".coalesced_count + 1,
+                          write_uid = EXCLUDED.write_uid,
+                          write_date = EXCLUDED.write_date
+        """, (entity_type, records._name, window, uid, uid, res_ids))
+        self.invalidate_model()
+
+        _logger.debug(f"Encolados {len(res_ids)} {records._name} para publicar ({entity_type})")
+        self._trigger_drain(fields.Datetime.now() + timedelta(seconds=window))
+
+    @api.model
+    def publish_after_commit(self, entity_type, records):
+        """
+        Publica registros tras el commit sin escribir en la tabla (modo async).
+
+        Los registros se acumulan por transacción. En el postcommit se
+        construyen los mensajes con el estado final (una vez por registro) y
+        se publican todos sin esperar uno a uno; solo al final se espera a
+        las confirmaciones. Un rollback descarta todo.
+
+        No se usa el precommit: corre en cada flush (también al abrir un
+        savepoint) y construiría los mensajes a mitad de transacción.
+
+        Args:
+            entity_type (str): Tipo de entidad ('cliente', 'producto', etc.)
+            records: Registros a publicar (todos del mismo modelo)
+        """
+        if not records:
+            return
+        data = self.env.cr.postcommit.data
+        pending = data.get('nesto_sync.async_publish')
+        if pending is None:
+            pending = data['nesto_sync.async_publish'] = {}
+            self.env.cr.postcommit.add(self._publish_async_pending)
+        pending.setdefault((entity_type, records._name), set()).update(records.ids)
+
+    def _publish_async_pending(self):
+        """
+        Postcommit del modo async: construye y publica los mensajes
+
+        La transacción original ya hizo commit: los mensajes se construyen
+        con un cursor nuevo (mismo usuario, para el campo Usuario). Los que
+        no se pueden construir se encolan en el outbox.
+        """
+        pending = self.env.cr.postcommit.data.pop('nesto_sync.async_publish', {})
+        if not pending:
+            return
+
+        messages = []
+        with self.pool.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, self.env.context, su=True)
+            Outbox = env['nesto.sync.outbox']
+            publisher = PublisherFactory.create_publisher(env)
+            for (entity_type, res_model), res_ids in pending.items():
+                records = env[res_model].browse(sorted(res_ids)).exists()
+                odoo_publisher = OdooPublisher(entity_type, env, publisher=publisher)
+                built, errors = odoo_publisher.build_messages(records)
+                for res_id, (topic, message) in built.items():
+                    ordering_key = odoo_publisher.ordering_key(records.browse(res_id))
+                    messages.append(((entity_type, res_model, res_id), topic, message, ordering_key))
+                if errors:
+                    _logger.warning(
+                        f"No se pudieron construir {len(errors)} mensajes de {entity_type}, "
+                        f"se encolan en el outbox: {errors}"
+                    )
+                    Outbox.enqueue(entity_type, env[res_model].browse(list(errors)))
+
+        if messages:
+            self._flush_async_publishes(publisher, messages)
+
+    def _flush_async_publishes(self, publisher, messages):
+        """
+        Publica los mensajes del modo async y espera las confirmaciones
+
+        Args:
+            publisher: IEventPublisher
+            messages: Lista de ((entity_type, res_model, res_id), topic, message, ordering_key)
+
+        Returns:
+            int: Mensajes publicados
+        """
+        futures = []
+        failures = {}
+        for key, topic, message, ordering_key in messages:
+            try:
+                futures.append((key, publisher.publish_event_async(
+                    topic, message, ordering_key=ordering_key)))
+            except Exception as e:
+                failures[key] = str(e)
+
+        for key, future in futures:
+            try:
+                future.result(timeout=self.PUBLISH_TIMEOUT)
+            except Exception as e:
+                failures[key] = str(e)
+
+        published = len(messages) - len(failures)
+        _logger.info(f"Publicación tras commit: {published} publicados, {len(failures)} con error")
+        if failures:
+            self._store_async_failures(failures)
+        return published
+
+    def _store_async_failures(self, failures):
+        """
+        Encola en el outbox las publicaciones fallidas del modo async
+
+        La transacción original ya hizo commit: se usa un cursor nuevo.
+
+        Args:
+            failures: {(entity_type, res_model, res_id): error}
+        """
+        try:
+            with self.pool.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                Outbox = env['nesto.sync.outbox']
+                max_attempts = int(env['ir.config_parameter'].get_param(
+                    'nesto_sync.outbox_max_attempts', self.DEFAULT_MAX_ATTEMPTS))
+
+                groups = {}
+                for (entity_type, res_model, res_id) in failures:
+                    groups.setdefault((entity_type, res_model), []).append(res_id)
+                for (entity_type, res_model), res_ids in groups.items():
+                    Outbox.enqueue(entity_type, env[res_model].browse(res_ids))
+                    entries = Outbox.search([
+                        ('res_model', '=', res_model),
+                        ('res_id', 'in', res_ids),
+                        ('state', '=', 'pending'),
+                    ])
+                    for entry in entries:
+                        entry._register_failure(
+                            failures[(entity_type, res_model, entry.res_id)], max_attempts
+                        )
+        except Exception as e:
+            _logger.error(
+                f"No se pudieron encolar {len(failures)} publicaciones fallidas: {str(e)}",
+                exc_info=True
+            )
+
+    @api.model
+    def _get_coalesce_seconds(self):
+        return float(self.env['ir.config_parameter'].sudo().get_param(
+            'nesto_sync.outbox_coalesce_seconds', self.DEFAULT_COALESCE_SECONDS))
+
+    @api.model
+    def _trigger_drain(self, at=None):
+        """
+        Lanza el cron de drenado tras el commit (una vez por transacción)
+
+        Args:
+            at (datetime): Momento de ejecución (por defecto, en cuanto se pueda)
+        """
+        data = self.env.cr.precommit.data
+        if data.get('nesto_sync.outbox_triggered'):
+            return
+        cron = self.env.ref('nesto_sync.ir_cron_outbox_drain', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger(at)
+            data['nesto_sync.outbox_triggered'] = True
+
+    @api.model
+    def process_pending(self, limit=None):
+        """
+        Publica un lote de filas pendientes cuya ventana de coalescencia venció.
+
+        Las filas bloqueadas por transacciones en curso (que acaban de volver
+        a encolar el registro) se saltan y se publicarán en el siguiente drenado.
+        Si quedan más pendientes, vuelve a lanzar el cron al terminar (o para
+        cuando venza la siguiente ventana).
+
+        Args:
+            limit: Número máximo de filas (por defecto, parámetro de sistema)
+
+        Returns:
+            int: Número de filas procesadas
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        batch_size = limit or int(config.get_param(
+            'nesto_sync.outbox_batch_size', self.DEFAULT_BATCH_SIZE))
+        max_attempts = int(config.get_param(
+            'nesto_sync.outbox_max_attempts', self.DEFAULT_MAX_ATTEMPTS))
+
+        self.flush_model()
+        self.env.cr.execute(f"""
+            SELECT id FROM "{self._table}"
+             WHERE state = 'pending'
+               AND (available_at IS NULL OR available_at <= now() at time zone 'UTC')
+             ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, (batch_size,))
+        entries = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not entries:
+            self._trigger_next_window()
+            return 0
+
+        publisher = PublisherFactory.create_publisher(self.env)
+        futures, errors = self._publish_entries(entries, publisher)
+
+        # Las publicaciones van en paralelo: solo se espera a las confirmaciones
+        sent = self.browse()
+        for entry, future in futures.items():
+            try:
+                future.result(timeout=self.PUBLISH_TIMEOUT)
+                sent |= entry
+            except Exception as e:
+                errors[entry] = str(e)
+
+        self.env['nesto.sync.outbox.stats'].record_published(sent)
+        coalesced = sum(sent.mapped('coalesced_count'))
+        sent.unlink()
+        for entry, error in errors.items():
+            entry._register_failure(error, max_attempts)
+
+        _logger.info(
+            f"Outbox: {len(sent)} publicados ({coalesced} ahorrados por coalescencia), "
+            f"{len(errors)} con error ({len(entries)} procesados)"
+        )
+
+        if len(entries) == batch_size:
+            self._trigger_drain()
+        else:
+            self._trigger_next_window()
+
+        return len(entries)
+
+    @api.model
+    def _trigger_next_window(self):
+        """
+        Programa el drenado para cuando venza la próxima ventana pendiente
+
+        Las filas ya vencidas pero bloqueadas por otra transacción no cuentan:
+        esa transacción lanza el cron al hacer commit.
+        """
+        self.env.cr.execute(f"""
+            SELECT min(available_at) FROM "{self._table}"
+             WHERE state = 'pending' AND available_at > now() at time zone 'UTC'
+        """)
+        next_at = self.env.cr.fetchone()[0]
+        if next_at:
+            self._trigger_drain(next_at)
+
+    @api.model
+    def _publish_entries(self, entries, publisher):
+        """
+        Construye los mensajes y lanza las publicaciones asíncronas.
+
+        Los registros borrados desde que se encolaron se descartan.
+
+        Returns:
+            tuple: ({fila: future}, {fila: error})
+        """
+        futures = {}
+        errors = {}
+
+        groups = {}
+        for entry in entries:
+            groups.setdefault((entry.entity_type, entry.res_model), self.browse())
+            groups[(entry.entity_type, entry.res_model)] |= entry
+
+        for (entity_type, res_model), group in groups.items():
+            # Mensajes del grupo construidos con children, BOMs, etc. precargados
+            records = self.env[res_model].browse(group.mapped('res_id')).exists()
+            odoo_publisher = OdooPublisher(entity_type, self.env, publisher=publisher)
+            messages, build_errors = odoo_publisher.build_messages(records)
+
+            for entry in group:
+                if entry.res_id in build_errors:
+                    errors[entry] = build_errors[entry.res_id]
+                    continue
+                if entry.res_id not in messages:
+                    _logger.debug(f"Outbox: {res_model} ID {entry.res_id} ya no existe, se descarta")
+                    entry.unlink()
+                    continue
+                try:
+                    topic, message = messages[entry.res_id]
+                    futures[entry] = publisher.publish_event_async(
+                        topic, message, ordering_key=odoo_publisher.ordering_key(records.browse(entry.res_id))
+                    )
+                except Exception as e:
+                    errors[entry] = str(e)
+
+        return futures, errors
+
+    def _register_failure(self, error, max_attempts):
+        """Suma un intento fallido; al llegar al máximo deja la fila en error"""
+        self.ensure_one()
+        attempts = self.attempts + 1
+        state = 'error' if attempts >= max_attempts else 'pending'
+        if state == 'error':
+            _logger.error(
+                f"Outbox: no se pudo publicar {self.res_model} ID {self.res_id} "
+                f"tras {attempts} intentos: {error}"
+            )
+        self.write({'attempts': attempts, 'state': state, 'last_error': error})
+
+    def action_retry(self):
+        """Vuelve a dejar pendientes las filas en error"""
+        for entry in self.filtered(lambda e: e.state == 'error'):
+            # Si el registro se volvió a encolar, la fila pendiente ya lo cubre
+            duplicate = self.search_count([
+                ('res_model', '=', entry.res_model),
+                ('res_id', '=', entry.res_id),
+                ('state', '=', 'pending'),
+            ])
+            if duplicate:
+                entry.unlink()
+            else:
+                entry.write({'state': 'pending', 'attempts': 0, 'available_at': fields.Datetime.now()})
+        self._trigger_drain()
+
+    @api.model
+    def get_stats(self):
+        """
+        Estadísticas del outbox para monitorización (/nesto_sync/stats).
+
+        Returns:
+            dict con filas pendientes/en error y, por entidad, publicaciones
+            hechas y ahorradas por coalescencia (acumulado y del día)
+        """
+        by_state = {
+            group['state']: group['state_count']
+            for group in self.read_group([], ['state'], ['state'])
+        }
+        return {
+            'pending': by_state.get('pending', 0),
+            'error': by_state.get('error', 0),
+            'coalesce_seconds': self._get_coalesce_seconds(),
+            'entities': self.env['nesto.sync.outbox.stats'].get_totals(),
+        }
+
+
+class NestoSyncOutboxStats(models.Model):
+    """Publicaciones del outbox por día y entidad."""
+
+    _name = 'nesto.sync.outbox.stats'
+    _description = 'Estadísticas del outbox de publicaciones'
+    _order = 'date desc, entity_type'
+
+    date = fields.Date(
+        string='Fecha',
+        required=True,
+        index=True,
+        default=fields.Date.context_today
+    )
+
+    entity_type = fields.Char(
+        string='Tipo de entidad',
+        required=True
+    )
+
+    published = fields.Integer(
+        string='Mensajes publicados',
+        default=0
+    )
+
+    coalesced = fields.Integer(
+        string='Publicaciones ahorradas',
+        default=0,
+        help='Cambios absorbidos por la coalescencia que no generaron mensaje'
+    )
+
+    _sql_constraints = [
+        ('date_entity_uniq', 'unique(date, entity_type)',
+         'Solo puede haber una fila de estadísticas por día y entidad'),
+    ]
+
+    @api.model
+    def record_published(self, entries):
+        """
+        Acumula las filas del outbox publicadas en las estadísticas del día
+
+        Args:
+            entries: nesto.sync.outbox publicados
+        """
+        totals = {}
+        for entry in entries:
+            published, coalesced = totals.get(entry.entity_type, (0, 0))
+            totals[entry.entity_type] = (published + 1, coalesced + entry.coalesced_count)
+        if not totals:
+            return
+
+        today = fields.Date.context_today(self)
+        existing = {
+            stats.entity_type: stats
+            for stats in self.search([('date', '=', today), ('entity_type', 'in', list(totals))])
+        }
+        for entity_type, (published, coalesced) in totals.items():
+            stats = existing.get(entity_type)
+            if stats:
+                stats.write({
+                    'published': stats.published + published,
+                    'coalesced': stats.coalesced + coalesced,
+                })
+            else:
+                self.create({
+                    'date': today,
+                    'entity_type': entity_type,
+                    'published': published,
+                    'coalesced': coalesced,
+                })
+
+    @api.model
+    def get_totals(self):
+        """
+        Totales por entidad (acumulado y del día)
+
+        Returns:
+            dict {entity_type: {published, coalesced, saved_ratio, today: {...}}}
+        """
+        today = fields.Date.context_today(self)
+        totals = {}
+        for stats in self.search([]):
+            entity = totals.setdefault(stats.entity_type, {
+                'published': 0, 'coalesced': 0,
+                'today': {'published': 0, 'coalesced': 0},
+            })
+            entity['published'] += stats.published
+            entity['coalesced'] += stats.coalesced
+            if stats.date == today:
+                entity['today'] = {'published': stats.published, 'coalesced': stats.coalesced}
+
+        for entity in totals.values():
+            # Fracción de publicaciones que se habrían hecho sin coalescencia y se ahorraron
+            attempted = entity['published'] + entity['coalesced']
+            entity['saved_ratio'] = round(entity['coalesced'] / attempted, 4) if attempted else 0.0
+        return totals
@@ -1,13 +1,19 @@
 from odoo import models, fields, api
-from odoo.exceptions import ValidationError
 import logging
 
+from .unique_index import create_external_id_index, translate_unique_violation
+
 _logger = logging.getLogger(__name__)
 
 class ProductTemplate(models.Model):
     _name = 'product.template'
     _inherit = ['bidirectional.sync.mixin', 'product.template']
 
+    # Unicidad de producto_externo garantizada por un índice único parcial (ver init)
+    _external_id_index = 'product_template_producto_externo_uniq'
+    _external_id_fields = ['producto_externo']
+    _external_id_message = "El Producto Externo '{value}' ya existe en el sistema."
+
     producto_externo = fields.Char(
         string="Producto Externo",
         index=True,
@@ -42,6 +48,34 @@ class ProductTemplate(models.Model):
         help="URL de la imagen actualmente cargada. Se usa para detectar si cambió la imagen."
     )
 
+    # Estado de la descarga en segundo plano de la imagen (ver models/image_fetcher.py)
+    imagen_estado = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('done', 'Descargada'),
+        ('error', 'Error'),
+    ], string="Estado Imagen", index=True, copy=False,
+        help="Estado de la descarga de la imagen de url_imagen_actual"
+    )
+
+    imagen_sha256 = fields.Char(
+        string="SHA-256 Imagen",
+        copy=False,
+        help="Hash del contenido de image_1920. Si una descarga da el mismo hash no se reescribe la imagen."
+    )
+
+    imagen_comprobada = fields.Datetime(
+        string="Imagen Comprobada",
+        copy=False,
+        help="Última vez que se comprobó la imagen contra su URL (petición condicional)"
+    )
+
+    imagen_intentos = fields.Integer(
+        string="Intentos Descarga Imagen",
+        default=0,
+        copy=False,
+        help="Intentos fallidos de descarga de la imagen actual"
+    )
+
     # Campo para almacenar el volumen en mililitros (evita problemas de redondeo)
     # Este campo se usa como fuente de verdad para volúmenes pequeños
     volume_ml = fields.Float(
@@ -115,16 +149,101 @@ class ProductTemplate(models.Model):
                 # Sin volumen
                 product.volume_display = ""
 
-    @api.constrains('producto_externo')
-    def _check_unique_producto_externo(self):
-        """Validar que producto_externo sea único si está definido"""
-        for record in self:
-            if record.producto_externo:
-                duplicates = self.search([
-                    ('id', '!=', record.id),
-                    ('producto_externo', '=', record.producto_externo)
-                ])
-                if duplicates:
-                    raise ValidationError(
-                        f"El Producto Externo '{record.producto_externo}' ya existe en el sistema."
-                    )
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Deja pendiente la descarga de imagen de los productos creados con URL"""
+        pending = False
+        for vals in vals_list:
+            if self._needs_image_download(vals):
+                vals.update({'imagen_estado': 'pending', 'imagen_intentos': 0})
+                pending = True
+
+        if any(field in vals for vals in vals_list for field in self._external_id_fields):
+            with self._translate_external_id_violation():
+                records = super().create(vals_list)
+        else:
+            records = super().create(vals_list)
+
+        if pending:
+            self._trigger_image_fetcher()
+        return records
+
+    def write(self, vals):
+        """Escribe traduciendo la violación de unicidad de producto_externo"""
+        if not any(field in vals for field in self._external_id_fields):
+            return self._write_with_image_vals(vals)
+
+        with self._translate_external_id_violation():
+            result = self._write_with_image_vals(vals)
+            self.flush_recordset(self._external_id_fields)
+        return result
+
+    def _write_with_image_vals(self, vals):
+        """
+        Ajusta por producto los valores de imagen antes de escribir:
+        - Si cambia url_imagen_actual, deja pendiente la descarga
+        - Si llega la misma imagen (mismo imagen_sha256), no reescribe image_1920
+          (ni se recalculan sus variantes redimensionadas)
+        """
+        if not self._needs_image_download(vals) and 'image_1920' not in vals:
+            return super().write(vals)
+
+        # Agrupar los productos que acaban con los mismos valores
+        batches = {}
+        for product in self:
+            product_vals = product._prepare_image_write_vals(vals)
+            batch = batches.setdefault(tuple(sorted(product_vals)), [product_vals, self.browse()])
+            batch[1] |= product
+
+        result = True
+        for product_vals, products in batches.values():
+            result = super(ProductTemplate, products).write(product_vals) and result
+
+        if any(product_vals.get('imagen_estado') == 'pending' for product_vals, _products in batches.values()):
+            self._trigger_image_fetcher()
+        return result
+
+    def _prepare_image_write_vals(self, vals):
+        """Valores de imagen efectivos para este producto (ver write)"""
+        vals = dict(vals)
+
+        if 'image_1920' in vals:
+            if not vals.get('imagen_sha256'):
+                # Imagen cargada a mano o borrada: el hash anterior ya no vale
+                vals['imagen_sha256'] = False
+            elif vals['imagen_sha256'] == self.imagen_sha256:
+                del vals['image_1920']
+
+        if self._needs_image_download(vals) and self.url_imagen_actual != vals['url_imagen_actual']:
+            vals.update({'imagen_estado': 'pending', 'imagen_intentos': 0})
+
+        return vals
+
+    @api.model
+    def _needs_image_download(self, vals):
+        """True si vals fija una URL de imagen sin traer la imagen ni su estado"""
+        return bool(
+            vals.get('url_imagen_actual')
+            and 'image_1920' not in vals
+            and 'imagen_estado' not in vals
+        )
+
+    @api.model
+    def _trigger_image_fetcher(self):
+        """Lanza el fetcher de imágenes (una vez por transacción)"""
+        data = self.env.cr.precommit.data
+        if data.get('nesto_sync.image_fetcher_triggered'):
+            return
+        cron = self.env.ref('nesto_sync.ir_cron_image_fetcher', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+            data['nesto_sync.image_fetcher_triggered'] = True
+
+    def init(self):
+        super().init()
+        create_external_id_index(
+            self.env.cr, self._external_id_index, self._table, ['producto_externo'],
+        )
+
+    def _translate_external_id_violation(self):
+        return translate_unique_violation(self.env.cr, {self._external_id_index: self._external_id_message})
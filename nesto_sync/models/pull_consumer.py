@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Consumidor PubSub en modo pull.
+
+Alternativa al endpoint push: pide lotes de mensajes a la suscripción,
+los procesa con BatchMessageProcessor (savepoint por mensaje, un commit
+por lote) y solo después confirma/rechaza cada mensaje.
+"""
+
+from odoo import models, api
+import logging
+
+from ..core.batch_processor import BatchMessageProcessor
+from ..infrastructure.subscriber_factory import SubscriberFactory
+
+_logger = logging.getLogger(__name__)
+
+
+class NestoSyncPullConsumer(models.AbstractModel):
+    """Consumo pull de la suscripción de Nesto por lotes."""
+
+    _name = 'nesto.sync.pull.consumer'
+    _description = 'Consumidor PubSub en modo pull'
+
+    DEFAULT_BATCH_SIZE = 100  # Mensajes por pull (nesto_sync.pull_batch_size)
+    DEFAULT_MAX_BATCHES = 10  # Lotes por ejecución (nesto_sync.pull_max_batches)
+
+    @api.model
+    def pull_and_process(self, max_batches=None):
+        """
+        Consume lotes de la suscripción hasta vaciarla o llegar al máximo.
+
+        Pensado para ejecutarse desde cron. Cada lote se procesa en una
+        transacción y solo se hace ack de los mensajes tras el commit.
+
+        Args:
+            max_batches: Número máximo de lotes (por defecto, parámetro de sistema)
+
+        Returns:
+            int: Número de mensajes procesados
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        batch_size = int(config.get_param('nesto_sync.pull_batch_size', self.DEFAULT_BATCH_SIZE))
+        if max_batches is None:
+            max_batches = int(config.get_param('nesto_sync.pull_max_batches', self.DEFAULT_MAX_BATCHES))
+
+        subscriber = SubscriberFactory.create_subscriber(self.env)
+        processor = BatchMessageProcessor(self.env)
+
+        total = 0
+        for _batch in range(max_batches):
+            leased = subscriber.pull(batch_size)
+            if not leased:
+                break
+
+            total += self._process_leased(subscriber, processor, leased)
+
+            if len(leased) < batch_size:
+                # Suscripción vaciada
+                break
+
+        if total:
+            _logger.info(f"Consumidor pull: {total} mensajes procesados")
+
+        return total
+
+    def _process_leased(self, subscriber, processor, leased):
+        """
+        Procesa un lote recibido y confirma/rechaza cada mensaje.
+
+        Args:
+            subscriber: GooglePubSubSubscriber
+            processor: BatchMessageProcessor
+            leased: Lista de (ack_id, envelope, size_bytes)
+
+        Returns:
+            int: Número de mensajes del lote
+        """
+        ack_ids = [ack_id for ack_id, _envelope, _size in leased]
+        envelopes = [envelope for _ack_id, envelope, _size in leased]
+
+        try:
+            # process_batch hace commit antes de devolver los resultados
+            results = processor.process_batch(envelopes)
+        except Exception as e:
+            _logger.error(f"Error procesando lote pull: {str(e)}", exc_info=True)
+            self.env.cr.rollback()
+            subscriber.nack(ack_ids)
+            return len(leased)
+
+        to_ack = [ack_id for ack_id, result in zip(ack_ids, results) if result['ack']]
+        to_nack = [ack_id for ack_id, result in zip(ack_ids, results) if not result['ack']]
+
+        subscriber.acknowledge(to_ack)
+        subscriber.nack(to_nack)
+
+        return len(leased)
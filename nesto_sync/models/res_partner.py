@@ -1,7 +1,8 @@
 from odoo import models, fields, api
-from odoo.exceptions import ValidationError
 import logging
 
+from .unique_index import create_external_id_index, translate_unique_violation
+
 _logger = logging.getLogger(__name__)
 
 class ResPartner(models.Model):
@@ -16,33 +17,45 @@ class ResPartner(models.Model):
     # exclusivamente por email (VendedorEmail). Cada sistema resuelve
     # el código de vendedor desde el email de forma independiente.
 
-    @api.constrains('cliente_externo', 'contacto_externo', 'persona_contacto_externa')
-    def _check_unique_combinations(self):
-        for record in self:
-            # Si persona_contacto_externa es None, validar unicidad solo de cliente_externo y contacto_externo
-            if not record.persona_contacto_externa:
-                duplicates = self.search([
-                    ('id', '!=', record.id),
-                    ('cliente_externo', '=', record.cliente_externo),
-                    ('contacto_externo', '=', record.contacto_externo),
-                    ('persona_contacto_externa', '=', False)
-                ])
-                if duplicates:
-                    raise ValidationError(
-                        "La combinación de Cliente Externo y Contacto Externo debe ser única si no se especifica una Persona de Contacto Externa."
-                    )
-            # Si persona_contacto_externa no es None, validar unicidad de cliente_externo, contacto_externo y persona_contacto_externa
-            else:
-                duplicates = self.search([
-                    ('id', '!=', record.id),
-                    ('cliente_externo', '=', record.cliente_externo),
-                    ('contacto_externo', '=', record.contacto_externo),
-                    ('persona_contacto_externa', '=', record.persona_contacto_externa)
-                ])
-                if duplicates:
-                    raise ValidationError(
-                        "La combinación de Cliente Externo, Contacto Externo y Persona de Contacto Externa debe ser única."
-                    )
+    # Unicidad de (cliente_externo, contacto_externo, persona_contacto_externa)
+    # garantizada por un índice único parcial (ver init). NULL y '' cuentan
+    # como el mismo valor en contacto_externo y persona_contacto_externa
+    _external_id_index = 'res_partner_nesto_externo_ids_uniq'
+    _external_id_fields = ['cliente_externo', 'contacto_externo', 'persona_contacto_externa']
+    _external_id_message = (
+        "La combinación de Cliente Externo, Contacto Externo y Persona de Contacto Externa "
+        "debe ser única (sin Persona de Contacto Externa, la de Cliente y Contacto Externo)."
+    )
+
+    def init(self):
+        super().init()
+        create_external_id_index(
+            self.env.cr, self._external_id_index, self._table,
+            [
+                'cliente_externo',
+                "COALESCE(contacto_externo, '')",
+                "COALESCE(persona_contacto_externa, '')",
+            ],
+            replaces=('res_partner_nesto_externo_uniq', 'res_partner_nesto_externo_key_uniq'),
+        )
+
+    def _translate_external_id_violation(self):
+        return translate_unique_violation(self.env.cr, {self._external_id_index: self._external_id_message})
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        if not any(field in vals for vals in vals_list for field in self._external_id_fields):
+            return super().create(vals_list)
+        with self._translate_external_id_violation():
+            return super().create(vals_list)
+
+    def write(self, vals):
+        if not any(field in vals for field in self._external_id_fields):
+            return super().write(vals)
+        with self._translate_external_id_violation():
+            result = super().write(vals)
+            self.flush_recordset(self._external_id_fields)
+        return result
 
     @api.model
     def _search_cliente_externo(self, operator, value):
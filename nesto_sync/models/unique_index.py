@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Unicidad de IDs externos con índices únicos parciales de PostgreSQL.
+
+Sustituye a los @api.constrains que hacían un search por registro: la base
+de datos garantiza la unicidad (O(log n) por inserción) y los mismos índices
+sirven a las búsquedas por ID externo de GenericEntityService._find_record.
+"""
+
+import logging
+import re
+from contextlib import contextmanager
+
+import psycopg2
+
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools import sql
+
+_logger = logging.getLogger(__name__)
+
+# Duplicados que se listan en el error cuando no se puede crear un índice
+MAX_REPORTED_DUPLICATES = 20
+
+
+def create_partial_unique_index(cr, index_name, table, expressions, where):
+    """
+    Crea un índice único parcial si no existe.
+
+    Si ya hay duplicados en la tabla, el índice no se puede crear y sin él
+    no hay ninguna garantía de unicidad: se lanza un error que lista las
+    claves duplicadas y detiene la instalación/actualización del módulo.
+
+    Args:
+        cr: Cursor de base de datos
+        index_name (str): Nombre del índice (y de la violación de unicidad)
+        table (str): Tabla
+        expressions (list): Columnas o expresiones indexadas
+        where (str): Condición del índice parcial
+
+    Raises:
+        UserError: Si hay filas duplicadas
+    """
+    if sql.index_exists(cr, index_name):
+        return
+
+    columns = ", ".join(expressions)
+    cr.execute(f"""
+        SELECT {columns}, count(*)
+          FROM "{table}"
+         WHERE {where}
+         GROUP BY {columns}
+        HAVING count(*) > 1
+         ORDER BY count(*) DESC
+         LIMIT %s
+    """, (MAX_REPORTED_DUPLICATES,))
+    duplicates = cr.fetchall()
+    if duplicates:
+        keys = '\n'.join(
+            f"- ({', '.join(str(value) for value in row[:-1])}): {row[-1]} registros"
+            for row in duplicates
+        )
+        raise UserError(
+            f"No se puede crear el índice único {index_name} en {table}: hay claves "
+            f"duplicadas ({columns}). Elimine o corrija los duplicados y actualice el módulo "
+            f"(se muestran como máximo {MAX_REPORTED_DUPLICATES}):\n{keys}"
+        )
+
+    cr.execute(f'CREATE UNIQUE INDEX "{index_name}" ON "{table}" ({columns}) WHERE {where}')
+    _logger.info(f"Índice único {index_name} creado en {table}")
+
+
+def create_external_id_index(cr, index_name, table, expressions, replaces=()):
+    """
+    Crea el índice único parcial de un ID externo (ver create_partial_unique_index)
+
+    La primera expresión es la columna del ID externo: el índice solo cubre
+    las filas donde tiene valor (ni NULL ni ''), igual en todos los modelos.
+
+    Args:
+        cr: Cursor de base de datos
+        index_name (str): Nombre del índice
+        table (str): Tabla
+        expressions (list): Columnas o expresiones indexadas (la primera, el ID externo)
+        replaces (tuple): Índices anteriores que sustituye (se eliminan tras crearlo)
+    """
+    key_column = expressions[0]
+    create_partial_unique_index(
+        cr, index_name, table, expressions, f"{key_column} IS NOT NULL AND {key_column} != ''"
+    )
+    for old_index in replaces:
+        if sql.index_exists(cr, old_index):
+            cr.execute(f'DROP INDEX "{old_index}"')
+            _logger.info(f"Índice único {old_index} sustituido por {index_name}")
+
+
+@contextmanager
+def translate_unique_violation(cr, messages):
+    """
+    Convierte las violaciones de los índices únicos en ValidationError.
+
+    Ejecuta el bloque en un savepoint para que la transacción siga siendo
+    utilizable tras el error. El bloque debe forzar el flush de los campos
+    indexados para que la violación se produzca dentro.
+
+    Args:
+        cr: Cursor de base de datos
+        messages (dict): {nombre del índice: mensaje de error legible}. El
+            mensaje puede incluir {value} con el valor duplicado
+    """
+    try:
+        with cr.savepoint():
+            yield
+    except psycopg2.errors.UniqueViolation as e:
+        message = messages.get(e.diag.constraint_name)
+        if not message:
+            raise
+        # Detalle de PostgreSQL: "Key (columnas)=(valores) already exists." (o traducido)
+        match = re.search(r'\)=\((.*)\)', e.diag.message_detail or '')
+        raise ValidationError(message.format(value=match.group(1) if match else '')) from None
@@ -28,3 +28,31 @@ from . import test_nombre_regression
 
 # Tests mensajes parciales (Issue #3)
 from . import test_partial_messages
+
+# Tests plan compilado de procesamiento Nesto → Odoo
+from . import test_processing_plan
+
+# Tests procesamiento por lotes (endpoint /nesto_sync/batch y modo pull)
+from . import test_batch_processor
+from . import test_pull_worker
+
+# Tests descarte de mensajes duplicados (idempotencia)
+from . import test_idempotency
+
+# Tests caché de lookups many2one
+from . import test_lookup_cache
+
+# Tests descarga de imágenes en segundo plano
+from . import test_image_fetcher
+
+# Tests outbox transaccional de publicaciones
+from . import test_outbox
+
+# Tests publisher local (sin red)
+from . import test_local_file_publisher
+
+# Tests harness de benchmarks de ingesta
+from . import test_benchmark_harness
+
+# Suite de presupuestos de consultas (solo con --test-tags nesto_sync_benchmark)
+from . import test_benchmark_budgets
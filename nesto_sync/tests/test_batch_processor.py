@@ -0,0 +1,99 @@
+"""
+Tests para BatchMessageProcessor - Procesamiento de lotes PubSub
+
+Valida que:
+1. Un lote crea/actualiza todos sus mensajes con resultado ack por mensaje
+2. Un mensaje fallido no deshace el resto del lote (savepoint por mensaje)
+3. Los fallos se registran en el tracking de reintentos y acaban en DLQ
+"""
+
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+from ..benchmarks import EnvelopeFactory
+from ..core.batch_processor import BatchMessageProcessor
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestBatchMessageProcessor(TransactionCase):
+    """Tests del procesamiento por lotes"""
+
+    def setUp(self):
+        super().setUp()
+        self.processor = BatchMessageProcessor(self.env, test_mode=True)
+        self.MessageRetry = self.env['nesto.sync.message.retry']
+        self.FailedMessage = self.env['nesto.sync.failed.message']
+        self.factory = EnvelopeFactory()
+
+    def _producto(self, producto, nombre):
+        return {'Tabla': 'Productos', 'Producto': producto, 'Nombre': nombre}
+
+    def test_batch_creates_all_messages(self):
+        """Test: Todos los mensajes válidos del lote se aplican y se confirman"""
+        envelopes = [
+            self.factory.envelope(self._producto('BATCH001', 'Producto lote 1'), 'batch-msg-1'),
+            self.factory.envelope(self._producto('BATCH002', 'Producto lote 2'), 'batch-msg-2'),
+        ]
+
+        results = self.processor.process_batch(envelopes)
+
+        self.assertEqual([r['messageId'] for r in results], ['batch-msg-1', 'batch-msg-2'])
+        self.assertTrue(all(r['ack'] for r in results))
+
+        products = self.env['product.template'].search([
+            ('producto_externo', 'in', ['BATCH001', 'BATCH002'])
+        ])
+        self.assertEqual(len(products), 2)
+
+    def test_failed_message_does_not_rollback_batch(self):
+        """Test: Un mensaje inválido se rechaza sin afectar al resto del lote"""
+        envelopes = [
+            self.factory.envelope(self._producto('BATCH003', 'Producto lote 3'), 'batch-msg-3'),
+            self.factory.envelope({'Tabla': 'TablaDesconocida'}, 'batch-msg-bad'),
+            self.factory.envelope(self._producto('BATCH004', 'Producto lote 4'), 'batch-msg-4'),
+        ]
+
+        results = self.processor.process_batch(envelopes)
+
+        self.assertTrue(results[0]['ack'])
+        self.assertFalse(results[1]['ack'])
+        self.assertEqual(results[1]['status'], 500)
+        self.assertTrue(results[2]['ack'])
+
+        products = self.env['product.template'].search([
+            ('producto_externo', 'in', ['BATCH003', 'BATCH004'])
+        ])
+        self.assertEqual(len(products), 2)
+
+        retry = self.MessageRetry.search([('message_id', '=', 'batch-msg-bad')])
+        self.assertEqual(retry.retry_count, 1)
+
+    def test_ignored_table_is_acked(self):
+        """Test: Tablas ignoradas se confirman sin procesar"""
+        results = self.processor.process_batch([
+            self.factory.envelope({'Tabla': 'PrestashopProductos'}, 'batch-msg-ignored'),
+        ])
+
+        self.assertTrue(results[0]['ack'])
+        self.assertEqual(results[0]['message'], 'Tabla ignorada')
+
+    def test_persistent_failure_moves_to_dlq(self):
+        """Test: Tras agotar reintentos el mensaje va a DLQ y se confirma"""
+        envelope = self.factory.envelope({'Tabla': 'TablaDesconocida'}, 'batch-msg-dlq')
+
+        for _attempt in range(self.MessageRetry.MAX_RETRIES):
+            result = self.processor.process_batch([envelope])[0]
+            self.assertFalse(result['ack'])
+
+        result = self.processor.process_batch([envelope])[0]
+
+        self.assertTrue(result['ack'])
+        failed = self.FailedMessage.search([('message_id', '=', 'batch-msg-dlq')])
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed.state, 'failed')
+
+    def test_envelope_without_data_is_acked(self):
+        """Test: Envelope sin messageId ni data se confirma (no se puede trackear)"""
+        results = self.processor.process_batch([{'message': {}}])
+
+        self.assertTrue(results[0]['ack'])
+        self.assertIsNone(results[0]['messageId'])
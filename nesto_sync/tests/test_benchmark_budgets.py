@@ -0,0 +1,143 @@
+"""
+Suite de presupuestos de consultas SQL del pipeline (nesto_sync_benchmark)
+
+Cada operación se mide con lotes de REFERENCE_ITEMS y del doble sobre un
+dataset sintético de NESTO_SYNC_BENCHMARK_SIZE clientes y productos, y se
+compara con benchmarks/baselines.py. Un cambio que añade una consulta N+1
+hace fallar la suite.
+
+Ejecución:
+    NESTO_SYNC_BENCHMARK_SIZE=10000 odoo-bin ... --test-tags nesto_sync_benchmark
+"""
+
+from unittest.mock import Mock
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+
+from nesto_sync.benchmarks import EnvelopeFactory, QueryBudget, SyntheticDataset, count_queries, get_dataset_size
+from nesto_sync.benchmarks.baselines import REFERENCE_ITEMS
+from nesto_sync.benchmarks.dataset import BULK_CONTEXT
+from nesto_sync.core.entity_registry import EntityRegistry
+from nesto_sync.core.odoo_publisher import OdooPublisher
+from nesto_sync.transformers.post_processors import SyncProductBom
+
+
+@tagged('post_install', '-at_install', 'nesto_sync_benchmark')
+class BenchmarkQueryBudgets(TransactionCase):
+    """Presupuestos de consultas por operación"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        config = cls.env['ir.config_parameter'].sudo()
+        config.set_param('nesto_sync.publish_mode', 'outbox')
+        config.set_param('nesto_sync.outbox_coalesce_seconds', '0')
+        cls.dataset = SyntheticDataset(cls.env, get_dataset_size()).build()
+        cls.registry_entities = EntityRegistry()
+
+    @classmethod
+    def tearDownClass(cls):
+        QueryBudget.write_measured()
+        super().tearDownClass()
+
+    def _sizes(self):
+        return REFERENCE_ITEMS, 2 * REFERENCE_ITEMS
+
+    def _slice(self, records, items):
+        """Registros distintos para cada medición (sin caché de la anterior)"""
+        offset = 0 if items == REFERENCE_ITEMS else REFERENCE_ITEMS
+        return records[offset:offset + items]
+
+    def _check(self, operation, measure):
+        """Mide measure(items) con el tamaño de referencia y el doble y comprueba el presupuesto"""
+        reference, double = (measure(items) for items in self._sizes())
+        QueryBudget(operation).check(reference, double)
+
+    def _partner_with_contacts(self, code, count):
+        Partner = self.env['res.partner'].with_context(**BULK_CONTEXT)
+        partner = Partner.create({
+            'name': f'Cliente {code}',
+            'cliente_externo': code,
+            'contacto_externo': '0',
+            'is_company': True,
+        })
+        Partner.create([{
+            'name': f'Persona {index} de {code}',
+            'parent_id': partner.id,
+            'type': 'contact',
+            'cliente_externo': code,
+            'contacto_externo': '0',
+            'persona_contacto_externa': str(index),
+        } for index in range(1, count + 1)])
+        return partner
+
+    def test_processor_process(self):
+        """Presupuesto: GenericEntityProcessor.process de un cliente"""
+        processor = self.registry_entities.get_processor('cliente', self.env)
+
+        def measure(items):
+            message = EnvelopeFactory(contacts_per_client=items, prefix=f'BPR{items}').cliente(1)
+            processor.process(message)  # Caché de lookups caliente
+            return count_queries(self.env, lambda: processor.process(message))[0]
+
+        self._check('processor.process', measure)
+
+    def test_service_unchanged_message(self):
+        """Presupuesto: GenericEntityService.create_or_update_contact con un mensaje sin cambios"""
+        processor = self.registry_entities.get_processor('cliente', self.env)
+        service = self.registry_entities.get_service('cliente', self.env, test_mode=True)
+
+        def measure(items):
+            message = EnvelopeFactory(contacts_per_client=items, prefix=f'BSV{items}').cliente(1)
+            service.create_or_update_contact(processor.process(message))
+            processed = processor.process(message)
+            return count_queries(self.env, lambda: service.create_or_update_contact(processed))[0]
+
+        self._check('service.create_or_update_contact', measure)
+
+    def test_publisher_publish_record(self):
+        """Presupuesto: OdooPublisher.publish_record de un cliente con personas de contacto"""
+        publisher = OdooPublisher('cliente', self.env, publisher=Mock())
+
+        def measure(items):
+            partner = self._partner_with_contacts(f'BPB{items}', items)
+            return count_queries(self.env, lambda: publisher.publish_record(partner))[0]
+
+        self._check('publisher.publish_record', measure)
+
+    def test_publisher_publish_records(self):
+        """Presupuesto: OdooPublisher.publish_records de un lote de clientes"""
+        publisher = OdooPublisher('cliente', self.env, publisher=Mock())
+        partners = self.dataset.partners
+
+        def measure(items):
+            batch = self._slice(partners, items)
+            return count_queries(self.env, lambda: publisher.publish_records(batch))[0]
+
+        self._check('publisher.publish_records', measure)
+
+    def test_sync_bom(self):
+        """Presupuesto: SyncProductBom._sync_bom de un kit"""
+        products = self.dataset.products - self.dataset.kits
+        Product = self.env['product.template'].with_context(**BULK_CONTEXT)
+
+        def measure(items):
+            kit = Product.create({'name': f'Kit {items}', 'producto_externo': f'BKIT{items}'})
+            components = products[:items]
+            kit_data = [{'ProductoId': product.producto_externo, 'Cantidad': 1} for product in components]
+            return count_queries(self.env, lambda: SyncProductBom()._sync_bom(self.env, kit, kit_data))[0]
+
+        self._check('bom._sync_bom', measure)
+
+    def test_mixin_write(self):
+        """Presupuesto: write() de un lote de clientes sincronizados"""
+        # Distintos de los de test_publisher_publish_records
+        partners = self.dataset.partners[5 * REFERENCE_ITEMS:]
+
+        def measure(items):
+            batch = self._slice(partners, items)
+            # El cron de drenado se lanza una vez por transacción: medir siempre el primer write
+            self.env.cr.precommit.data.pop('nesto_sync.outbox_triggered', None)
+            return count_queries(self.env, lambda: batch.write({'city': f'Ciudad {items}'}))[0]
+
+        self._check('mixin.write', measure)
@@ -0,0 +1,154 @@
+"""
+Tests para el harness de benchmarks de ingesta (nesto_sync/benchmarks)
+
+Valida que:
+1. Los envelopes generados son deterministas y decodificables
+2. La reproducción por controller y por processor aplica los mensajes y mide cada uno
+3. El servidor local de imágenes sirve la imagen con ETag
+4. Los presupuestos de consultas fallan sin línea base registrada
+
+El benchmark de carga (BenchmarkIngest) solo se ejecuta con
+--test-tags nesto_sync_benchmark.
+"""
+
+import logging
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+
+from nesto_sync.benchmarks import EnvelopeFactory, ImageStubServer, IngestHarness
+from nesto_sync.benchmarks import baselines
+from nesto_sync.benchmarks.budgets import QueryBudget, QueryBudgetExceeded
+from nesto_sync.benchmarks.harness import percentile
+from nesto_sync.models.google_pubsub_message_adapter import GooglePubSubMessageAdapter
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestIngestHarness(TransactionCase):
+    """Tests del harness de ingesta"""
+
+    def setUp(self):
+        super().setUp()
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.publish_mode', 'outbox')
+        self.harness = IngestHarness(self.env)
+
+    def test_factory_is_deterministic(self):
+        """Test: Misma semilla → mismos mensajes; el envelope se decodifica"""
+        first = EnvelopeFactory(seed=7, contacts_per_client=3).cliente(1)
+        second = EnvelopeFactory(seed=7, contacts_per_client=3).cliente(1)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first['PersonasContacto']), 3)
+
+        factory = EnvelopeFactory(kit_size=2, image_base_url='http://localhost:1')
+        envelopes = factory.productos(1)
+        self.assertEqual(len(envelopes), 3)  # 2 componentes + el kit
+        producto = GooglePubSubMessageAdapter().decode_envelope(envelopes[-1])
+        self.assertEqual(len(producto['ProductosKit']), 2)
+        self.assertTrue(producto['UrlFoto'].startswith('http://localhost:1/img/'))
+        self.assertTrue(envelopes[-1]['message']['messageId'])
+
+    def test_replay_processor(self):
+        """Test: La reproducción directa crea los clientes y mide cada mensaje"""
+        factory = EnvelopeFactory(prefix='HRN')
+        report = self.harness.replay_processor(factory.clientes(3))
+
+        data = report.as_dict()
+        self.assertEqual(data['messages'], 3)
+        self.assertEqual(data['errors'], 0)
+        self.assertGreater(data['queries_per_message'], 0)
+        self.assertEqual(self.env['res.partner'].search_count([
+            ('cliente_externo', 'like', 'HRNC%'), ('parent_id', '=', False),
+        ]), 3)
+
+    def test_replay_controller(self):
+        """Test: La reproducción por el endpoint aplica los productos"""
+        factory = EnvelopeFactory(prefix='HRT')
+        report = self.harness.replay_controller(factory.productos(2), rate=1000)
+
+        self.assertEqual(report.messages, 2)
+        self.assertEqual(report.errors, 0)
+        self.assertEqual(self.env['product.template'].search_count([
+            ('producto_externo', 'like', 'HRTP%'),
+        ]), 2)
+
+    def test_image_server(self):
+        """Test: El servidor local sirve la imagen y responde 304 con su ETag"""
+        with ImageStubServer() as images:
+            with urllib.request.urlopen(f'{images.base_url}/img/x.png') as response:
+                self.assertEqual(response.read(), images.content)
+                etag = response.headers['ETag']
+            request = urllib.request.Request(f'{images.base_url}/img/x.png', headers={'If-None-Match': etag})
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(request)
+            self.assertEqual(error.exception.code, 304)
+            self.assertEqual(images.requests, 2)
+
+    def test_percentile(self):
+        """Test: Percentil por rango más cercano"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_query_budget_requires_baseline(self):
+        """Test: Sin línea base registrada el presupuesto falla (salvo al registrarla)"""
+        budgets = {
+            'sin_linea_base': {'queries': None, 'per_item': 0},
+            'con_linea_base': {'queries': 10, 'per_item': 0},
+        }
+        with patch.dict(baselines.QUERY_BASELINES, budgets), \
+                patch.dict('os.environ', {'NESTO_SYNC_BENCHMARK_UPDATE': '0'}):
+            with self.assertRaises(QueryBudgetExceeded):
+                QueryBudget('sin_linea_base').check(10, 10)
+
+            QueryBudget('con_linea_base').check(10 + baselines.TOLERANCE, 10 + baselines.TOLERANCE)
+            with self.assertRaises(QueryBudgetExceeded):
+                QueryBudget('con_linea_base').check(11 + baselines.TOLERANCE, 11 + baselines.TOLERANCE)
+
+            self.addCleanup(QueryBudget.measured.pop, 'sin_linea_base', None)
+            with patch.dict('os.environ', {'NESTO_SYNC_BENCHMARK_UPDATE': '1'}):
+                QueryBudget('sin_linea_base').check(10, 10)
+            self.assertEqual(QueryBudget.measured['sin_linea_base'], 10)
+
+
+@tagged('post_install', '-at_install', 'nesto_sync_benchmark')
+class BenchmarkIngest(TransactionCase):
+    """Carga de clientes y productos (con kits e imágenes) sin Google Pub/Sub"""
+
+    CLIENTES = 200
+    PRODUCTOS = 200
+
+    def setUp(self):
+        super().setUp()
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.publish_mode', 'outbox')
+        self.harness = IngestHarness(self.env)
+
+    def test_benchmark_controller(self):
+        """Benchmark: endpoint /nesto_sync con clientes y productos con kit e imagen"""
+        with ImageStubServer() as images:
+            factory = EnvelopeFactory(seed=1, contacts_per_client=3, kit_size=3,
+                                      image_base_url=images.base_url, prefix='BCTL')
+            clientes = self.harness.replay_controller(factory.clientes(self.CLIENTES), name='controller/clientes')
+            productos = self.harness.replay_controller(factory.productos(self.PRODUCTOS), name='controller/productos')
+            imagenes = self.harness.run_image_fetcher()
+
+        for report in (clientes, productos, imagenes):
+            _logger.info(report.format())
+        self.assertEqual(clientes.errors, 0)
+        self.assertEqual(productos.errors, 0)
+
+    def test_benchmark_processor(self):
+        """Benchmark: processor/service directos (sin capa HTTP)"""
+        factory = EnvelopeFactory(seed=2, contacts_per_client=3, kit_size=3, prefix='BPRC')
+        clientes = self.harness.replay_processor(factory.clientes(self.CLIENTES), name='processor/clientes')
+        productos = self.harness.replay_processor(factory.productos(self.PRODUCTOS), name='processor/productos')
+
+        for report in (clientes, productos):
+            _logger.info(report.format())
+        self.assertEqual(clientes.errors, 0)
+        self.assertEqual(productos.errors, 0)
@@ -6,12 +6,20 @@ Valida que:
 2. El sistema anti-bucle funciona sin flags de origen
 3. El batch processing funciona correctamente
 4. El contexto skip_sync funciona
+5. Los valores originales se capturan con una sola lectura (y su coste)
+6. El índice modelo → configuración de sincronización
 """
 
+import base64
 import json
+import logging
+import time
 from unittest.mock import Mock, patch, MagicMock
 from odoo.tests.common import TransactionCase
 from odoo.tests import tagged
+from nesto_sync.core.sync_index import SyncConfigIndex
+
+_logger = logging.getLogger(__name__)
 
 
 @tagged('post_install', '-at_install', 'nesto_sync')
@@ -21,6 +29,9 @@ class TestBidirectionalSync(TransactionCase):
     def setUp(self):
         super().setUp()
 
+        # Estos tests comprueban la publicación inmediata (el outbox se prueba en test_outbox.py)
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.publish_mode', 'sync')
+
         # Crear partner de prueba
         self.partner = self.env['res.partner'].create({
             'name': 'Test Cliente',
@@ -137,6 +148,9 @@ class TestAntiBucle(TransactionCase):
     def setUp(self):
         super().setUp()
 
+        # Estos tests comprueban la publicación inmediata (el outbox se prueba en test_outbox.py)
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.publish_mode', 'sync')
+
         self.ResPartner = self.env['res.partner']
 
         # Crear partner inicial
@@ -284,3 +298,167 @@ class TestAntiBucle(TransactionCase):
 
         # Assert
         mock_create.assert_not_called()
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestWriteSnapshot(TransactionCase):
+    """Tests de la captura de valores originales en write()"""
+
+    def setUp(self):
+        super().setUp()
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.publish_mode', 'sync')
+        self.partner = self.env['res.partner'].create({
+            'name': 'Cliente Snapshot',
+            'cliente_externo': 'SNP001',
+            'contacto_externo': '0',
+            'mobile': '666111111',
+            'is_company': True,
+        })
+
+    def test_snapshot_returns_plain_values(self):
+        """Test: El snapshot devuelve valores planos (Many2one como ID)"""
+        country = self.env.ref('base.es')
+        self.partner.with_context(skip_sync=True).write({'country_id': country.id})
+
+        snapshot = self.partner._snapshot_original_values({
+            'mobile': '666222222',
+            'country_id': False,
+            'write_date': False,
+        })
+
+        self.assertEqual(snapshot, {
+            self.partner.id: {'mobile': '666111111', 'country_id': country.id},
+        })
+
+    def test_binary_fields_compared_by_checksum(self):
+        """Test: Los binarios se comparan por checksum, sin leer el contenido"""
+        image = base64.b64encode(b'imagen de prueba')
+        self.partner.with_context(skip_sync=True).write({'image_1920': image})
+
+        snapshot = self.partner._snapshot_original_values({'image_1920': image})
+        checksum = self.partner._binary_checksum(image)
+
+        self.assertEqual(snapshot[self.partner.id]['image_1920'], checksum)
+        self.assertEqual(self.partner._comparable_vals({'image_1920': image}), {'image_1920': checksum})
+
+    def test_unchanged_values_not_published(self):
+        """Test: Un write con los mismos valores no publica"""
+        with patch('nesto_sync.infrastructure.publisher_factory.PublisherFactory.create_publisher') as mock_create:
+            mock_create.return_value = Mock()
+            self.partner.write({'mobile': '666111111'})
+
+        mock_create.return_value.publish_event.assert_not_called()
+
+    def test_skip_sync_does_not_snapshot(self):
+        """Test: Con skip_sync no se leen los valores originales"""
+        with patch.object(type(self.partner), '_snapshot_original_values') as mock_snapshot:
+            self.partner.with_context(skip_sync=True).write({'mobile': '666333333'})
+
+        mock_snapshot.assert_not_called()
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestSyncConfigIndex(TransactionCase):
+    """Tests del índice modelo → configuración de sincronización"""
+
+    def tearDown(self):
+        SyncConfigIndex.clear()
+        super().tearDown()
+
+    def test_index_resolves_partner_config(self):
+        """Test: res.partner resuelve cliente con sus campos requeridos y jerarquía"""
+        sync_config = SyncConfigIndex.for_model('res.partner')
+
+        self.assertEqual(sync_config.entity_type, 'cliente')
+        self.assertEqual(sync_config.required_id_fields, ('cliente_externo', 'contacto_externo'))
+        self.assertTrue(sync_config.hierarchical)
+        self.assertEqual(sync_config.parent_field, 'parent_id')
+        self.assertEqual(sync_config.plan.entity_type, 'cliente')
+        self.assertEqual(self.env['res.partner']._get_entity_type_for_sync(), 'cliente')
+
+    def test_index_skips_models_without_bidirectional(self):
+        """Test: Solo se indexan entidades con bidirectional=True; gana la primera"""
+        SyncConfigIndex.build({
+            'uno': {'odoo_model': 'res.partner', 'bidirectional': True, 'id_fields': ['ref']},
+            'dos': {'odoo_model': 'res.partner', 'bidirectional': True},
+            'tres': {'odoo_model': 'product.template', 'bidirectional': False},
+        })
+
+        self.assertEqual(SyncConfigIndex.for_model('res.partner').entity_type, 'uno')
+        self.assertEqual(SyncConfigIndex.for_model('res.partner').required_id_fields, ('ref',))
+        self.assertIsNone(SyncConfigIndex.for_model('product.template'))
+        self.assertIsNone(self.env['product.template']._get_entity_type_for_sync())
+
+
+@tagged('post_install', '-at_install', 'nesto_sync_benchmark')
+class BenchmarkWriteSnapshot(TransactionCase):
+    """
+    Coste del snapshot previo al write en escrituras masivas
+
+    No se ejecuta con el resto de tests: --test-tags nesto_sync_benchmark
+    """
+
+    RECORDS = 500
+    FIELDS = ('mobile', 'street', 'city', 'country_id', 'user_id')
+
+    def setUp(self):
+        super().setUp()
+        self.partners = self.env['res.partner'].with_context(skip_sync=True).create([{
+            'name': f'Cliente Benchmark {index}',
+            'cliente_externo': f'BEN{index:04d}',
+            'contacto_externo': '0',
+            'is_company': True,
+        } for index in range(self.RECORDS)])
+        self.vals = {
+            'mobile': '666000000',
+            'street': 'Calle Benchmark',
+            'city': 'Madrid',
+            'country_id': self.env.ref('base.es').id,
+            'user_id': self.env.user.id,
+        }
+
+    def _measure(self, function):
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        function()
+        return time.perf_counter() - start, self.env.cr.sql_log_count - queries
+
+    def _getattr_snapshot(self):
+        """Captura registro a registro con getattr (implementación anterior)"""
+        original_values = {}
+        for record in self.partners:
+            original_values[record.id] = {}
+            for field in self.vals:
+                old_value = getattr(record, field, None)
+                if hasattr(old_value, 'id'):
+                    old_value = old_value.id
+                original_values[record.id][field] = old_value
+        return original_values
+
+    def test_benchmark_snapshot(self):
+        """Benchmark: snapshot con read() frente a getattr por registro"""
+        read_time, read_queries = self._measure(lambda: self.partners._snapshot_original_values(self.vals))
+        getattr_time, getattr_queries = self._measure(self._getattr_snapshot)
+
+        _logger.info(
+            f"Snapshot de {self.RECORDS} registros x {len(self.vals)} campos: "
+            f"read() {read_time * 1000:.1f} ms / {read_queries} consultas, "
+            f"getattr {getattr_time * 1000:.1f} ms / {getattr_queries} consultas"
+        )
+        self.assertEqual(self.partners._snapshot_original_values(self.vals), self._getattr_snapshot())
+        self.assertLessEqual(read_queries, getattr_queries)
+
+    def test_benchmark_mass_write(self):
+        """Benchmark: coste del hook previo en un write masivo"""
+        with patch('nesto_sync.infrastructure.publisher_factory.PublisherFactory.create_publisher'):
+            hook_time, hook_queries = self._measure(lambda: self.partners.write(self.vals))
+        plain_time, plain_queries = self._measure(
+            lambda: self.partners.with_context(skip_sync=True).write({'city': 'Barcelona'})
+        )
+
+        _logger.info(
+            f"write() de {self.RECORDS} registros: con sincronización {hook_time * 1000:.1f} ms "
+            f"/ {hook_queries} consultas, sin sincronización {plain_time * 1000:.1f} ms "
+            f"/ {plain_queries} consultas"
+        )
@@ -356,3 +356,172 @@ class TestGenericEntityServiceBuildDomain(TransactionCase):
         self.assertIn(('cliente_externo', '=', '12345'), domain)
         self.assertIn(('contacto_externo', '=', '1'), domain)
         self.assertIn(('persona_contacto_externa', '=', 'P1'), domain)
+
+
+class TestGenericEntityServiceSnapshot(TransactionCase):
+    """Tests para la detección de cambios sobre un único search_read (parent + children)"""
+
+    def setUp(self):
+        super().setUp()
+
+        self.entity_config = {
+            'odoo_model': 'res.partner',
+            'message_type': 'cliente',
+            'id_fields': ['cliente_externo', 'contacto_externo', 'persona_contacto_externa'],
+            'hierarchy': {'enabled': True, 'parent_field': 'parent_id'},
+        }
+
+        self.service = GenericEntityService(self.env, self.entity_config, test_mode=True)
+
+    def _processed_data(self, child_names):
+        return {
+            'parent': {
+                'name': 'Cliente Snapshot',
+                'cliente_externo': '77777',
+                'contacto_externo': '0',
+                'persona_contacto_externa': None,
+            },
+            'children': [
+                {
+                    'name': name,
+                    'cliente_externo': '77777',
+                    'contacto_externo': '0',
+                    'persona_contacto_externa': str(index),
+                }
+                for index, name in enumerate(child_names, start=1)
+            ],
+        }
+
+    def test_snapshot_reads_parent_and_children_once(self):
+        """Test: Sin cambios, parent y children se leen con un único search_read"""
+        names = ['Persona 1', 'Persona 2', 'Persona 3']
+        self.service.create_or_update_contact(self._processed_data(names))
+
+        Partner = type(self.env['res.partner'])
+        with patch.object(Partner, 'search_read', autospec=True, side_effect=Partner.search_read) as search_read, \
+                patch.object(Partner, 'write', autospec=True, side_effect=Partner.write) as write:
+            response = self.service.create_or_update_contact(self._processed_data(names))
+
+        self.assertIn('Sin cambios', response.response[0].decode())
+        self.assertEqual(search_read.call_count, 1)
+        write.assert_not_called()
+
+    def test_snapshot_writes_only_changed_child(self):
+        """Test: Solo se escribe el child que cambió"""
+        self.service.create_or_update_contact(self._processed_data(['Persona 1', 'Persona 2']))
+
+        Partner = type(self.env['res.partner'])
+        with patch.object(Partner, 'write', autospec=True, side_effect=Partner.write) as write:
+            response = self.service.create_or_update_contact(
+                self._processed_data(['Persona 1', 'Persona 2 Renombrada'])
+            )
+
+        self.assertIn('Sincronización completada', response.response[0].decode())
+        self.assertEqual(write.call_count, 1)
+        child = self.env['res.partner'].search([
+            ('cliente_externo', '=', '77777'), ('persona_contacto_externa', '=', '2')
+        ])
+        self.assertEqual(child.name, 'Persona 2 Renombrada')
+        self.assertEqual(child.parent_id.cliente_externo, '77777')
+
+    def test_new_children_created_in_one_create(self):
+        """Test: Los children nuevos se crean con un único create(vals_list)"""
+        self.service.create_or_update_contact(self._processed_data([]))
+
+        Partner = type(self.env['res.partner'])
+        with patch.object(Partner, 'create', autospec=True, side_effect=Partner.create) as create:
+            self.service.create_or_update_contact(
+                self._processed_data(['Persona 1', 'Persona 2', 'Persona 3'])
+            )
+
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(len(create.call_args[0][1]), 3)
+        children = self.env['res.partner'].search([
+            ('cliente_externo', '=', '77777'), ('persona_contacto_externa', '!=', False)
+        ])
+        self.assertEqual(len(children), 3)
+        self.assertEqual(len(children.parent_id), 1)
+
+    def test_snapshot_matches_empty_string_ids(self):
+        """Test: Un registro guardado con persona_contacto_externa = '' se actualiza, no se duplica"""
+        Partner = self.env['res.partner'].with_context(skip_sync=True)
+        parent = Partner.create({
+            'name': 'Cliente Vacío',
+            'cliente_externo': '77777',
+            'contacto_externo': '0',
+            'persona_contacto_externa': '',
+        })
+        self.assertEqual(parent.persona_contacto_externa, '')
+
+        data = self._processed_data([])
+        data['parent']['name'] = 'Cliente Vacío Renombrado'
+        response = self.service.create_or_update_contact(data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(parent.name, 'Cliente Vacío Renombrado')
+        self.assertEqual(self.env['res.partner'].search_count([('cliente_externo', '=', '77777')]), 1)
+
+    def test_unique_combination_checked_for_whole_batch(self):
+        """Test: La combinación repetida en un lote viola el índice único y se traduce"""
+        from odoo.exceptions import ValidationError
+
+        with self.assertRaises(ValidationError):
+            self.env['res.partner'].create([
+                {'name': 'Duplicado A', 'cliente_externo': '88888', 'contacto_externo': '0',
+                 'persona_contacto_externa': '1'},
+                {'name': 'Duplicado B', 'cliente_externo': '88888', 'contacto_externo': '0',
+                 'persona_contacto_externa': '1'},
+            ])
+
+    def test_duplicate_producto_externo_translated(self):
+        """Test: El índice único de producto_externo se traduce a ValidationError legible"""
+        from odoo.exceptions import ValidationError
+
+        Product = self.env['product.template'].with_context(skip_sync=True)
+        Product.create({'name': 'Producto A', 'producto_externo': 'PX-UNICO'})
+        other = Product.create({'name': 'Producto B', 'producto_externo': 'PX-OTRO'})
+
+        with self.assertRaises(ValidationError) as cm:
+            Product.create({'name': 'Producto C', 'producto_externo': 'PX-UNICO'})
+        self.assertIn('PX-UNICO', str(cm.exception))
+
+        with self.assertRaises(ValidationError):
+            other.write({'producto_externo': 'PX-UNICO'})
+
+        # La transacción sigue siendo utilizable tras el error
+        self.assertEqual(other.name, 'Producto B')
+
+    def test_duplicate_partner_translated(self):
+        """Test: Un partner con la misma combinación de IDs externos lanza el error traducido"""
+        from odoo.exceptions import ValidationError
+
+        Partner = self.env['res.partner'].with_context(skip_sync=True)
+        Partner.create({'name': 'Cliente A', 'cliente_externo': '99990', 'contacto_externo': '0'})
+
+        with self.assertRaises(ValidationError) as cm:
+            Partner.create({'name': 'Cliente B', 'cliente_externo': '99990', 'contacto_externo': '0'})
+        self.assertIn('Cliente Externo', str(cm.exception))
+
+        # Sin Contacto Externo: dos filas con el mismo Cliente Externo también chocan
+        Partner.create({'name': 'Sin contacto A', 'cliente_externo': '99991'})
+        with self.assertRaises(ValidationError):
+            Partner.create({'name': 'Sin contacto B', 'cliente_externo': '99991'})
+        with self.assertRaises(ValidationError):
+            Partner.create({'name': 'Sin contacto C', 'cliente_externo': '99991', 'contacto_externo': ''})
+
+        # Sin ID externo ('' o NULL) no hay unicidad, igual que en productos
+        Partner.create([{'name': 'Sin ID 1', 'cliente_externo': ''}, {'name': 'Sin ID 2', 'cliente_externo': ''}])
+
+    def test_unique_index_with_duplicates_fails_upgrade(self):
+        """Test: Si ya hay duplicados, crear el índice falla listando las claves duplicadas"""
+        from odoo.exceptions import UserError
+        from ..models.unique_index import create_external_id_index
+
+        self.env.cr.execute("CREATE TEMP TABLE nesto_sync_test_dup (externo varchar)")
+        self.env.cr.execute("INSERT INTO nesto_sync_test_dup VALUES ('D1'), ('D1'), ('D2'), (''), ('')")
+
+        with self.assertRaises(UserError) as cm:
+            create_external_id_index(self.env.cr, 'nesto_sync_test_dup_uniq', 'nesto_sync_test_dup', ['externo'])
+
+        self.assertIn('(D1): 2 registros', str(cm.exception))
+        self.assertNotIn('D2', str(cm.exception))
@@ -2,7 +2,8 @@
 import json
 import base64
 from odoo.tests import common, tagged
-from ..models.google_pubsub_message_adapter import GooglePubSubMessageAdapter
+from ..models.google_pubsub_message_adapter import GooglePubSubMessageAdapter, PubSubEnvelope
+from ..infrastructure import json_codec
 import unittest
 
 @tagged('post_install', '-at_install', 'nesto_sync')
@@ -43,4 +44,55 @@ class TestGooglePubSubMessageAdapter(common.TransactionCase):
         }).encode("utf-8")  # Simula la entrada en bytes
 
         decoded_message = self.adapter.decode_message(raw_message)
-        self.assertEqual(decoded_message, payload)
\ No newline at end of file
+        self.assertEqual(decoded_message, payload)
+
+    def test_parse_typed_envelope(self):
+        """Debe devolver messageId, atributos, publishTime y payload de un solo parseo."""
+        payload = {"Tabla": "Clientes", "Nombre": "Ñandú"}
+        raw_message = json.dumps({
+            "message": {
+                "data": base64.b64encode(json.dumps(payload).encode("utf-8")).decode("utf-8"),
+                "messageId": "123",
+                "attributes": {"origen": "nesto"},
+                "publishTime": "2024-01-01T00:00:00Z",
+                "orderingKey": "cliente-1",
+            },
+            "subscription": "projects/p/subscriptions/s",
+        }).encode("utf-8")
+
+        envelope = self.adapter.parse(raw_message)
+
+        self.assertIsInstance(envelope, PubSubEnvelope)
+        self.assertEqual(envelope.message_id, "123")
+        self.assertEqual(envelope.attributes, {"origen": "nesto"})
+        self.assertEqual(envelope.publish_time, "2024-01-01T00:00:00Z")
+        self.assertEqual(envelope.ordering_key, "cliente-1")
+        self.assertEqual(envelope.subscription, "projects/p/subscriptions/s")
+        self.assertEqual(envelope.data, payload)
+
+    def test_parse_without_optional_fields(self):
+        """Los campos opcionales del envelope quedan vacíos."""
+        encoded_data = base64.b64encode(b'{"key": "value"}').decode("utf-8")
+        envelope = self.adapter.parse_envelope({"message": {"data": encoded_data}})
+
+        self.assertIsNone(envelope.message_id)
+        self.assertEqual(envelope.attributes, {})
+        self.assertIsNone(envelope.ordering_key)
+        self.assertEqual(envelope.data, {"key": "value"})
+
+    def test_parse_invalid_json(self):
+        """JSON inválido (envelope o payload) debe lanzar ValueError con cualquier backend."""
+        with self.assertRaises(ValueError):
+            self.adapter.parse(b"Invalid data")
+
+        encoded_data = base64.b64encode(b"{no es json").decode("utf-8")
+        with self.assertRaises(ValueError):
+            self.adapter.parse_envelope({"message": {"data": encoded_data}})
+
+    def test_json_codec_accepts_str_and_bytes(self):
+        """El codec decodifica igual str y bytes UTF-8."""
+        document = '{"Nombre": "Ñandú", "Precio": 1.5, "Kit": [1, 2]}'
+
+        self.assertEqual(json_codec.loads(document), json.loads(document))
+        self.assertEqual(json_codec.loads(document.encode("utf-8")), json.loads(document))
+        self.assertIn(json_codec.BACKEND, ('orjson', 'ujson', 'json'))
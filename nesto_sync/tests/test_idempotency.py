@@ -0,0 +1,256 @@
+"""
+Tests para el descarte de mensajes de Nesto ya aplicados (idempotencia)
+
+Valida que:
+1. Una reentrega del mismo messageId se confirma sin procesar
+2. Un reenvío idéntico (otro messageId, mismo payload) se confirma sin procesar
+3. Un payload distinto o una edición en Odoo entre medias sí se procesan
+4. Los mensajes fallidos no quedan como aplicados
+5. La clave del mensaje coincide con la del registro de Odoo
+6. Un mensaje publicado antes que el último aplicado de su clave se descarta
+"""
+
+import json
+from datetime import datetime
+from unittest.mock import patch
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+
+from ..benchmarks import EnvelopeFactory
+from ..config.entity_configs import ENTITY_CONFIGS
+from ..core.batch_processor import BatchMessageProcessor
+from ..core.entity_registry import EntityRegistry
+from ..core.idempotency import (
+    MESSAGE, PAYLOAD, STALE, entity_key, parse_publish_time, record_key, idempotency_cache,
+)
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestIdempotency(TransactionCase):
+    """Tests de nesto.sync.idempotency en el procesamiento de mensajes"""
+
+    def setUp(self):
+        super().setUp()
+        idempotency_cache.clear()
+        self.addCleanup(idempotency_cache.clear)
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.idempotency_ttl_hours', '24')
+        self.processor = BatchMessageProcessor(self.env, test_mode=True)
+        self.Idempotency = self.env['nesto.sync.idempotency']
+        self.factory = EnvelopeFactory()
+
+    def _producto(self, nombre='Producto idempotente'):
+        return {'Tabla': 'Productos', 'Producto': 'IDEM001', 'Nombre': nombre}
+
+    def _process(self, data, message_id, publish_time=None):
+        return self.processor.process_batch([self.factory.envelope(data, message_id, publish_time)])[0]
+
+    def test_redelivered_message_id_skipped(self):
+        """Test: La reentrega del mismo messageId no se procesa"""
+        first = self._process(self._producto(), 'idem-1')
+        self.assertTrue(first['ack'])
+        self.assertNotEqual(first['message'], 'Mensaje duplicado')
+
+        with patch.object(EntityRegistry, 'get_processor') as get_processor:
+            second = self._process(self._producto(), 'idem-1')
+
+        self.assertTrue(second['ack'])
+        self.assertEqual(second['message'], 'Mensaje duplicado')
+        get_processor.assert_not_called()
+        self.assertEqual(idempotency_cache.get_counters()['skipped_message'], 1)
+
+    def test_identical_payload_skipped(self):
+        """Test: El mismo contenido con otro messageId no se procesa"""
+        self._process(self._producto(), 'idem-2')
+        result = self._process(self._producto(), 'idem-3')
+
+        self.assertEqual(result['message'], 'Mensaje duplicado')
+        self.assertEqual(idempotency_cache.get_counters()['skipped_payload'], 1)
+
+    def test_changed_payload_processed(self):
+        """Test: Un payload distinto para la misma clave se procesa"""
+        self._process(self._producto(), 'idem-4')
+        result = self._process(self._producto('Nombre nuevo'), 'idem-5')
+
+        self.assertNotEqual(result['message'], 'Mensaje duplicado')
+        product = self.env['product.template'].search([('producto_externo', '=', 'IDEM001')])
+        self.assertEqual(product.name, 'Nombre nuevo')
+
+    def test_odoo_edit_invalidates_payload(self):
+        """Test: Tras editar el registro en Odoo, un reenvío idéntico se vuelve a aplicar"""
+        self._process(self._producto(), 'idem-6')
+        product = self.env['product.template'].search([('producto_externo', '=', 'IDEM001')])
+        product.write({'name': 'Editado en Odoo'})
+
+        result = self._process(self._producto(), 'idem-7')
+
+        self.assertNotEqual(result['message'], 'Mensaje duplicado')
+        self.assertEqual(product.name, 'Producto idempotente')
+
+    def test_nesto_and_unsynced_writes_keep_payload(self):
+        """Test: Los writes con skip_sync y los de campos no sincronizados no invalidan el payload"""
+        self._process(self._producto(), 'idem-22')
+        product = self.env['product.template'].search([('producto_externo', '=', 'IDEM001')])
+        product.with_context(skip_sync=True).write({'name': 'Escrito por la sincronización'})
+        product.write({'sequence': 7})
+
+        self.Idempotency.invalidate_model()
+        self.assertTrue(self.Idempotency.search([('kind', '=', PAYLOAD)]).payload_hash)
+
+    def test_unlink_invalidates_payload(self):
+        """Test: Un reenvío idéntico recrea un registro borrado en Odoo"""
+        self._process(self._producto(), 'idem-8')
+        self.env['product.template'].search([('producto_externo', '=', 'IDEM001')]).unlink()
+
+        self._process(self._producto(), 'idem-9')
+
+        self.assertTrue(self.env['product.template'].search([('producto_externo', '=', 'IDEM001')]))
+
+    def test_failed_message_not_remembered(self):
+        """Test: Un mensaje que falla se sigue reintentando"""
+        with patch.object(EntityRegistry, 'get_processor', side_effect=ValueError('Error de prueba')):
+            failed = self._process(self._producto(), 'idem-10')
+        self.assertFalse(failed['ack'])
+
+        retried = self._process(self._producto(), 'idem-10')
+        self.assertTrue(retried['ack'])
+        self.assertNotEqual(retried['message'], 'Mensaje duplicado')
+
+    def test_disabled_with_zero_ttl(self):
+        """Test: nesto_sync.idempotency_ttl_hours=0 desactiva el descarte"""
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.idempotency_ttl_hours', '0')
+        self._process(self._producto(), 'idem-11')
+        result = self._process(self._producto(), 'idem-11')
+
+        self.assertNotEqual(result['message'], 'Mensaje duplicado')
+        self.assertFalse(self.Idempotency.search([]))
+
+    def test_process_cache_skips_without_queries(self):
+        """Test: Un messageId de la LRU del proceso se descarta sin consultas"""
+        idempotency_cache.add(self.env.cr.dbname, 'idem-lru', 3600)
+        queries = self.env.cr.sql_log_count
+
+        check = self.Idempotency.check('idem-lru', 'producto', ENTITY_CONFIGS['producto'], self._producto())
+
+        self.assertEqual(check.duplicate, MESSAGE)
+        self.assertEqual(self.env.cr.sql_log_count, queries)
+
+    def test_message_key_matches_record_key(self):
+        """Test: La clave del mensaje de cliente coincide con la del registro de Odoo"""
+        config = ENTITY_CONFIGS['cliente']
+        parent = self.env['res.partner'].with_context(skip_sync=True).create({
+            'name': 'Cliente idempotente',
+            'cliente_externo': 'IDEM01',
+            'contacto_externo': '0',
+        })
+
+        self.assertEqual(entity_key(config, {'Cliente': 'IDEM01 ', 'Contacto': '0'}), record_key(config, parent))
+        self.assertEqual(entity_key(config, {}), '')
+
+    def test_child_edit_invalidates_parent_payload(self):
+        """Test: Editar una persona de contacto invalida el mensaje de su cliente"""
+        Partner = self.env['res.partner'].with_context(skip_sync=True)
+        parent = Partner.create({'name': 'Cliente', 'cliente_externo': 'IDEM02', 'contacto_externo': '0'})
+        child = Partner.create({
+            'name': 'Persona', 'parent_id': parent.id, 'cliente_externo': 'IDEM02',
+            'contacto_externo': '0', 'persona_contacto_externa': '1',
+        })
+        data = {'Cliente': 'IDEM02', 'Contacto': '0', 'Nombre': 'Cliente'}
+        check = self.Idempotency.check(None, 'cliente', ENTITY_CONFIGS['cliente'], data)
+        self.Idempotency.remember(check)
+        self.assertEqual(self.Idempotency.search([('kind', '=', PAYLOAD)]).key, 'cliente:IDEM02|0|')
+
+        child.with_context(skip_sync=False).write({'email': 'persona@example.com'})
+
+        self.Idempotency.invalidate_model()
+        self.assertFalse(self.Idempotency.search([('kind', '=', PAYLOAD)]).payload_hash)
+
+    def test_stale_message_skipped(self):
+        """Test: Un mensaje publicado antes que el último aplicado de su clave se descarta"""
+        self._process(self._producto('Versión nueva'), 'idem-13', '2024-01-15T10:30:00.500000001Z')
+
+        with patch.object(EntityRegistry, 'get_processor') as get_processor:
+            result = self._process(self._producto('Versión antigua'), 'idem-14', '2024-01-15T10:30:00.2Z')
+
+        self.assertTrue(result['ack'])
+        self.assertEqual(result['message'], 'Mensaje obsoleto')
+        get_processor.assert_not_called()
+        self.assertEqual(idempotency_cache.get_counters()['skipped_stale'], 1)
+        product = self.env['product.template'].search([('producto_externo', '=', 'IDEM001')])
+        self.assertEqual(product.name, 'Versión nueva')
+
+    def test_newer_message_applied_and_version_kept(self):
+        """Test: Un mensaje posterior se aplica; el publishTime guardado nunca retrocede"""
+        self._process(self._producto('Primera'), 'idem-15', '2024-01-15T10:30:00Z')
+        result = self._process(self._producto('Segunda'), 'idem-16', '2024-01-15T10:31:00Z')
+        self.assertNotEqual(result['message'], 'Mensaje obsoleto')
+
+        # Un mensaje sin publishTime (p.ej. reprocesado) se aplica sin mover la versión
+        self._process(self._producto('Sin publishTime'), 'idem-17')
+
+        row = self.Idempotency.search([('kind', '=', PAYLOAD)])
+        self.assertEqual(row.published_at, datetime(2024, 1, 15, 10, 31))
+        stale = self.Idempotency.check(
+            None, 'producto', ENTITY_CONFIGS['producto'], self._producto('Otra'),
+            publish_time='2024-01-15T10:30:30Z'
+        )
+        self.assertEqual(stale.duplicate, STALE)
+
+    def test_odoo_edit_keeps_version(self):
+        """Test: Tras una edición en Odoo los mensajes obsoletos se siguen descartando"""
+        self._process(self._producto(), 'idem-18', '2024-01-15T10:30:00Z')
+        product = self.env['product.template'].search([('producto_externo', '=', 'IDEM001')])
+        product.write({'name': 'Editado en Odoo'})
+
+        result = self._process(self._producto(), 'idem-19', '2024-01-15T10:29:00Z')
+
+        self.assertEqual(result['message'], 'Mensaje obsoleto')
+        self.assertEqual(product.name, 'Editado en Odoo')
+
+    def test_push_remembers_before_commit(self):
+        """Test: En /nesto_sync remember() va antes del único commit (un check() de otro worker ya ve el mensaje)"""
+        from ..controllers.controllers import NestoSyncController
+
+        envelope = self.factory.envelope(self._producto('Versión nueva'), 'idem-20', '2024-01-15T10:31:00Z')
+        seen_at_commit = []
+
+        def on_commit():
+            # Lo que vería otro worker con un mensaje anterior al liberarse el bloqueo de la clave
+            seen_at_commit.append(self.Idempotency.check(
+                'idem-21', 'producto', ENTITY_CONFIGS['producto'], self._producto('Versión antigua'),
+                publish_time='2024-01-15T10:30:00Z'
+            ).duplicate)
+
+        with patch('nesto_sync.controllers.controllers.request') as mock_request, \
+                patch.object(self.env.cr, 'commit', side_effect=on_commit) as commit:
+            mock_request.httprequest.data = json.dumps(envelope).encode('utf-8')
+            mock_request.env = self.env
+            response = NestoSyncController().sync_nesto()
+
+        self.assertEqual(response.status_code, 200)
+        commit.assert_called_once()
+        self.assertEqual(seen_at_commit, [STALE])
+
+    def test_parse_publish_time(self):
+        """Test: publishTime de push (nanosegundos, Z) y de pull (isoformat con zona)"""
+        self.assertEqual(
+            parse_publish_time('2024-01-15T10:30:00.123456789Z'),
+            datetime(2024, 1, 15, 10, 30, 0, 123456)
+        )
+        self.assertEqual(
+            parse_publish_time('2024-01-15T11:30:00.5+01:00'),
+            datetime(2024, 1, 15, 10, 30, 0, 500000)
+        )
+        self.assertIsNone(parse_publish_time(None))
+        self.assertIsNone(parse_publish_time('no es una fecha'))
+
+    def test_cleanup_and_stats(self):
+        """Test: Las filas caducadas se borran y las estadísticas cuentan las vigentes"""
+        self._process(self._producto(), 'idem-12')
+        self.assertEqual(self.Idempotency.get_stats()['messages'], 1)
+        self.assertEqual(self.Idempotency.get_stats()['payloads'], 1)
+
+        self.env.cr.execute(
+            "UPDATE nesto_sync_idempotency SET expires_at = now() at time zone 'UTC' - interval '1 hour'"
+        )
+        self.assertEqual(self.Idempotency.cleanup_expired(), 2)
+        self.assertEqual(self.Idempotency.get_stats()['messages'], 0)
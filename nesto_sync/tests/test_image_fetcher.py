@@ -0,0 +1,205 @@
+"""
+Tests para la descarga de imágenes en segundo plano
+
+Valida que:
+1. En modo asíncrono el transformer no descarga y el producto queda pendiente
+2. Solo un cambio de URL deja la imagen pendiente
+3. El fetcher asigna la imagen descargada y gestiona reintentos y errores
+4. La caché en disco permite peticiones condicionales y evita reescribir
+   imágenes con el mismo contenido
+5. Un fallo al revalidar no toca la imagen ni el estado del producto
+6. La caché en disco se recorta borrando las imágenes menos usadas
+"""
+
+import base64
+import os
+import tempfile
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+from PIL import Image
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+from ..infrastructure.image_cache import ImageCache
+from ..infrastructure.image_downloader import ImageDownloader
+from ..transformers.field_transformers import UrlToImageTransformer
+
+URL = 'https://cdn.example.com/producto.jpg'
+
+
+def _png_bytes(color='red'):
+    """Imagen PNG mínima válida"""
+    buffer = BytesIO()
+    Image.new('RGB', (4, 4), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _png_base64(color='red'):
+    return base64.b64encode(_png_bytes(color)).decode('utf-8')
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestImageFetcher(TransactionCase):
+    """Tests del pipeline asíncrono de imágenes"""
+
+    def setUp(self):
+        super().setUp()
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.image_download_mode', 'async')
+        self.Product = self.env['product.template'].with_context(skip_sync=True)
+        self.Fetcher = self.env['nesto.sync.image.fetcher']
+
+    def test_async_transform_does_not_download(self):
+        """Test: En modo asíncrono solo se devuelve la URL"""
+        with patch.object(ImageDownloader, 'fetch') as fetch:
+            result = UrlToImageTransformer().transform(URL, {'env': self.env})
+
+        fetch.assert_not_called()
+        self.assertEqual(result, {'url_imagen_actual': URL})
+
+    def test_url_change_marks_pending(self):
+        """Test: Crear con URL o cambiarla deja la imagen pendiente; repetirla no"""
+        product = self.Product.create({'name': 'Producto imagen', 'url_imagen_actual': URL})
+        self.assertEqual(product.imagen_estado, 'pending')
+
+        product.write({'imagen_estado': 'done'})
+        product.write({'url_imagen_actual': URL})
+        self.assertEqual(product.imagen_estado, 'done', "La misma URL no debe volver a descargarse")
+
+        product.write({'url_imagen_actual': URL + '?v=2'})
+        self.assertEqual(product.imagen_estado, 'pending')
+
+    def test_fetcher_attaches_image(self):
+        """Test: El fetcher asigna image_1920 y marca la imagen como descargada"""
+        product = self.Product.create({'name': 'Producto imagen', 'url_imagen_actual': URL})
+        image = _png_base64()
+
+        with patch.object(ImageDownloader, 'fetch', return_value=ImageDownloader._result(URL, image=image)):
+            processed = self.Fetcher.process_pending()
+
+        self.assertGreaterEqual(processed, 1)
+        self.assertEqual(product.imagen_estado, 'done')
+        self.assertTrue(product.image_1920)
+
+    def test_fetcher_retries_then_errors(self):
+        """Test: Los fallos transitorios se reintentan hasta el máximo de intentos"""
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.image_fetch_max_attempts', '2')
+        product = self.Product.create({'name': 'Producto imagen', 'url_imagen_actual': URL})
+        failure = ImageDownloader._result(URL, error='Timeout', retry=True)
+
+        with patch.object(ImageDownloader, 'fetch', return_value=failure):
+            self.Fetcher.process_pending()
+            self.assertEqual(product.imagen_estado, 'pending')
+            self.assertEqual(product.imagen_intentos, 1)
+
+            self.Fetcher.process_pending()
+            self.assertEqual(product.imagen_estado, 'error')
+
+    def test_fetcher_permanent_failure(self):
+        """Test: Un fallo no transitorio (no es imagen) marca error sin reintentar"""
+        product = self.Product.create({'name': 'Producto imagen', 'url_imagen_actual': URL})
+        failure = ImageDownloader._result(URL, error='Content-Type no es imagen: text/html')
+
+        with patch.object(ImageDownloader, 'fetch', return_value=failure):
+            self.Fetcher.process_pending()
+
+        self.assertEqual(product.imagen_estado, 'error')
+        self.assertFalse(product.image_1920)
+
+    def test_same_hash_skips_image_rewrite(self):
+        """Test: Una descarga con el mismo SHA-256 no reescribe image_1920"""
+        product = self.Product.create({'name': 'Producto imagen'})
+        product.write({'image_1920': _png_base64('red'), 'imagen_sha256': 'hash-rojo'})
+        original = product.image_1920
+
+        product.write({'image_1920': _png_base64('blue'), 'imagen_sha256': 'hash-rojo'})
+
+        self.assertEqual(product.image_1920, original)
+
+    def test_manual_image_clears_hash(self):
+        """Test: Cargar una imagen sin hash invalida el hash anterior"""
+        product = self.Product.create({'name': 'Producto imagen'})
+        product.write({'image_1920': _png_base64('red'), 'imagen_sha256': 'hash-rojo'})
+
+        product.write({'image_1920': _png_base64('blue')})
+
+        self.assertFalse(product.imagen_sha256)
+
+    def test_conditional_request_uses_disk_cache(self):
+        """Test: Un 304 reutiliza la imagen cacheada y detecta que no cambió"""
+        content = _png_bytes()
+        downloader = ImageDownloader(cache=ImageCache(tempfile.mkdtemp()))
+        downloader._session = MagicMock()
+        downloader._session.get.return_value = MagicMock(
+            status_code=200, content=content,
+            headers={'Content-Type': 'image/png', 'ETag': '"v1"'}
+        )
+
+        first = downloader.fetch(URL)
+        self.assertTrue(first['image'])
+        self.assertEqual(first['sha256'], ImageCache.sha256(content))
+
+        downloader._session.get.return_value = MagicMock(status_code=304, headers={})
+        unchanged = downloader.fetch(URL, known_sha256=first['sha256'])
+        self.assertTrue(unchanged['unchanged'])
+        self.assertIsNone(unchanged['image'])
+        self.assertEqual(downloader._session.get.call_args[1]['headers']['If-None-Match'], '"v1"')
+
+        from_cache = downloader.fetch(URL)
+        self.assertEqual(base64.b64decode(from_cache['image']), content)
+
+    def test_fetcher_unchanged_keeps_image(self):
+        """Test: Si el contenido no cambió, el fetcher solo marca la imagen como comprobada"""
+        product = self.Product.create({'name': 'Producto imagen', 'url_imagen_actual': URL})
+        product.write({'imagen_sha256': 'hash-actual'})
+        unchanged = ImageDownloader._result(URL, sha256='hash-actual', unchanged=True)
+
+        with patch.object(ImageDownloader, 'fetch', return_value=unchanged) as fetch:
+            self.Fetcher.process_pending()
+
+        fetch.assert_called_with(URL, 'hash-actual')
+        self.assertEqual(product.imagen_estado, 'done')
+        self.assertTrue(product.imagen_comprobada)
+        self.assertFalse(product.image_1920)
+
+    def test_failed_revalidation_keeps_image(self):
+        """Test: Un fallo de red al revalidar deja la imagen y el estado como estaban"""
+        product = self.Product.create({'name': 'Producto imagen', 'url_imagen_actual': URL})
+        product.write({
+            'image_1920': _png_base64(),
+            'imagen_sha256': 'hash-actual',
+            'imagen_estado': 'done',
+            'imagen_comprobada': False,
+        })
+        image = product.image_1920
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.image_fetch_max_attempts', '1')
+        failure = ImageDownloader._result(URL, error='Timeout', retry=True)
+
+        with patch.object(ImageDownloader, 'fetch', return_value=failure) as fetch:
+            self.Fetcher.process_pending()
+
+        fetch.assert_called_with(URL, 'hash-actual')
+        self.assertEqual(product.imagen_estado, 'done')
+        self.assertEqual(product.imagen_sha256, 'hash-actual')
+        self.assertEqual(product.image_1920, image)
+
+    def test_cache_cleanup_evicts_least_recently_used(self):
+        """Test: cleanup() borra las imágenes menos usadas y sus metadatos hasta el máximo"""
+        cache = ImageCache(tempfile.mkdtemp())
+        contents = {color: _png_bytes(color) for color in ('red', 'green', 'blue')}
+        for age, color in enumerate(('red', 'green', 'blue')):
+            sha256 = cache.store(f'{URL}?{color}', contents[color])
+            # red es la más antigua, blue la más reciente
+            mtime = 1000000 + age
+            os.utime(cache._blob_path(sha256), (mtime, mtime))
+
+        # Usar red la convierte en la más reciente
+        self.assertIsNotNone(cache.get_meta(f'{URL}?red'))
+
+        max_bytes = len(contents['red']) + len(contents['blue'])
+        result = cache.cleanup(max_bytes)
+
+        self.assertEqual(result['removed'], 1)
+        self.assertLessEqual(result['size'], max_bytes)
+        self.assertIsNone(cache.get_meta(f'{URL}?green'))
+        self.assertFalse(os.path.exists(cache._meta_path(f'{URL}?green')))
+        self.assertIsNotNone(cache.get_meta(f'{URL}?red'))
+        self.assertIsNotNone(cache.get_meta(f'{URL}?blue'))
@@ -0,0 +1,99 @@
+"""
+Tests para el publisher local (segmentos NDJSON en disco)
+
+Valida que:
+1. Los eventos se escriben uno por línea con su topic
+2. El fsync se hace por lotes y los segmentos rotan por tamaño
+3. nesto_sync.event_publisher=local recorre el camino Odoo → Nesto sin red
+"""
+
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+
+from nesto_sync.infrastructure.local_file_publisher import LocalFilePublisher
+from nesto_sync.infrastructure.publisher_factory import PublisherFactory
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestLocalFilePublisher(TransactionCase):
+    """Tests del publisher local"""
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+
+    def test_events_appended_as_ndjson(self):
+        """Test: Cada evento es una línea con topic y mensaje"""
+        publisher = LocalFilePublisher(self.root)
+        publisher.publish_event('sincronizacion-tablas', {'Cliente': '1', 'Nombre': 'Ñandú'})
+        publisher.publish_event('otro-topic', '{"Producto": "2"}')
+        publisher.close()
+
+        events = LocalFilePublisher.read_events(self.root)
+        self.assertEqual([event['topic'] for event in events], ['sincronizacion-tablas', 'otro-topic'])
+        self.assertEqual(events[0]['message'], {'Cliente': '1', 'Nombre': 'Ñandú'})
+        self.assertEqual(LocalFilePublisher.read_events(self.root, topic='otro-topic')[0]['message'],
+                         {'Producto': '2'})
+
+    def test_ordering_key_recorded(self):
+        """Test: La ordering key se guarda en el evento"""
+        publisher = LocalFilePublisher(self.root)
+        publisher.publish_event('sincronizacion-tablas', {'Cliente': '1'}, ordering_key='cliente:1')
+        publisher.publish_event('sincronizacion-tablas', {'Cliente': '2'})
+        publisher.close()
+
+        events = LocalFilePublisher.read_events(self.root)
+        self.assertEqual(events[0]['ordering_key'], 'cliente:1')
+        self.assertNotIn('ordering_key', events[1])
+
+    def test_fsync_batched(self):
+        """Test: Un fsync cada fsync_every eventos, no uno por evento"""
+        publisher = LocalFilePublisher(self.root, fsync_every=10, fsync_interval=3600)
+        with patch('nesto_sync.infrastructure.local_file_publisher.os.fsync') as mock_fsync:
+            for index in range(25):
+                publisher.publish_event('topic', {'n': index})
+            self.assertEqual(mock_fsync.call_count, 2)
+
+            publisher.close()
+            self.assertEqual(mock_fsync.call_count, 3)
+
+    def test_segments_rotate_by_size(self):
+        """Test: Al superar max_segment_bytes se abre otro segmento"""
+        publisher = LocalFilePublisher(self.root, max_segment_bytes=300)
+        for index in range(10):
+            publisher.publish_event('topic', {'n': index, 'relleno': 'x' * 50})
+        publisher.close()
+
+        segments = sorted(os.listdir(self.root))
+        self.assertGreater(len(segments), 1)
+        self.assertEqual([event['message']['n'] for event in LocalFilePublisher.read_events(self.root)],
+                         list(range(10)))
+
+    def test_bidirectional_path_without_network(self):
+        """Test: Con event_publisher=local, un write publica en el log local"""
+        config = self.env['ir.config_parameter'].sudo()
+        config.set_param('nesto_sync.publish_mode', 'sync')
+        config.set_param('nesto_sync.event_publisher', 'local')
+        config.set_param('nesto_sync.local_publisher_path', self.root)
+        config.set_param('nesto_sync.local_publisher_fsync_every', '1')
+        self.addCleanup(PublisherFactory.clear_cache)
+
+        partner = self.env['res.partner'].create({
+            'name': 'Cliente Local',
+            'cliente_externo': 'LOC001',
+            'contacto_externo': '0',
+            'is_company': True,
+        })
+        partner.write({'mobile': '666123456'})
+
+        publisher = PublisherFactory.create_publisher(self.env)
+        self.assertIsInstance(publisher, LocalFilePublisher)
+        publisher.flush()
+
+        messages = [event['message'] for event in LocalFilePublisher.read_events(self.root)]
+        self.assertTrue(any(message.get('Cliente') == 'LOC001' for message in messages))
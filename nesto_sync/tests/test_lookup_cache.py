@@ -0,0 +1,98 @@
+"""
+Tests para LookupCache - Caché de resoluciones many2one de los transformers
+
+Valida que:
+1. Una resolución repetida no consulta la base de datos
+2. Crear/modificar registros de los modelos cacheados invalida la caché
+3. Lo resuelto en un savepoint deshecho se descarta
+4. Una invalidación descarta también las entradas de los demás workers
+"""
+
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+from ..infrastructure.lookup_cache import LookupCache, lookup_cache
+from ..transformers.field_transformers import GrupoTransformer, SubgrupoTransformer
+from ..transformers.unidad_medida_transformer import buscar_uom
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestLookupCache(TransactionCase):
+    """Tests de la caché de lookups"""
+
+    def setUp(self):
+        super().setUp()
+        lookup_cache.clear()
+        self.context = {'env': self.env, 'nesto_data': {'Grupo': 'Cosméticos'}}
+
+    def test_repeated_category_lookup_without_queries(self):
+        """Test: Grupo/Subgrupo ya resueltos no generan consultas"""
+        grupo = GrupoTransformer().transform('Cosméticos', self.context)
+        subgrupo = SubgrupoTransformer().transform('Cremas', self.context)
+
+        with self.assertQueryCount(0):
+            self.assertEqual(GrupoTransformer().transform('Cosméticos', self.context), grupo)
+            self.assertEqual(SubgrupoTransformer().transform('Cremas', self.context), subgrupo)
+
+    def test_repeated_uom_lookup_without_queries(self):
+        """Test: Una UoM ya resuelta (incluido 'no encontrada') no genera consultas"""
+        uom_id = buscar_uom(self.env, 'kg')
+        buscar_uom(self.env, 'unidad-inexistente')
+
+        with self.assertQueryCount(0):
+            self.assertEqual(buscar_uom(self.env, 'KG'), uom_id)
+            self.assertIsNone(buscar_uom(self.env, 'unidad-inexistente'))
+
+    def test_write_invalidates_category(self):
+        """Test: Renombrar una categoría invalida su resolución"""
+        grupo_id = GrupoTransformer().transform('Cosméticos', self.context)['grupo_id']
+
+        self.env['product.category'].browse(grupo_id).write({'name': 'Cosmética'})
+
+        nuevo_id = GrupoTransformer().transform('Cosméticos', self.context)['grupo_id']
+        self.assertNotEqual(nuevo_id, grupo_id, "Debe crear de nuevo la categoría renombrada")
+
+    def test_create_invalidates_negative_uom(self):
+        """Test: Crear una UoM invalida el 'no encontrada' cacheado"""
+        self.assertIsNone(buscar_uom(self.env, 'zzunidad'))
+
+        uom = self.env['uom.uom'].create({
+            'name': 'zzunidad',
+            'category_id': self.env.ref('uom.product_uom_categ_unit').id,
+            'uom_type': 'bigger',
+            'factor_inv': 2,
+        })
+
+        self.assertEqual(buscar_uom(self.env, 'zzunidad'), uom.id)
+
+    def test_discard_pending_after_savepoint_rollback(self):
+        """Test: Lo creado en un savepoint deshecho no queda en caché"""
+        try:
+            with self.env.cr.savepoint():
+                grupo_id = GrupoTransformer().transform('Grupo Efímero', self.context)['grupo_id']
+                raise ValueError('fallo del mensaje')
+        except ValueError:
+            lookup_cache.discard_pending(self.env.cr)
+
+        nuevo_id = GrupoTransformer().transform('Grupo Efímero', self.context)['grupo_id']
+        self.assertTrue(self.env['product.category'].browse(nuevo_id).exists())
+        self.assertNotEqual(nuevo_id, grupo_id)
+
+    def test_invalidation_reaches_other_workers(self):
+        """Test: Otro proceso descarta sus entradas al ver la nueva generación"""
+        cr = self.env.cr
+        cache_key = (cr.dbname, 'product.category', 'grupo-otro-worker')
+        # Caché de otro worker con una entrada resuelta antes del cambio
+        other_worker = LookupCache()
+        other_worker._publish({cache_key: 1234}, LookupCache._generation(cr))
+        self.assertEqual(
+            other_worker.get_or_load(self.env, 'product.category', 'grupo-otro-worker', lambda: 5678), 1234
+        )
+
+        self.env['product.category'].create({'name': 'Categoría de otro worker'})
+
+        self.assertEqual(
+            other_worker.get_or_load(self.env, 'product.category', 'grupo-otro-worker', lambda: 5678), 5678
+        )
+        self.assertEqual(
+            self.env['nesto.sync.lookup.cache.generation'].search([], limit=1).model, 'product.category'
+        )
@@ -4,6 +4,7 @@ Tests para OdooPublisher - Publicación de cambios Odoo → Nesto
 Incluye:
 1. Tests de VendedorEmail (vacío y con valor)
 2. Tests de construcción de mensajes
+3. Tests del plan de publicación compilado y los transformers inversos
 """
 
 import json
@@ -11,6 +12,9 @@ from unittest.mock import Mock, patch, MagicMock
 from odoo.tests.common import TransactionCase
 from odoo.tests import tagged
 from odoo.addons.nesto_sync.core.odoo_publisher import OdooPublisher
+from odoo.addons.nesto_sync.core.publish_plan import PublishPlan, resolve_reverse_transformer
+from odoo.addons.nesto_sync.models.cargos import cargos_funciones
+from odoo.addons.nesto_sync.transformers.reverse_transformers import ReverseTransformerRegistry
 
 
 @tagged('post_install', '-at_install', 'nesto_sync')
@@ -132,8 +136,6 @@ class TestOdooPublisherVendedor(TransactionCase):
 
     def test_reverse_transformer_vendedor_con_usuario(self):
         """Test: Reverse transformer devuelve dict con VendedorEmail"""
-        publisher = OdooPublisher('cliente', self.env)
-
         # Simular registro con user_id
         mock_record = Mock()
         mock_user = Mock()
@@ -141,39 +143,29 @@ class TestOdooPublisherVendedor(TransactionCase):
         mock_user.email = 'test@example.com'
         mock_record.user_id = mock_user
 
-        result = publisher._apply_reverse_transformer(
-            'vendedor', mock_user, mock_record, {}
-        )
+        result = resolve_reverse_transformer('vendedor')(mock_user, mock_record)
 
         self.assertIsInstance(result, dict)
         self.assertEqual(result['VendedorEmail'], 'test@example.com')
 
     def test_reverse_transformer_vendedor_sin_usuario(self):
         """Test: Reverse transformer devuelve VendedorEmail='' cuando no hay usuario"""
-        publisher = OdooPublisher('cliente', self.env)
-
         # Simular registro sin user_id
         mock_record = Mock()
         mock_record.user_id = None
 
-        result = publisher._apply_reverse_transformer(
-            'vendedor', None, mock_record, {}
-        )
+        result = resolve_reverse_transformer('vendedor')(None, mock_record)
 
         self.assertIsInstance(result, dict)
         self.assertEqual(result['VendedorEmail'], '')
 
     def test_reverse_transformer_vendedor_user_false(self):
         """Test: Reverse transformer con user_id=False devuelve VendedorEmail=''"""
-        publisher = OdooPublisher('cliente', self.env)
-
         # Simular registro con user_id=False (caso común en Odoo)
         mock_record = Mock()
         mock_record.user_id = False
 
-        result = publisher._apply_reverse_transformer(
-            'vendedor', False, mock_record, {}
-        )
+        result = resolve_reverse_transformer('vendedor')(False, mock_record)
 
         self.assertIsInstance(result, dict)
         self.assertEqual(result['VendedorEmail'], '')
@@ -251,3 +243,103 @@ class TestOdooPublisherMensajeCompleto(TransactionCase):
 
         # PERO VendedorEmail SÍ debe incluirse aunque esté vacío
         self.assertIn('VendedorEmail', message)
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestPublishPlan(TransactionCase):
+    """Tests del plan compilado de mapeo Odoo → Nesto"""
+
+    def test_plan_is_compiled_once(self):
+        """Test: El plan se compila una vez por entidad y se reutiliza"""
+        plan = PublishPlan.for_entity('cliente')
+        self.assertIs(PublishPlan.for_entity('cliente'), plan)
+
+        with patch('odoo.addons.nesto_sync.infrastructure.publisher_factory.PublisherFactory.create_publisher'):
+            self.assertIs(OdooPublisher('cliente', self.env).plan, plan)
+
+    def test_explicit_mappings_override_inferred(self):
+        """Test: reverse_field_mappings sobrescribe lo inferido de field_mappings"""
+        plan = PublishPlan.for_entity('cliente')
+        fields = {field[0]: (field[1], field[2]) for field in plan.fields}
+
+        self.assertEqual(fields['cliente_externo'], ('Cliente', None))
+        self.assertEqual(fields['user_id'][0], 'VendedorEmail')
+        self.assertEqual(fields['user_id'][1](False, Mock(user_id=False)), {'VendedorEmail': ''})
+        self.assertTrue(plan.hierarchical)
+        self.assertIn('persona_contacto_externa', [f[0] for f in plan.child_fields])
+
+    def test_cargos_reverse_transformer(self):
+        """Test: El transformer inverso de cargos devuelve el código del cargo"""
+        transformer = ReverseTransformerRegistry.get('cargos')
+        self.assertEqual(transformer.transform(cargos_funciones[5], None), 5)
+        self.assertIsNone(transformer.transform('Cargo inexistente', None))
+        self.assertIsNone(transformer.transform(False, None))
+
+    def test_unknown_reverse_transformer_returns_value(self):
+        """Test: Un transformer inverso no implementado devuelve el valor directo"""
+        self.assertEqual(resolve_reverse_transformer('no_existe')('valor', None), 'valor')
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestOdooPublisherBatch(TransactionCase):
+    """Tests de construcción de mensajes por lotes (publish_records / build_messages)"""
+
+    def setUp(self):
+        super().setUp()
+        Partner = self.env['res.partner'].with_context(skip_sync=True)
+        self.parents = Partner.browse()
+        for index in range(3):
+            parent = Partner.create({
+                'name': f'Cliente Lote {index}',
+                'cliente_externo': f'LOTE{index}',
+                'contacto_externo': '0',
+                'is_company': True,
+                'type': 'invoice',
+                'mobile': f'66655500{index}',
+            })
+            for persona in range(2):
+                Partner.create({
+                    'name': f'Persona {index}-{persona}',
+                    'parent_id': parent.id,
+                    'type': 'contact',
+                    'cliente_externo': f'LOTE{index}',
+                    'contacto_externo': '0',
+                    'persona_contacto_externa': str(persona + 1),
+                    'email': f'persona{index}{persona}@example.com',
+                })
+            self.parents |= parent
+
+        with patch('odoo.addons.nesto_sync.infrastructure.publisher_factory.PublisherFactory.create_publisher'):
+            self.publisher = OdooPublisher('cliente', self.env)
+
+    def test_build_messages_matches_single_build(self):
+        """Test: Los mensajes por lotes son idénticos a los construidos uno a uno"""
+        messages, errors = self.publisher.build_messages(self.parents)
+
+        self.assertFalse(errors)
+        for parent in self.parents:
+            self.assertEqual(messages[parent.id], self.publisher.build_message(parent))
+            self.assertEqual(len(messages[parent.id][1]['PersonasContacto']), 2)
+
+    def test_children_loaded_with_one_search(self):
+        """Test: Los children de todo el lote se buscan con una sola consulta"""
+        Partner = type(self.env['res.partner'])
+        original_search = Partner.search
+        children_searches = []
+
+        def counting_search(model, domain, *args, **kwargs):
+            if any(isinstance(leaf, tuple) and leaf[0] == 'parent_id' for leaf in domain):
+                children_searches.append(domain)
+            return original_search(model, domain, *args, **kwargs)
+
+        with patch.object(Partner, 'search', counting_search):
+            self.publisher.build_messages(self.parents)
+
+        self.assertEqual(len(children_searches), 1)
+
+    def test_publish_records_publishes_each_record(self):
+        """Test: publish_records publica un mensaje por registro"""
+        published = self.publisher.publish_records(self.parents)
+
+        self.assertEqual(published, 3)
+        self.assertEqual(self.publisher.publisher.publish_event.call_count, 3)
@@ -0,0 +1,356 @@
+"""
+Tests para el outbox transaccional de publicaciones Odoo → Nesto
+
+Valida que:
+1. En modo outbox write()/create() encolan en lugar de publicar
+2. Un registro modificado varias veces tiene una sola fila pendiente
+3. Un rollback no deja nada que publicar
+4. El drenado publica con publish_event_async y gestiona los fallos
+5. La ventana de coalescencia agrupa cambios y se miden las publicaciones ahorradas
+6. En modo async se construye y publica tras el commit (no en cada savepoint)
+   y los fallos se encolan en el outbox
+7. Los mensajes se publican con ordering key por entidad y clave externa
+"""
+
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+
+CREATE_PUBLISHER = 'nesto_sync.infrastructure.publisher_factory.PublisherFactory.create_publisher'
+
+
+def _future(result=None, error=None):
+    """Future ya resuelto, como el que devuelve el cliente de PubSub"""
+    future = Future()
+    if error:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+    return future
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestOutbox(TransactionCase):
+    """Tests del outbox de publicaciones"""
+
+    def setUp(self):
+        super().setUp()
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.publish_mode', 'outbox')
+        # Sin ventana de coalescencia salvo en los tests que la prueban
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.outbox_coalesce_seconds', '0')
+        self.Outbox = self.env['nesto.sync.outbox']
+
+        self.partner = self.env['res.partner'].create({
+            'name': 'Cliente Outbox',
+            'cliente_externo': 'OUT001',
+            'contacto_externo': '0',
+            'is_company': True,
+        })
+        self.Outbox.search([]).unlink()
+
+    def _pending(self, record):
+        return self.Outbox.search([
+            ('res_model', '=', record._name),
+            ('res_id', '=', record.id),
+            ('state', '=', 'pending'),
+        ])
+
+    def _mock_publisher(self, **kwargs):
+        publisher = Mock()
+        publisher.publish_event_async.side_effect = lambda topic, message, ordering_key=None: _future(**kwargs)
+        return publisher
+
+    def test_write_enqueues_instead_of_publishing(self):
+        """Test: En modo outbox no se publica dentro de la transacción"""
+        with patch(CREATE_PUBLISHER) as mock_create:
+            self.partner.write({'mobile': '666000001'})
+
+        mock_create.assert_not_called()
+        entry = self._pending(self.partner)
+        self.assertEqual(len(entry), 1)
+        self.assertEqual(entry.entity_type, 'cliente')
+
+    def test_repeated_writes_are_deduplicated(self):
+        """Test: Varias modificaciones del mismo registro → una fila pendiente"""
+        for index in range(5):
+            self.partner.write({'mobile': f'66600000{index}'})
+
+        self.assertEqual(len(self._pending(self.partner)), 1)
+
+    def test_child_change_enqueues_parent(self):
+        """Test: Modificar una persona de contacto encola al cliente padre"""
+        child = self.env['res.partner'].with_context(skip_sync=True).create({
+            'name': 'Persona Outbox',
+            'parent_id': self.partner.id,
+            'type': 'contact',
+            'cliente_externo': 'OUT001',
+            'contacto_externo': '0',
+            'persona_contacto_externa': '1',
+        })
+
+        child.write({'email': 'persona@example.com'})
+
+        self.assertEqual(len(self._pending(self.partner)), 1)
+        self.assertFalse(self._pending(child))
+
+    def test_rollback_leaves_nothing_to_publish(self):
+        """Test: Si la transacción se deshace, no queda fila en el outbox"""
+        with self.assertRaises(ValueError):
+            with self.env.cr.savepoint():
+                self.partner.write({'mobile': '666000009'})
+                raise ValueError('rollback')
+
+        self.Outbox.invalidate_model()
+        self.assertFalse(self._pending(self.partner))
+
+    def test_process_pending_publishes_async(self):
+        """Test: El drenado publica sin bloquear por mensaje y vacía el outbox"""
+        other = self.env['res.partner'].create({
+            'name': 'Cliente Outbox 2',
+            'cliente_externo': 'OUT002',
+            'contacto_externo': '0',
+            'is_company': True,
+        })
+        self.partner.write({'mobile': '666000002'})
+
+        publisher = self._mock_publisher(result='message-id')
+        with patch(CREATE_PUBLISHER, return_value=publisher):
+            processed = self.Outbox.process_pending()
+
+        self.assertEqual(processed, 2)
+        self.assertEqual(publisher.publish_event_async.call_count, 2)
+        publisher.publish_event.assert_not_called()
+        self.assertFalse(self.Outbox.search([]))
+
+        topic, message = publisher.publish_event_async.call_args_list[0][0]
+        self.assertIn(message['Cliente'], ('OUT001', 'OUT002'))
+        self.assertTrue(other.exists())
+
+    def test_publish_with_ordering_key(self):
+        """Test: Cada mensaje se publica con la ordering key de su cliente"""
+        self.partner.write({'mobile': '666000002'})
+
+        publisher = self._mock_publisher(result='message-id')
+        with patch(CREATE_PUBLISHER, return_value=publisher):
+            self.Outbox.process_pending()
+
+        self.assertEqual(publisher.publish_event_async.call_args.kwargs['ordering_key'], 'cliente:OUT001')
+
+    def test_failed_publish_is_retried_then_marked_error(self):
+        """Test: Un fallo suma intentos; al llegar al máximo queda en error"""
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.outbox_max_attempts', '2')
+        self.partner.write({'mobile': '666000003'})
+        entry = self._pending(self.partner)
+
+        publisher = self._mock_publisher(error=RuntimeError('PubSub caído'))
+        with patch(CREATE_PUBLISHER, return_value=publisher):
+            self.Outbox.process_pending()
+            self.assertEqual(entry.state, 'pending')
+            self.assertEqual(entry.attempts, 1)
+
+            self.Outbox.process_pending()
+
+        self.assertEqual(entry.state, 'error')
+        self.assertIn('PubSub caído', entry.last_error)
+
+        entry.action_retry()
+        self.assertEqual(entry.state, 'pending')
+        self.assertEqual(entry.attempts, 0)
+
+    def test_deleted_record_is_discarded(self):
+        """Test: Si el registro se borró antes del drenado, la fila se descarta"""
+        self.partner.write({'mobile': '666000004'})
+        self.partner.unlink()
+
+        publisher = self._mock_publisher(result='message-id')
+        with patch(CREATE_PUBLISHER, return_value=publisher):
+            self.Outbox.process_pending()
+
+        publisher.publish_event_async.assert_not_called()
+        self.assertFalse(self.Outbox.search([]))
+
+    def test_coalesce_window_delays_publish(self):
+        """Test: Dentro de la ventana de coalescencia no se publica"""
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.outbox_coalesce_seconds', '60')
+        self.partner.write({'mobile': '666000005'})
+
+        publisher = self._mock_publisher(result='message-id')
+        with patch(CREATE_PUBLISHER, return_value=publisher):
+            processed = self.Outbox.process_pending()
+
+        self.assertEqual(processed, 0)
+        publisher.publish_event_async.assert_not_called()
+        self.assertTrue(self._pending(self.partner).available_at)
+
+    def test_coalesced_publishes_are_measured(self):
+        """Test: Los cambios agrupados cuentan como publicaciones ahorradas"""
+        for index in range(3):
+            self.partner.write({'mobile': f'66600001{index}'})
+        self.assertEqual(self._pending(self.partner).coalesced_count, 2)
+
+        publisher = self._mock_publisher(result='message-id')
+        with patch(CREATE_PUBLISHER, return_value=publisher):
+            self.Outbox.process_pending()
+
+        self.assertEqual(publisher.publish_event_async.call_count, 1)
+        stats = self.Outbox.get_stats()['entities']['cliente']
+        self.assertEqual(stats['today'], {'published': 1, 'coalesced': 2})
+        self.assertGreaterEqual(stats['coalesced'], 2)
+        self.assertGreater(stats['saved_ratio'], 0)
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestAsyncPublish(TransactionCase):
+    """Tests del modo async: publicación no bloqueante en el postcommit"""
+
+    def setUp(self):
+        super().setUp()
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.publish_mode', 'async')
+        self.Outbox = self.env['nesto.sync.outbox']
+        self.partner = self.env['res.partner'].create({
+            'name': 'Cliente Async',
+            'cliente_externo': 'ASY001',
+            'contacto_externo': '0',
+            'is_company': True,
+        })
+        self.Outbox.search([]).unlink()
+        self.env.cr.precommit.clear()
+        self.env.cr.postcommit.clear()
+        # El postcommit usa un cursor nuevo: que comparta la transacción del test
+        self.registry.enter_test_mode(self.env.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+
+    def _commit_hooks(self, publisher):
+        """Ejecuta los hooks de commit como lo haría cr.commit()"""
+        with patch(CREATE_PUBLISHER, return_value=publisher):
+            self.env.cr.precommit.run()
+            self.env.cr.postcommit.run()
+
+    def test_write_publishes_after_commit(self):
+        """Test: No se publica en write(); tras el commit, un mensaje por registro"""
+        publisher = Mock()
+        publisher.publish_event_async.side_effect = lambda topic, message, ordering_key=None: _future(result='message-id')
+
+        with patch(CREATE_PUBLISHER) as mock_create:
+            self.partner.write({'mobile': '666000001'})
+            self.partner.write({'mobile': '666000002'})
+        mock_create.assert_not_called()
+
+        self._commit_hooks(publisher)
+
+        self.assertEqual(publisher.publish_event_async.call_count, 1)
+        publisher.publish_event.assert_not_called()
+        self.assertFalse(self.Outbox.search([]))
+
+    def test_savepoint_does_not_build_messages(self):
+        """Test: Un savepoint tras write() no construye mensajes; se publica uno al hacer commit"""
+        publisher = Mock()
+        publisher.publish_event_async.side_effect = lambda topic, message, ordering_key=None: _future(result='message-id')
+
+        with patch(CREATE_PUBLISHER, return_value=publisher) as mock_create:
+            self.partner.write({'mobile': '666000004'})
+            with self.env.cr.savepoint():
+                self.partner.write({'mobile': '666000005'})
+            mock_create.assert_not_called()
+
+        self._commit_hooks(publisher)
+
+        self.assertEqual(publisher.publish_event_async.call_count, 1)
+        topic, message = publisher.publish_event_async.call_args[0]
+        self.assertIn('666000005', str(message))
+
+    def test_failed_publish_goes_to_outbox(self):
+        """Test: Una publicación fallida queda pendiente en el outbox para reintentarla"""
+        publisher = Mock()
+        publisher.publish_event_async.side_effect = (
+            lambda topic, message, ordering_key=None: _future(error=RuntimeError('PubSub caído'))
+        )
+
+        self.partner.write({'mobile': '666000003'})
+        self._commit_hooks(publisher)
+        self.Outbox.invalidate_model()
+
+        entry = self.Outbox.search([('res_model', '=', 'res.partner'), ('res_id', '=', self.partner.id)])
+        self.assertEqual(len(entry), 1)
+        self.assertEqual(entry.state, 'pending')
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn('PubSub caído', entry.last_error)
+
+    @patch('nesto_sync.infrastructure.google_pubsub_publisher.pubsub_v1')
+    def test_publisher_client_shared_with_batch_settings(self, mock_pubsub):
+        """Test: Un PublisherClient por proceso, configurado con BatchSettings"""
+        from nesto_sync.infrastructure.google_pubsub_publisher import GooglePubSubPublisher
+        from nesto_sync.infrastructure.publisher_factory import PublisherFactory
+
+        config = self.env['ir.config_parameter'].sudo()
+        config.set_param('nesto_sync.google_project_id', 'proyecto-test')
+        config.set_param('nesto_sync.pubsub_batch_max_messages', '500')
+        GooglePubSubPublisher.reset_clients()
+        self.addCleanup(GooglePubSubPublisher.reset_clients)
+        self.addCleanup(PublisherFactory.clear_cache)
+
+        first = PublisherFactory.create_publisher(self.env)
+        second = PublisherFactory.create_publisher(self.env)
+
+        self.assertIs(first, second)
+        self.assertIs(first.publisher, second.publisher)
+        mock_pubsub.PublisherClient.assert_called_once()
+        self.assertEqual(mock_pubsub.types.BatchSettings.call_args.kwargs['max_messages'], 500)
+
+    @patch('nesto_sync.infrastructure.google_pubsub_publisher.pubsub_v1')
+    def test_publisher_message_ordering_off_by_default(self, mock_pubsub):
+        """Test: Sin configurar, el publisher de la factory no usa ordering keys"""
+        from nesto_sync.infrastructure.google_pubsub_publisher import GooglePubSubPublisher
+        from nesto_sync.infrastructure.publisher_factory import PublisherFactory
+
+        self.env['ir.config_parameter'].sudo().set_param('nesto_sync.google_project_id', 'proyecto-test')
+        GooglePubSubPublisher.reset_clients()
+        self.addCleanup(GooglePubSubPublisher.reset_clients)
+        self.addCleanup(PublisherFactory.clear_cache)
+        client = mock_pubsub.PublisherClient.return_value
+        client.publish.return_value = _future()
+
+        publisher = PublisherFactory.create_publisher(self.env)
+        publisher.publish_event_async('topic', {'Cliente': '1'}, ordering_key='cliente:1')
+
+        self.assertFalse(publisher.message_ordering)
+        mock_pubsub.types.PublisherOptions.assert_not_called()
+        self.assertNotIn('ordering_key', client.publish.call_args.kwargs)
+
+    @patch('nesto_sync.infrastructure.google_pubsub_publisher.pubsub_v1')
+    def test_publisher_client_message_ordering(self, mock_pubsub):
+        """Test: Con ordenación, se publica con ordering key y se reanuda la clave si falla"""
+        from nesto_sync.infrastructure.google_pubsub_publisher import GooglePubSubPublisher
+
+        GooglePubSubPublisher.reset_clients()
+        self.addCleanup(GooglePubSubPublisher.reset_clients)
+        client = mock_pubsub.PublisherClient.return_value
+        client.publish.return_value = _future(error=RuntimeError('PubSub caído'))
+
+        publisher = GooglePubSubPublisher('proyecto-test', message_ordering=True)
+        future = publisher.publish_event_async('topic', {'Cliente': '1'}, ordering_key='cliente:1')
+
+        self.assertIsNotNone(future.exception())
+        mock_pubsub.types.PublisherOptions.assert_called_once_with(enable_message_ordering=True)
+        self.assertEqual(client.publish.call_args.kwargs['ordering_key'], 'cliente:1')
+        client.resume_publish.assert_called_once_with(client.topic_path.return_value, 'cliente:1')
+
+    @patch('nesto_sync.infrastructure.google_pubsub_publisher.pubsub_v1')
+    def test_publisher_cache_invalidated_on_param_change(self, mock_pubsub):
+        """Test: Al cambiar un parámetro nesto_sync.* se construye otro publisher"""
+        from nesto_sync.infrastructure.google_pubsub_publisher import GooglePubSubPublisher
+        from nesto_sync.infrastructure.publisher_factory import PublisherFactory
+
+        config = self.env['ir.config_parameter'].sudo()
+        config.set_param('nesto_sync.google_project_id', 'proyecto-test')
+        self.addCleanup(GooglePubSubPublisher.reset_clients)
+        self.addCleanup(PublisherFactory.clear_cache)
+
+        first = PublisherFactory.create_publisher(self.env)
+        config.set_param('nesto_sync.google_project_id', 'proyecto-nuevo')
+        second = PublisherFactory.create_publisher(self.env)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.project_id, 'proyecto-nuevo')
+        self.assertIs(PublisherFactory.create_publisher(self.env), second)
@@ -7,6 +7,7 @@ import unittest
 from unittest.mock import patch, MagicMock
 
 from nesto_sync.core.generic_processor import GenericEntityProcessor
+from nesto_sync.core.processing_plan import MISSING, compile_path
 from nesto_sync.config.entity_configs import ENTITY_CONFIGS
 
 
@@ -195,43 +196,43 @@ class TestPartialMessages(unittest.TestCase):
 
 
 class TestFieldPresentInData(unittest.TestCase):
-    """Tests para el helper _field_present_in_data."""
+    """Tests de presencia de campos en los datos (compile_path / MISSING)."""
 
-    def setUp(self):
-        self.processor = _make_processor()
+    def _present(self, data, path):
+        return compile_path(path)(data) is not MISSING
 
     def test_campo_simple_presente(self):
-        self.assertTrue(self.processor._field_present_in_data({'Nombre': 'Test'}, 'Nombre'))
+        self.assertTrue(self._present({'Nombre': 'Test'}, 'Nombre'))
 
     def test_campo_simple_ausente(self):
-        self.assertFalse(self.processor._field_present_in_data({'Nombre': 'Test'}, 'Precio'))
+        self.assertFalse(self._present({'Nombre': 'Test'}, 'Precio'))
 
     def test_campo_presente_con_valor_none(self):
-        self.assertTrue(self.processor._field_present_in_data({'Nombre': None}, 'Nombre'))
+        self.assertTrue(self._present({'Nombre': None}, 'Nombre'))
 
     def test_campo_presente_con_valor_vacio(self):
-        self.assertTrue(self.processor._field_present_in_data({'Nombre': ''}, 'Nombre'))
+        self.assertTrue(self._present({'Nombre': ''}, 'Nombre'))
 
     def test_campo_anidado_presente(self):
         data = {'PersonaContacto': {'Id': '1', 'Nombre': 'Juan'}}
-        self.assertTrue(self.processor._field_present_in_data(data, 'PersonaContacto.Id'))
+        self.assertTrue(self._present(data, 'PersonaContacto.Id'))
 
     def test_campo_anidado_ausente(self):
         data = {'PersonaContacto': {'Id': '1'}}
-        self.assertFalse(self.processor._field_present_in_data(data, 'PersonaContacto.Email'))
+        self.assertFalse(self._present(data, 'PersonaContacto.Email'))
 
     def test_campo_anidado_padre_ausente(self):
         data = {'Nombre': 'Test'}
-        self.assertFalse(self.processor._field_present_in_data(data, 'PersonaContacto.Id'))
+        self.assertFalse(self._present(data, 'PersonaContacto.Id'))
 
     def test_data_vacio(self):
-        self.assertFalse(self.processor._field_present_in_data({}, 'Nombre'))
+        self.assertFalse(self._present({}, 'Nombre'))
 
     def test_data_none(self):
-        self.assertFalse(self.processor._field_present_in_data(None, 'Nombre'))
+        self.assertFalse(self._present(None, 'Nombre'))
 
     def test_path_vacio(self):
-        self.assertFalse(self.processor._field_present_in_data({'Nombre': 'Test'}, ''))
+        self.assertFalse(self._present({'Nombre': 'Test'}, ''))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,246 @@
+"""
+Tests para el plan compilado de procesamiento Nesto → Odoo
+
+Valida que:
+1. Cada configuración se compila una vez y se reutiliza entre mensajes
+2. Transformers, post_processors y validadores se instancian una vez
+3. Los extractores distinguen campo ausente de campo con valor None
+4. El resultado de process() no cambia respecto a la configuración original
+5. Los campos 'context' se resuelven sin eval y se cachean por usuario y compañía
+"""
+
+import logging
+import time
+from unittest.mock import patch
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+
+from nesto_sync.benchmarks import EnvelopeFactory
+from nesto_sync.config.entity_configs import ENTITY_CONFIGS
+from nesto_sync.core.context_expression import ContextExpression, context_value_cache
+from nesto_sync.core.generic_processor import GenericEntityProcessor
+from nesto_sync.core.processing_plan import ProcessingPlan, MISSING, FIXED, CONTEXT, compile_path
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestProcessingPlan(TransactionCase):
+    """Tests del plan compilado de GenericEntityProcessor"""
+
+    def setUp(self):
+        super().setUp()
+        self.config = {
+            'field_mappings': {
+                '_tipo': {'type': 'fixed', 'odoo_field': 'type', 'value': 'contact'},
+                '_company': {'type': 'context', 'odoo_field': 'company_id', 'source': 'env.user.company_id.id'},
+                'Nombre': {'odoo_field': 'name', 'default': '<sin nombre>'},
+                'PersonaContacto.Id': {'odoo_field': 'ref'},
+                'Estado': {'transformer': 'estado_to_active', 'odoo_fields': ['active']},
+            },
+            'child_field_mappings': {
+                'Nombre': {'odoo_field': 'name'},
+            },
+            'external_id_mapping': {
+                'cliente_externo': 'Cliente',
+            },
+            'hierarchy': {
+                'enabled': True,
+                'child_types': ['PersonasContacto'],
+            },
+        }
+
+    def test_plan_compiled_once_per_config(self):
+        """Test: Los processors de una misma configuración comparten el plan"""
+        first = GenericEntityProcessor(self.env, self.config)
+        second = GenericEntityProcessor(self.env, self.config)
+
+        self.assertIs(first.plan, second.plan)
+        self.assertIsNot(first.plan, GenericEntityProcessor(self.env, dict(self.config)).plan)
+
+    def test_steps_resolved_at_compile_time(self):
+        """Test: Tipos, transformers y valores fijos se resuelven al compilar"""
+        plan = ProcessingPlan.for_config(self.config)
+        steps = {step.nesto_field: step for step in plan.fields}
+
+        self.assertIs(steps['_tipo'].kind, FIXED)
+        self.assertEqual(steps['_tipo'].value, 'contact')
+        self.assertIs(steps['_company'].kind, CONTEXT)
+        self.assertEqual(plan.context_steps, (steps['_company'],))
+        self.assertIsNotNone(steps['Estado'].transformer)
+        self.assertIsNone(steps['Estado'].odoo_field)
+
+    def test_transformer_instances_shared(self):
+        """Test: El transformer del plan es el mismo en todos los mensajes"""
+        plan = ProcessingPlan.for_config(ENTITY_CONFIGS['cliente'])
+        transformers = [step.transformer for step in plan.fields if step.transformer_name == 'phone']
+
+        self.assertEqual(len(transformers), 1)
+        self.assertIs(
+            transformers[0],
+            next(step.transformer for step in ProcessingPlan.for_config(ENTITY_CONFIGS['cliente']).fields
+                 if step.transformer_name == 'phone')
+        )
+
+    def test_compile_path_presence(self):
+        """Test: Los extractores distinguen ausencia de None"""
+        self.assertIsNone(compile_path('Nombre')({'Nombre': None}))
+        self.assertIs(compile_path('Nombre')({}), MISSING)
+        self.assertEqual(compile_path('PersonaContacto.Id')({'PersonaContacto': {'Id': 3}}), 3)
+        self.assertIs(compile_path('PersonaContacto.Id')({'PersonaContacto': None}), MISSING)
+        self.assertIs(compile_path('PersonaContacto.Id')({'PersonaContacto': {}}), MISSING)
+        self.assertIs(compile_path('')({'': 1}), MISSING)
+
+    def test_process_executes_plan(self):
+        """Test: process() aplica fixed, context, default, rutas, transformers y children"""
+        processor = GenericEntityProcessor(self.env, self.config)
+        result = processor.process({
+            'Cliente': 'PLAN01',
+            'Nombre': None,
+            'PersonaContacto': {'Id': 7},
+            'Estado': 9,
+            'PersonasContacto': [{'Nombre': 'Ana'}],
+        })
+
+        self.assertEqual(result['parent'], {
+            'type': 'contact',
+            'company_id': self.env.user.company_id.id,
+            'name': '<sin nombre>',
+            'ref': 7,
+            'active': True,
+            'cliente_externo': 'PLAN01',
+        })
+        self.assertEqual(result['children'], [{
+            'name': 'Ana',
+            'cliente_externo': 'PLAN01',
+            'parent_id': None,
+        }])
+
+    def test_absent_fields_not_touched(self):
+        """Test: Los campos ausentes del mensaje no aparecen en los valores"""
+        processor = GenericEntityProcessor(self.env, self.config)
+        values = processor.process({'Cliente': 'PLAN02'})['parent']
+
+        self.assertNotIn('name', values)
+        self.assertNotIn('ref', values)
+        self.assertNotIn('active', values)
+        self.assertEqual(values['type'], 'contact')
+
+    def test_unknown_transformer_fails_on_use(self):
+        """Test: Un transformer no registrado solo falla si el mensaje trae el campo"""
+        self.config['field_mappings']['Raro'] = {'transformer': 'no_existe', 'odoo_fields': ['x']}
+        processor = GenericEntityProcessor(self.env, self.config)
+
+        self.assertEqual(processor.process({'Cliente': 'PLAN03'})['parent']['cliente_externo'], 'PLAN03')
+        with self.assertRaises(ValueError):
+            processor.process({'Cliente': 'PLAN03', 'Raro': 1})
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestContextExpression(TransactionCase):
+    """Tests de las expresiones de los campos 'context'"""
+
+    def setUp(self):
+        super().setUp()
+        context_value_cache.clear()
+        self.addCleanup(context_value_cache.clear)
+
+    def test_attribute_path(self):
+        """Test: Una ruta de atributos desde env se resuelve con getattr"""
+        expression = ContextExpression('env.user.company_id.id')
+
+        self.assertEqual(expression.attributes, ('user', 'company_id', 'id'))
+        self.assertEqual(expression(self.env), self.env.user.company_id.id)
+
+    def test_unsupported_expressions_rejected(self):
+        """Test: Solo se admiten rutas de atributos públicos desde env"""
+        for source in ('env', '1 + 1', 'env.user._name', 'env.user.company_id.id()',
+                       '__import__("os").getcwd()', 'env.cr.execute("DELETE")', ''):
+            with self.subTest(source=source):
+                with self.assertRaises(ValueError):
+                    ContextExpression(source)
+
+    def test_recordset_result_rejected(self):
+        """Test: La expresión debe devolver un valor simple, no un recordset"""
+        with self.assertRaises(ValueError):
+            ContextExpression('env.user.company_id')(self.env)
+
+    def test_values_cached_per_user_and_company(self):
+        """Test: El valor se resuelve una vez por usuario y compañía"""
+        config = ENTITY_CONFIGS['cliente']
+        message = {'Cliente': 'CTX01', 'Contacto': '0'}
+        step = ProcessingPlan.for_config(config).context_steps[0]
+
+        first = GenericEntityProcessor(self.env, config)
+        self.assertEqual(first._build_values(message)['company_id'], self.env.user.company_id.id)
+
+        with patch.object(ContextExpression, '__call__', side_effect=AssertionError('sin caché')):
+            second = GenericEntityProcessor(self.env, config)
+            self.assertEqual(second._build_values(message)['company_id'], self.env.user.company_id.id)
+            self.assertIs(second._get_context_values()[step], second._get_context_values()[step])
+
+    def test_cache_cleared_on_user_company_change(self):
+        """Test: Cambiar la compañía de un usuario vacía la caché"""
+        GenericEntityProcessor(self.env, ENTITY_CONFIGS['cliente'])._build_values({'Cliente': 'CTX02'})
+        self.assertTrue(len(context_value_cache))
+
+        self.env.user.write({'company_id': self.env.user.company_id.id})
+        self.assertEqual(len(context_value_cache), 0)
+
+    def test_invalid_source_gives_none(self):
+        """Test: Una expresión no soportada deja el campo a None (como antes con eval)"""
+        config = {
+            'field_mappings': {
+                '_x': {'type': 'context', 'odoo_field': 'company_id', 'source': 'env.user.company_id.id + 1'},
+            },
+        }
+        values = GenericEntityProcessor(self.env, config)._build_values({})
+
+        self.assertIsNone(values['company_id'])
+
+
+@tagged('post_install', '-at_install', 'nesto_sync_benchmark')
+class BenchmarkProcessingPlan(TransactionCase):
+    """
+    CPU por mensaje de GenericEntityProcessor.process con el plan compilado
+
+    Mide el coste por mensaje con el plan ya compilado y, aparte, lo que
+    cuesta compilar el plan. No se compara con el intérprete por campo
+    anterior al plan (ya no existe en el código): no mide esa reducción.
+
+    No se ejecuta con el resto de tests: --test-tags nesto_sync_benchmark
+    """
+
+    MESSAGES = 2000
+
+    def _cpu_per_message(self, messages):
+        config = ENTITY_CONFIGS['cliente']
+        start = time.process_time()
+        for message in messages:
+            GenericEntityProcessor(self.env, config).process(message)
+        return (time.process_time() - start) / len(messages)
+
+    def _cpu_per_compile(self, count=200):
+        config = ENTITY_CONFIGS['cliente']
+        start = time.process_time()
+        for _ in range(count):
+            ProcessingPlan.clear()
+            ProcessingPlan.for_config(config)
+        return (time.process_time() - start) / count
+
+    def test_benchmark_process(self):
+        """Benchmark: CPU por mensaje con el plan compilado y coste de compilarlo"""
+        factory = EnvelopeFactory(seed=21)
+        messages = [factory.cliente(index) for index in range(self.MESSAGES)]
+        # Calentar cachés de lookups (provincias, países) para medir solo CPU del processor
+        self._cpu_per_message(messages[:50])
+
+        compile_cost = self._cpu_per_compile()
+        per_message = self._cpu_per_message(messages)
+
+        _logger.info(
+            f"process() de {self.MESSAGES} clientes: {per_message * 1e6:.0f} µs por mensaje "
+            f"con el plan compilado; compilar el plan cuesta {compile_cost * 1e6:.0f} µs "
+            f"(una vez por configuración y proceso)"
+        )
+        self.assertGreater(per_message, 0)
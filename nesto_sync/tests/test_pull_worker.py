@@ -0,0 +1,78 @@
+"""
+Tests para PullSubscriberWorker - Worker pull con cola acotada
+
+Valida que:
+1. La configuración de flujo se lee de ir.config_parameter
+2. El control de flujo limita mensajes y bytes pendientes
+3. Tras procesar un lote se confirma/rechaza cada mensaje y se liberan los pendientes
+"""
+
+from unittest.mock import MagicMock, patch
+from odoo.tests.common import TransactionCase
+from odoo.tests import tagged
+from ..infrastructure.pull_worker import (
+    OutstandingLeases, PullSubscriberWorker, PullWorkerSettings
+)
+
+
+@tagged('post_install', '-at_install', 'nesto_sync')
+class TestPullWorker(TransactionCase):
+    """Tests del worker pull"""
+
+    def test_settings_from_config_parameters(self):
+        """Test: Los parámetros nesto_sync.pull_* sobrescriben los valores por defecto"""
+        config = self.env['ir.config_parameter'].sudo()
+        config.set_param('nesto_sync.pull_workers', '2')
+        config.set_param('nesto_sync.pull_max_outstanding_bytes', '2048')
+
+        settings = PullWorkerSettings.from_env(self.env)
+
+        self.assertEqual(settings.workers, 2)
+        self.assertEqual(settings.max_outstanding_bytes, 2048)
+        self.assertEqual(settings.batch_size, PullWorkerSettings.DEFAULTS['batch_size'])
+
+    def test_flow_control_limits(self):
+        """Test: No hay hueco al llegar al máximo de mensajes o de bytes"""
+        leases = OutstandingLeases(max_messages=2, max_bytes=100)
+
+        leases.add('a', 10)
+        self.assertEqual(leases.room(), 1)
+
+        leases.add('b', 10)
+        self.assertEqual(leases.room(), 0)
+
+        leases.release(['a', 'b'])
+        leases.add('c', 150)
+        self.assertEqual(leases.room(), 0, "El límite de bytes también bloquea")
+
+        leases.release(['c'])
+        self.assertEqual(leases.room(), 2)
+        self.assertEqual(len(leases), 0)
+
+    def test_process_batch_acks_and_nacks(self):
+        """Test: Se confirman los ack, se rechazan los nack y se liberan todos"""
+        subscriber = MagicMock()
+        worker = PullSubscriberWorker(self.env.cr.dbname, subscriber, PullWorkerSettings())
+        worker.outstanding.add('ack-1', 10)
+        worker.outstanding.add('ack-2', 10)
+
+        results = [{'ack': True}, {'ack': False}]
+        with patch.object(PullSubscriberWorker, '_run_batch', return_value=results):
+            worker._process_batch([('ack-1', {}), ('ack-2', {})])
+
+        subscriber.acknowledge.assert_called_once_with(['ack-1'])
+        subscriber.nack.assert_called_once_with(['ack-2'])
+        self.assertEqual(len(worker.outstanding), 0)
+
+    def test_process_batch_error_nacks_all(self):
+        """Test: Si falla el lote completo, se rechazan todos sus mensajes"""
+        subscriber = MagicMock()
+        worker = PullSubscriberWorker(self.env.cr.dbname, subscriber, PullWorkerSettings())
+        worker.outstanding.add('ack-1', 10)
+
+        with patch.object(PullSubscriberWorker, '_run_batch', side_effect=Exception('BD caída')):
+            worker._process_batch([('ack-1', {})])
+
+        subscriber.acknowledge.assert_not_called()
+        subscriber.nack.assert_called_once_with(['ack-1'])
+        self.assertEqual(len(worker.outstanding), 0)
@@ -1,3 +1,4 @@
 from . import field_transformers
 from . import validators
 from . import post_processors
+from . import reverse_transformers
@@ -7,6 +7,7 @@ Cada transformer es una clase con un método transform().
 
 from ..models.phone_processor import PhoneProcessor
 from ..models.country_manager import CountryManager
+from ..infrastructure.lookup_cache import lookup_cache
 
 
 class FieldTransformerRegistry:
@@ -175,8 +176,11 @@ class CountryCodeTransformer:
         if not env:
             raise ValueError("Environment no disponible en contexto")
 
-        country = env['res.country'].search([('code', '=', value)], limit=1)
-        return {'country_id': country.id if country else None}
+        def _search():
+            country = env['res.country'].search([('code', '=', value)], limit=1)
+            return country.id or None
+
+        return {'country_id': lookup_cache.get_or_load(env, 'res.country', value, _search)}
 
 
 @FieldTransformerRegistry.register('cargos')
@@ -321,16 +325,15 @@ class ProductCategoryTransformer:
         field_name = context.get('field_name', 'categoría')
         target_field = context.get('target_field', 'categ_id')
 
+        Category = env['product.category'].sudo()
+
         # Buscar o crear categoría padre si se especificó
         parent_id = None
         if parent_name:
-            parent = env['product.category'].sudo().search([('name', '=', parent_name)], limit=1)
-            if not parent:
-                parent = env['product.category'].sudo().create({
-                    'name': parent_name,
-                    'parent_id': None
-                })
-            parent_id = parent.id
+            parent_id = lookup_cache.get_or_load(
+                env, 'product.category', ('padre', parent_name),
+                lambda: self._find_or_create(Category, [('name', '=', parent_name)], parent_name, None)
+            )
 
         # Buscar categoría existente
         domain = [('name', '=', value)]
@@ -340,19 +343,28 @@ class ProductCategoryTransformer:
             # Si no hay padre, buscar solo categorías de nivel raíz
             domain.append(('parent_id', '=', False))
 
-        category = env['product.category'].sudo().search(domain, limit=1)
+        category_id = lookup_cache.get_or_load(
+            env, 'product.category', ('hija', value, parent_id or False),
+            lambda: self._find_or_create(Category, domain, value, parent_id, parent_name)
+        )
+
+        return {target_field: category_id}
+
+    def _find_or_create(self, Category, domain, name, parent_id, parent_name=None):
+        """Busca la categoría por dominio y la crea si no existe. Devuelve su ID"""
+        category = Category.search(domain, limit=1)
 
         # Crear si no existe
         if not category:
-            category = env['product.category'].sudo().create({
-                'name': value,
+            category = Category.create({
+                'name': name,
                 'parent_id': parent_id
             })
             import logging
             _logger = logging.getLogger(__name__)
-            _logger.info(f"Categoría creada: {value} (parent: {parent_name or 'ninguno'}) - ID: {category.id}")
+            _logger.info(f"Categoría creada: {name} (parent: {parent_name or 'ninguno'}) - ID: {category.id}")
 
-        return {target_field: category.id}
+        return category.id
 
 
 @FieldTransformerRegistry.register('grupo')
@@ -474,27 +486,31 @@ class FamiliaTransformer:
 class UrlToImageTransformer:
     """
     Transforma URL de imagen a imagen en base64 para Odoo
-    Descarga la imagen desde la URL y la convierte a base64
+
+    Modo asíncrono (nesto_sync.image_download_mode = 'async', por defecto):
+    solo devuelve url_imagen_actual. Al cambiar la URL, el producto queda con
+    imagen_estado = 'pending' y el fetcher en segundo plano descarga la imagen
+    (ver models/image_fetcher.py), sin bloquear la transacción del mensaje.
+
+    Modo síncrono ('sync'): descarga la imagen dentro del mensaje.
 
     OPTIMIZACIÓN: Solo descarga si la URL cambió respecto a url_imagen_actual
     """
 
     def transform(self, value, context):
         """
-        Descarga imagen desde URL y la convierte a base64 (solo si cambió la URL)
+        Convierte la URL en url_imagen_actual (y image_1920 en modo síncrono)
 
         Args:
             value: URL de la imagen
-            context: Dict con contexto (debe incluir 'existing_record' si existe)
+            context: Dict con contexto (debe incluir 'env'; 'existing_record' si existe)
 
         Returns:
-            Dict con image_1920 en base64 y url_imagen_actual
+            Dict con url_imagen_actual y, en modo síncrono, image_1920 en base64
+            e imagen_sha256
         """
         import logging
-        import requests
-        import base64
-        from io import BytesIO
-        from PIL import Image
+        from ..infrastructure.image_downloader import get_image_downloader
 
         _logger = logging.getLogger(__name__)
 
@@ -513,6 +529,11 @@ class UrlToImageTransformer:
             _logger.warning(f"URL de imagen inválida (no HTTP/HTTPS): {url}")
             return {'image_1920': None, 'url_imagen_actual': None}
 
+        # Modo asíncrono: la descarga la hace el fetcher en segundo plano
+        env = context.get('env')
+        if env and self._download_mode(env) == 'async':
+            return {'url_imagen_actual': url}
+
         # OPTIMIZACIÓN: Verificar si la URL cambió
         existing_record = context.get('existing_record')
         if existing_record and hasattr(existing_record, 'url_imagen_actual'):
@@ -522,55 +543,24 @@ class UrlToImageTransformer:
                 # No retornar nada para que no se sobrescriba la imagen
                 return {}
 
-        try:
-            # Descargar imagen con timeout
-            _logger.info(f"Descargando imagen desde: {url}")
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
-
-            # Verificar que sea una imagen
-            content_type = response.headers.get('Content-Type', '')
-            if not content_type.startswith('image/'):
-                _logger.warning(f"URL no devuelve una imagen (Content-Type: {content_type}): {url}")
-                return {'url_imagen_actual': url}  # Guardar URL pero no imagen
-
-            # Leer la imagen y convertirla
-            image_data = response.content
-
-            # Validar que sea una imagen válida usando PIL
-            try:
-                img = Image.open(BytesIO(image_data))
-                img.verify()  # Verificar integridad
-            except Exception as e:
-                _logger.warning(f"Imagen corrupta o formato inválido: {url} - Error: {e}")
-                return {'url_imagen_actual': url}  # Guardar URL pero no imagen
-
-            # Convertir a base64
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-
-            _logger.info(f"Imagen descargada correctamente: {url} ({len(image_data)} bytes)")
-            return {
-                'image_1920': image_base64,
-                'url_imagen_actual': url  # Guardar la URL para futuras comparaciones
-            }
-
-        except requests.exceptions.Timeout:
-            _logger.warning(f"Timeout al descargar imagen: {url}")
-            return {'url_imagen_actual': url}  # Guardar URL para reintentar después
-
-        except requests.exceptions.HTTPError as e:
-            _logger.warning(f"Error HTTP al descargar imagen ({e.response.status_code}): {url}")
+        result = get_image_downloader().fetch(url)
+        if not result['image']:
+            # Guardar URL pero no imagen (el fetcher reintentará los fallos transitorios)
             return {'url_imagen_actual': url}
 
-        except requests.exceptions.RequestException as e:
-            _logger.warning(f"Error al descargar imagen: {url} - Error: {e}")
-            return {'url_imagen_actual': url}
+        # Con el mismo imagen_sha256, product.template no reescribe image_1920
+        return {
+            'image_1920': result['image'],
+            'imagen_sha256': result['sha256'],
+            'url_imagen_actual': url  # Guardar la URL para futuras comparaciones
+        }
 
-        except Exception as e:
-            _logger.error(f"Error inesperado al procesar imagen: {url} - Error: {e}")
-            return {'url_imagen_actual': url}
+    @staticmethod
+    def _download_mode(env):
+        """Modo de descarga de imágenes: 'async' (por defecto) o 'sync'"""
+        return env['ir.config_parameter'].sudo().get_param(
+            'nesto_sync.image_download_mode', 'async'
+        )
 
 
 @FieldTransformerRegistry.register('vendedor')
@@ -636,17 +626,21 @@ class VendedorTransformer:
 
         # Buscar usuario en Odoo por email (login)
         if env:
-            user = env['res.users'].sudo().search([
-                ('login', '=ilike', vendedor_email),
-                ('active', '=', True)
-            ], limit=1)
+            def _search():
+                user = env['res.users'].sudo().search([
+                    ('login', '=ilike', vendedor_email),
+                    ('active', '=', True)
+                ], limit=1)
+                return user.id or None
+
+            user_id = lookup_cache.get_or_load(env, 'res.users', vendedor_email, _search)
 
-            if user:
+            if user_id:
                 _logger.info(
                     f"Vendedor auto-mapeado por email: "
-                    f"{vendedor_email} → user_id={user.id} ({user.name})"
+                    f"{vendedor_email} → user_id={user_id}"
                 )
-                return {'user_id': user.id}
+                return {'user_id': user_id}
 
             # Email no encontrado en Odoo
             _logger.warning(
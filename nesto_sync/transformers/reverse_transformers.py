@@ -0,0 +1,266 @@
+"""
+Reverse Transformers - Transformaciones Odoo → Nesto
+
+Simétrico a field_transformers.py: cada transformer inverso se registra con
+el mismo nombre que su transformer Nesto → Odoo, de modo que la
+configuración de entity_configs.py sirve para las dos direcciones.
+
+Ejemplo:
+- 'phone' (Nesto → Odoo): "666111111/912345678" → mobile, phone
+- 'phone' (Odoo → Nesto): mobile, phone → "666111111/912345678"
+
+transform() recibe el valor ya serializado del campo y el registro completo
+(para transformers que combinan varios campos). Puede devolver un valor o
+un dict con varios campos de Nesto (transformer multi-campo).
+
+depends declara los campos (rutas con puntos) que lee del registro, para
+que OdooPublisher.build_messages los cargue de una vez para todo el lote.
+uses_value = False indica que no usa el valor del campo mapeado (así no se
+lee, por ejemplo, image_1920 solo para descartarlo).
+
+Las instancias no guardan estado: PublishPlan las crea una vez por proceso.
+"""
+
+import logging
+
+from ..models.cargos import cargos_funciones
+
+_logger = logging.getLogger(__name__)
+
+
+class ReverseTransformerRegistry:
+    """Registry central de transformers inversos disponibles"""
+
+    _transformers = {}
+
+    @classmethod
+    def register(cls, name):
+        """Decorador para registrar un transformer inverso"""
+        def decorator(transformer_class):
+            cls._transformers[name] = transformer_class
+            return transformer_class
+        return decorator
+
+    @classmethod
+    def get(cls, name):
+        """Obtiene una instancia de un transformer inverso por nombre"""
+        transformer_class = cls._transformers.get(name)
+        if not transformer_class:
+            raise ValueError(f"Reverse transformer no encontrado: {name}")
+        return transformer_class()
+
+    @classmethod
+    def get_all(cls):
+        """Devuelve todos los transformers inversos registrados"""
+        return cls._transformers.keys()
+
+    @classmethod
+    def is_registered(cls, name):
+        return name in cls._transformers
+
+
+@ReverseTransformerRegistry.register('phone')
+class PhoneReverseTransformer:
+    """Combina mobile + phone en formato "mobile/phone" """
+
+    depends = ('mobile', 'phone')
+    uses_value = False
+
+    def transform(self, value, record):
+        mobile = getattr(record, 'mobile', None) or ''
+        phone = getattr(record, 'phone', None) or ''
+
+        if mobile and phone:
+            return f"{mobile}/{phone}"
+        elif mobile:
+            return mobile
+        elif phone:
+            return phone
+        return None
+
+
+@ReverseTransformerRegistry.register('country_state')
+class CountryStateReverseTransformer:
+    """Convierte state_id en el nombre de la provincia EN MAYÚSCULAS"""
+
+    depends = ('state_id.name',)
+    uses_value = False
+
+    def transform(self, value, record):
+        state = getattr(record, 'state_id', None)
+        if state and hasattr(state, 'name'):
+            return state.name.upper()
+        return None
+
+
+@ReverseTransformerRegistry.register('estado_to_active')
+class EstadoToActiveReverseTransformer:
+    """Convierte active en Estado: True → 9, False → -1"""
+
+    depends = ('active',)
+    uses_value = False
+
+    def transform(self, value, record):
+        active = getattr(record, 'active', True)
+        return 9 if active else -1
+
+
+@ReverseTransformerRegistry.register('cliente_principal')
+class ClientePrincipalReverseTransformer:
+    """Convierte type en ClientePrincipal: 'invoice' → True, resto → False"""
+
+    depends = ('type',)
+    uses_value = False
+
+    def transform(self, value, record):
+        record_type = getattr(record, 'type', 'delivery')
+        return record_type == 'invoice'
+
+
+@ReverseTransformerRegistry.register('spain_country')
+class SpainCountryReverseTransformer:
+    """country_id no se envía en mensajes salientes (campo fijo solo de entrada)"""
+
+    depends = ()
+    uses_value = False
+
+    def transform(self, value, record):
+        return None
+
+
+@ReverseTransformerRegistry.register('cargos')
+class CargosReverseTransformer:
+    """Convierte function (texto) en el número de cargo de Nesto"""
+
+    depends = ()
+
+    # Diccionario inverso de cargos_funciones: texto → código
+    FUNCIONES_CARGOS = {v: k for k, v in cargos_funciones.items()}
+
+    def transform(self, value, record):
+        if value and isinstance(value, str):
+            return self.FUNCIONES_CARGOS.get(value) or None
+        return None
+
+
+@ReverseTransformerRegistry.register('ficticio_to_detailed_type')
+class FicticioToDetailedTypeReverseTransformer:
+    """Convierte detailed_type en Ficticio: 'product' → 0, 'service'/'consu' → 1"""
+
+    depends = ('detailed_type',)
+    uses_value = False
+
+    def transform(self, value, record):
+        detailed_type = getattr(record, 'detailed_type', 'product')
+        return 0 if detailed_type == 'product' else 1
+
+
+class CategoryNameReverseTransformer:
+    """Convierte un Many2one a product.category en el nombre de la categoría"""
+
+    field_name = None
+    uses_value = False
+
+    @property
+    def depends(self):
+        return (f'{self.field_name}.name',)
+
+    def transform(self, value, record):
+        category = getattr(record, self.field_name, None)
+        if category and hasattr(category, 'name'):
+            return category.name
+        return None
+
+
+@ReverseTransformerRegistry.register('grupo')
+class GrupoReverseTransformer(CategoryNameReverseTransformer):
+    field_name = 'grupo_id'
+
+
+@ReverseTransformerRegistry.register('subgrupo')
+class SubgrupoReverseTransformer(CategoryNameReverseTransformer):
+    field_name = 'subgrupo_id'
+
+
+@ReverseTransformerRegistry.register('familia')
+class FamiliaReverseTransformer(CategoryNameReverseTransformer):
+    field_name = 'familia_id'
+
+
+@ReverseTransformerRegistry.register('url_to_image')
+class UrlToImageReverseTransformer:
+    """Devuelve la URL guardada (no se reconstruye la imagen desde base64)"""
+
+    depends = ('url_imagen_actual',)
+    uses_value = False
+
+    def transform(self, value, record):
+        url = getattr(record, 'url_imagen_actual', None)
+        return url if url else None
+
+
+@ReverseTransformerRegistry.register('vendedor')
+class VendedorReverseTransformer:
+    """
+    Convierte user_id en VendedorEmail (solo email, sin código)
+
+    NestoAPI resuelve el código de vendedor desde el email.
+    """
+
+    depends = ('user_id.login', 'user_id.email')
+    uses_value = False
+
+    def transform(self, value, record):
+        user_id = getattr(record, 'user_id', None)
+
+        if user_id and hasattr(user_id, 'login') and user_id.login:
+            return {'VendedorEmail': user_id.login}
+        elif user_id and hasattr(user_id, 'email') and user_id.email:
+            return {'VendedorEmail': user_id.email}
+
+        # IMPORTANTE: Devolver string vacío (no None) para que se incluya en el mensaje
+        # Nesto interpretará VendedorEmail='' como "quitar vendedor" (asignar NV)
+        return {'VendedorEmail': ''}
+
+
+@ReverseTransformerRegistry.register('unidad_medida_y_tamanno')
+class UnidadMedidaYTamannoReverseTransformer:
+    """
+    Reconstruye Tamanno + UnidadMedida desde volume_ml/volume/weight/product_length
+
+    Prioridad: volume_ml > volume > weight > product_length
+    """
+
+    depends = ('volume_ml', 'volume', 'weight', 'product_length')
+    uses_value = False
+
+    def transform(self, value, record):
+        volume_ml = getattr(record, 'volume_ml', 0)
+        volume = getattr(record, 'volume', 0)
+        weight = getattr(record, 'weight', 0)
+        product_length = getattr(record, 'product_length', 0)
+
+        if volume_ml and volume_ml > 0:
+            return self._volume(volume_ml)
+
+        if volume and volume > 0:
+            # Fallback: volume (m³) si volume_ml no está disponible (1 m³ = 1.000.000 ml)
+            return self._volume(volume * 1000000)
+
+        if weight and weight > 0:
+            if weight < 1:
+                return {'Tamanno': round(weight * 1000, 2), 'UnidadMedida': 'g'}
+            return {'Tamanno': round(weight, 2), 'UnidadMedida': 'kg'}
+
+        if product_length and product_length > 0:
+            if product_length < 1:
+                return {'Tamanno': round(product_length * 100, 2), 'UnidadMedida': 'cm'}
+            return {'Tamanno': round(product_length, 2), 'UnidadMedida': 'm'}
+
+        return None
+
+    @staticmethod
+    def _volume(volume_ml):
+        if volume_ml < 1000:
+            return {'Tamanno': round(volume_ml, 2), 'UnidadMedida': 'ml'}
+        return {'Tamanno': round(volume_ml / 1000, 2), 'UnidadMedida': 'l'}
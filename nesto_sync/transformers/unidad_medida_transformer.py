@@ -9,6 +9,8 @@ También busca la unidad de medida en product.uom y la asigna a uom_id.
 
 import logging
 
+from ..infrastructure.lookup_cache import lookup_cache
+
 _logger = logging.getLogger(__name__)
 
 
@@ -180,7 +182,7 @@ def transform_unidad_medida_y_tamanno(env, nesto_data):
 
 def buscar_uom(env, unidad_medida_str):
     """
-    Busca una unidad de medida en product.uom
+    Busca una unidad de medida en product.uom (resultado cacheado en lookup_cache)
 
     Args:
         env: Environment de Odoo
@@ -192,6 +194,15 @@ def buscar_uom(env, unidad_medida_str):
     if not unidad_medida_str:
         return None
 
+    # Las búsquedas son =ilike/ilike: la clave normalizada no distingue mayúsculas
+    return lookup_cache.get_or_load(
+        env, 'uom.uom', unidad_medida_str.strip().lower(),
+        lambda: _buscar_uom_en_bd(env, unidad_medida_str)
+    )
+
+
+def _buscar_uom_en_bd(env, unidad_medida_str):
+    """Búsqueda real de buscar_uom (sin caché)"""
     # Obtener términos de búsqueda
     search_terms = UnidadMedidaConfig.get_uom_search_terms(unidad_medida_str)
 